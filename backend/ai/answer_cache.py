@@ -0,0 +1,82 @@
+"""
+Cache of chat answers for repeated questions.
+
+Users ask the same few questions over and over ("how much caffeine have I
+had today?", "can I sleep yet?"). An answer is stored in the "chat_answers"
+cache under the normalized question plus a fingerprint of everything else
+the prompt is built from: the user's data version (bumped by every log,
+rating and profile write, see users/versioning.py), their local calendar day
+and a digest of the conversation memory the prompt carries (ai/memory.py).
+A new CaffeineLog therefore makes every earlier answer unreachable at once,
+and an answer is only reused when the conversation so far is the same, e.g.
+for the opening question of a fresh or cleared conversation. Entries expire
+after CHAT_ANSWER_CACHE_TTL_SECONDS, since answers about the current caffeine
+level go stale as it decays, and the least recently used ones are evicted
+beyond CHAT_ANSWER_CACHE_MAX_ENTRIES.
+
+Questions shorter than CHAT_ANSWER_CACHE_MIN_WORDS words are mostly
+follow-ups ("why?", "and yesterday?") that rarely repeat, so they are not
+cached.
+
+Hits and misses are counted in api.metrics (``stats()``, ``/metrics``).
+"""
+
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.timezone import now
+
+from api import metrics
+from caffeine import rollups
+from users import versioning
+
+CACHE_ALIAS = "chat_answers"
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_question(text):
+    """Casefold, drop punctuation and collapse whitespace: "Can I sleep  yet?!" -> "can i sleep yet"."""
+    return " ".join(_NON_WORD.sub(" ", (text or "").casefold().replace("'", "")).split())
+
+
+def cache_key(user, question, conversation=""):
+    """
+    Key for ``question`` against the user's current data and ``conversation``
+    (``memory.render(user)``), or None if it should not be cached.
+    """
+    normalized = normalize_question(question)
+    if len(normalized.split()) < settings.CHAT_ANSWER_CACHE_MIN_WORDS:
+        return None
+    conversation_digest = hashlib.sha256(conversation.encode()).hexdigest()
+    fingerprint = (
+        f"{user.pk}:{versioning.current(user)}:{rollups.local_day(user, now())}:{conversation_digest}:{normalized}"
+    )
+    return "chat:" + hashlib.sha256(fingerprint.encode()).hexdigest()
+
+
+def lookup(key):
+    """The cached answer for ``key``, or None. Counts the hit or miss."""
+    if key is None:
+        metrics.increment("chat_answer_cache", outcome="skipped")
+        return None
+    answer = caches[CACHE_ALIAS].get(key)
+    metrics.increment("chat_answer_cache", outcome="hit" if answer is not None else "miss")
+    return answer
+
+
+def store(key, answer):
+    if key is not None and answer:
+        caches[CACHE_ALIAS].set(key, answer)
+
+
+def stats():
+    outcomes = metrics.by_label("chat_answer_cache", "outcome")
+    hits, misses = outcomes.get("hit", 0), outcomes.get("miss", 0)
+    return {
+        "hits": hits,  # Each one is a Gemini call saved
+        "misses": misses,
+        "skipped": outcomes.get("skipped", 0),
+        "hit_ratio": metrics.ratio(hits, misses),
+    }
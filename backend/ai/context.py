@@ -0,0 +1,131 @@
+"""
+Bounded caffeine-history context for the chat prompt.
+
+Instead of formatting every log a user has ever recorded, the prompt gets:
+  - the current modelled caffeine level
+  - a fixed window of recent raw logs
+  - per-day totals for the couple of weeks before that window
+  - per-week totals for older history, plus lifetime totals
+
+All aggregation happens in the database, bucketed by the user's local day and
+week. Lifetime totals come from DailyIntakeRollup rather than the raw logs, so
+their cost grows with the number of days a user has logged, not drinks. The
+rendered text is trimmed to a token budget, so prompt size stays flat as
+history grows.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils.timezone import now
+
+from caffeine import body_load, rollups
+from caffeine.models import CaffeineLog, DailyIntakeRollup
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+class ChatContextBuilder:
+    def __init__(self, user, recent_logs=None, daily_days=None, weekly_weeks=None, token_budget=None):
+        self.user = user
+        self.recent_logs = recent_logs or settings.CHAT_CONTEXT_RECENT_LOGS
+        self.daily_days = daily_days or settings.CHAT_CONTEXT_DAILY_DAYS
+        self.weekly_weeks = weekly_weeks or settings.CHAT_CONTEXT_WEEKLY_WEEKS
+        self.token_budget = token_budget or settings.CHAT_CONTEXT_TOKEN_BUDGET
+        self.tz = rollups.user_timezone(user)
+        self.now = now()
+
+    def _logs(self):
+        return CaffeineLog.objects.filter(user=self.user, confirmed=True)
+
+    def current_level_lines(self):
+        level = body_load.current_level(self.user)
+        return [f"- Estimated caffeine currently in body: **{level:.0f} mg** (as of {self.now.astimezone(self.tz):%b %d, %I:%M %p %Z})"]
+
+    def recent_lines(self):
+        rows = list(self._logs().order_by("-created_at").values(
+            "created_at", "beverage_name", "caffeine_mg", "sugars_g"
+        )[:self.recent_logs])
+        lines = []
+        for row in rows:
+            date_str = row["created_at"].astimezone(self.tz).strftime("%b %d, %I:%M %p %Z")  # Example: "Feb 23, 03:22 AM EST"
+            beverage = row["beverage_name"] or "Unknown drink"
+            caffeine_mg = f"{int(row['caffeine_mg'])} mg" if row["caffeine_mg"] else "Unknown caffeine amount"
+            sugar_g = f"{row['sugars_g']} g sugar" if row["sugars_g"] is not None else "Unknown sugar content"
+            lines.append(f"- **{date_str}** | **{caffeine_mg}** from *{beverage}* | {sugar_g}")
+        # Older history only exists if the window was filled
+        window_start = rows[-1]["created_at"] if len(rows) == self.recent_logs else None
+        return lines, window_start
+
+    def daily_lines(self, before):
+        since = self.now - timedelta(days=self.daily_days)
+        rows = (
+            self._logs().filter(created_at__lt=before, created_at__gte=since)
+            .annotate(day=TruncDate("created_at", tzinfo=self.tz)).values("day")
+            .annotate(caffeine=Sum("caffeine_mg"), sugar=Sum("sugars_g"), drinks=Count("id"))
+            .order_by("-day")
+        )
+        return [
+            f"- {row['day']:%b %d}: {row['caffeine']:.0f} mg caffeine over {row['drinks']} drink(s)"
+            + (f", {row['sugar']:.0f} g sugar" if row["sugar"] is not None else "")
+            for row in rows
+        ]
+
+    def weekly_lines(self, before):
+        since = self.now - timedelta(weeks=self.weekly_weeks)
+        rows = (
+            self._logs().filter(created_at__lt=min(before, self.now - timedelta(days=self.daily_days)), created_at__gte=since)
+            .annotate(week=TruncWeek("created_at", tzinfo=self.tz)).values("week")
+            .annotate(caffeine=Sum("caffeine_mg"), drinks=Count("id"), peak=Max("caffeine_mg"))
+            .order_by("-week")
+        )
+        return [
+            f"- Week of {row['week']:%b %d}: {row['caffeine']:.0f} mg caffeine over {row['drinks']} drink(s), "
+            f"largest {row['peak']:.0f} mg"
+            for row in rows
+        ]
+
+    def lifetime_lines(self):
+        totals = DailyIntakeRollup.objects.filter(user=self.user, drinks__gt=0).aggregate(
+            drinks=Sum("drinks"), caffeine=Sum("caffeine_mg"), first=Min("day")
+        )
+        if not totals["drinks"]:
+            return []
+        days = max((self.now.astimezone(self.tz).date() - totals["first"]).days, 1)
+        return [
+            f"- {totals['drinks']} drinks logged since {totals['first']:%b %d, %Y}, "
+            f"{totals['caffeine']:.0f} mg caffeine in total (~{totals['caffeine'] / days:.0f} mg/day)"
+        ]
+
+    def build(self):
+        """Render the context, dropping the oldest detail first to fit the token budget."""
+        recent, window_start = self.recent_lines()
+        if not recent:
+            return "No caffeine logs recorded."
+
+        sections = [
+            ("Current level", self.current_level_lines()),
+            ("Most recent drinks", recent),
+            ("Daily totals (earlier)", self.daily_lines(window_start) if window_start else []),
+            ("Weekly totals (older history)", self.weekly_lines(window_start) if window_start else []),
+            ("Lifetime summary", self.lifetime_lines() if window_start else []),
+        ]
+        # Lowest priority first: weekly, then daily, then the tail of the raw logs
+        trim_order = [3, 2, 1]
+
+        def render():
+            return "\n\n".join(
+                f"**{title}:**\n" + "\n".join(lines) for title, lines in sections if lines
+            )
+
+        text = render()
+        for index in trim_order:
+            while estimate_tokens(text) > self.token_budget and sections[index][1]:
+                sections[index][1].pop()
+                text = render()
+        return text
@@ -0,0 +1,387 @@
+"""
+Building blocks of the drink photo analysis pipeline.
+
+The photo is normalized in memory (see ai/images.py) and analysed right away
+while a background thread pushes the normalized bytes to R2, so the request
+never waits on an upload -> HEAD -> download round trip before Gemini can
+start. Objects are content addressed, so a photo already in R2 is skipped.
+Gemini answers in the schema from drink_schema.py, and ``save_draft_log``
+stores the analysis as an unconfirmed CaffeineLog for the client to confirm.
+Drafts nobody confirms are deleted after DRINK_DRAFT_RETENTION_SECONDS.
+
+Every stage is timed by a StageTimer, which returns the durations to the
+client (``timings_ms`` / ``Server-Timing``) and feeds the
+``drink_stage_seconds`` histogram behind ``/metrics``.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import boto3
+from asgiref.sync import sync_to_async
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from cachetools import LRUCache
+from django.conf import settings
+from django.utils.timezone import now
+
+from api import metrics
+from caffeine import catalog, services
+from caffeine.models import CaffeineLog
+from caffeine.serializers import CaffeineLogSerializer
+from users import versioning
+from users.models import User
+from . import drink_schema, image_cache
+from .images import normalize_image
+from .governor import GeminiUnavailable, get_governor
+
+_upload_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="r2-upload")
+_r2_client = None
+_r2_client_lock = threading.Lock()
+_stored_keys = LRUCache(maxsize=10000)  # Content keys known to exist in R2
+_stored_keys_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class DrinkAnalysisError(Exception):
+    """
+    A pipeline failure with the HTTP status it maps to, whether a retry may
+    help and, when known, how many seconds to wait before one.
+    """
+
+    def __init__(self, message, status_code=500, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class StageTimer:
+    """Collects wall-clock durations of named pipeline stages and reports each to metrics."""
+
+    def __init__(self):
+        self.durations = {}
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        metrics.observe("drink_stage_seconds", seconds, stage=name)
+
+    def as_ms(self):
+        return {name: round(seconds * 1000, 1) for name, seconds in self.durations.items()}
+
+    def server_timing(self):
+        """Value for the ``Server-Timing`` response header."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.as_ms().items())
+
+
+class _Stage:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def get_r2_client():
+    """Shared boto3 client for Cloudflare R2 (boto3 clients are thread-safe)."""
+    global _r2_client
+    if _r2_client is None:
+        with _r2_client_lock:
+            if _r2_client is None:
+                _r2_client = boto3.client(
+                    's3',
+                    endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    config=Config(signature_version='s3v4')
+                )
+    return _r2_client
+
+
+def public_url(file_key):
+    # e.g. https://r2.lucasdoell.dev/uploads/caffeine_drinks/<filename>
+    return f"https://{settings.AWS_S3_CUSTOM_DOMAIN}/{file_key}"
+
+
+def _object_exists(file_key):
+    with _stored_keys_lock:
+        if file_key in _stored_keys:
+            return True
+    try:
+        get_r2_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+    return True
+
+
+def upload_image(data, file_key, content_type, timer=None):
+    """
+    Upload image bytes to R2 under a content-addressed key and return the
+    public URL. Keys that already exist are not uploaded again.
+    """
+    started = time.perf_counter()
+    try:
+        if _object_exists(file_key):
+            metrics.increment("drink_image_upload_skipped")
+        else:
+            get_r2_client().put_object(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=file_key,
+                Body=data,
+                ContentType=content_type or "application/octet-stream",
+                CacheControl="public, max-age=31536000, immutable",  # Content never changes under a hash key
+                ACL='public-read',
+            )
+        with _stored_keys_lock:
+            _stored_keys[file_key] = True
+    finally:
+        if timer is not None:
+            timer.record("upload", time.perf_counter() - started)
+    return public_url(file_key)
+
+
+def upload_image_async(data, file_key, content_type, timer=None):
+    """Start ``upload_image`` on the shared upload pool and return its future."""
+    return _upload_executor.submit(upload_image, data, file_key, content_type, timer)
+
+
+def verify_upload_async(file_key):
+    """Fire-and-forget HEAD check of an uploaded object; failures are only logged."""
+    def verify():
+        try:
+            with metrics.span("drink_stage_seconds", stage="verify"):
+                get_r2_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)
+        except Exception as e:
+            metrics.increment("drink_upload_verify_failures")
+            logger.warning("File not found in R2 after upload: %s: %s", file_key, e)
+
+    return _upload_executor.submit(verify)
+
+
+def build_drink_prompt(additional_inputs, additional_notes, image_url=None):
+    # The response format is enforced by the schema in drink_schema.py
+    prompt = (
+        "Analyze the drink in this image and report its nutrition facts for the serving shown. "
+        "Use single numbers (never ranges) in the units the field names give. "
+        "If a value is not printed, estimate it from similar drinks; use null only when there is no basis at all. "
+        f"Additional inputs: {json.dumps(additional_inputs)}. "
+        f"Additional notes: {additional_notes}. "
+    )
+    if image_url:
+        prompt += f"Image URL: {image_url}."
+    return prompt
+
+
+class _PendingAnalysis:
+    """State carried from ``_prepare_analysis`` across the Gemini call to ``_finish_analysis``."""
+
+    def __init__(self, image, phash, digest, file_key, image_url, upload, prompt):
+        self.image = image
+        self.phash = phash
+        self.digest = digest
+        self.file_key = file_key
+        self.image_url = image_url
+        self.upload = upload
+        self.prompt = prompt
+
+
+def _prepare_analysis(image_bytes, image_name, additional_inputs, additional_notes, timer):
+    """Steps before Gemini. Returns a cached payload or a _PendingAnalysis."""
+    # 1. Decode, orient, downscale and re-encode the bytes we already hold in memory
+    try:
+        with timer.stage("normalize"):
+            normalized = normalize_image(image_bytes)
+            image = normalized.image
+    except Exception as e:
+        logger.info("Rejected uploaded image %s: %s", image_name, e)
+        raise DrinkAnalysisError(f"Error processing uploaded image: {str(e)}", 400, retryable=False)
+
+    # 2. Reuse a stored analysis when the same drink was photographed before
+    with timer.stage("cache"):
+        phash = image_cache.perceptual_hash(image)
+        digest = image_cache.inputs_digest(additional_inputs, additional_notes)
+        cached = image_cache.lookup(phash, digest)
+
+    # 3. Start the R2 upload in the background; Gemini does not need it
+    file_key = normalized.key
+    image_url = public_url(file_key)
+    upload = upload_image_async(normalized.data, file_key, normalized.content_type, timer)
+    logger.debug("Uploading %s to R2 as %s in the background (%d -> %d bytes)",
+                 image_name, file_key, len(image_bytes), len(normalized.data))
+
+    if cached is not None:
+        # The cached analysis may come from another user's photo: only the analysis is
+        # reused, the log always links the caller's own upload
+        _wait_for_upload(upload, file_key, timer)
+        logger.info("Drink analysis cache hit phash=%016x timings_ms=%s", phash, timer.as_ms())
+        return {"image_url": image_url, "analysis": drink_schema.log_data(cached.analysis), "cached": True}
+
+    # 4. Construct a prompt for Gemini
+    prompt = build_drink_prompt(additional_inputs, additional_notes, image_url)
+    logger.debug("Drink analysis prompt:\n%s", prompt)
+    return _PendingAnalysis(image, phash, digest, file_key, image_url, upload, prompt)
+
+
+def _wait_for_upload(upload, file_key, timer):
+    try:
+        with timer.stage("upload_wait"):
+            upload.result()
+    except Exception as e:
+        logger.error("Upload of %s failed: %s", file_key, e)
+        raise DrinkAnalysisError(f"Failed to upload file: {str(e)}")
+
+    # Optionally confirm the object landed, without holding the response
+    if settings.DRINK_UPLOAD_VERIFY:
+        verify_upload_async(file_key)
+
+
+def _finish_analysis(pending, response_text, timer):
+    """Steps after Gemini: parse, wait for the upload, remember the result."""
+    # 6. Parse the schema-constrained response
+    with timer.stage("parse"):
+        try:
+            parsed_response = drink_schema.log_data(json.loads(response_text))
+        except (ValueError, AttributeError):
+            metrics.increment("drink_analysis_unparsed")
+            logger.warning("Gemini drink analysis did not match the response schema: %.200s", response_text)
+            raise DrinkAnalysisError("Gemini returned an unreadable analysis; try again.", 502)
+
+    # 7. Wait for the upload (usually finished long before Gemini)
+    _wait_for_upload(pending.upload, pending.file_key, timer)
+
+    image_cache.store(pending.phash, pending.digest, parsed_response)
+    catalog.record_analysis(parsed_response)
+
+    final_response = {
+        "image_url": pending.image_url,
+        "analysis": parsed_response,
+        "cached": False
+    }
+    logger.info("Drink analysis finished key=%s timings_ms=%s", pending.file_key, timer.as_ms())
+    return final_response
+
+
+def save_draft_log(user, payload, additional_notes=""):
+    """
+    Validate an analysis payload and store it as an unconfirmed CaffeineLog,
+    which the client confirms (or corrects) with a PATCH to ``logs/<id>/``.
+    Adds ``log`` to the payload, or ``log`` None and ``log_errors`` if the
+    analysis does not make a valid log.
+    """
+    purge_drafts(user=user)
+    serializer = CaffeineLogSerializer(data={
+        **payload["analysis"],
+        "image_url": payload["image_url"],
+        "additional_notes": additional_notes or None,
+    })
+    if serializer.is_valid():
+        log = serializer.save(user=user, confirmed=False)
+        services.log_created(log)
+        payload["log"] = CaffeineLogSerializer(log).data
+    else:
+        metrics.increment("drink_analysis_invalid")
+        logger.warning("Drink analysis is not a valid log: %s", serializer.errors)
+        payload["log"] = None
+        payload["log_errors"] = serializer.errors
+    return payload
+
+
+def purge_drafts(older_than=None, user=None):
+    """Delete unconfirmed logs older than the draft retention window. Returns the count."""
+    cutoff = now() - timedelta(seconds=older_than if older_than is not None else settings.DRINK_DRAFT_RETENTION_SECONDS)
+    drafts = CaffeineLog.objects.filter(confirmed=False, created_at__lt=cutoff)
+    if user is not None:
+        drafts = drafts.filter(user=user)
+    user_ids = set(drafts.values_list("user_id", flat=True))
+    if not user_ids:
+        return 0
+    deleted, _ = drafts.delete()
+    for owner in User.objects.filter(pk__in=user_ids):
+        versioning.bump(owner)  # Drafts show up in the logs listing
+    return deleted
+
+
+def _gemini_error(e):
+    metrics.increment("drink_analysis_gemini_errors")
+    logger.warning("Gemini API error during drink analysis: %s", e)
+    if isinstance(e, GeminiUnavailable):
+        return DrinkAnalysisError(e.message, e.status_code, retry_after=e.retry_after)
+    return DrinkAnalysisError(f"Gemini API error: {str(e)}")
+
+
+def analyze_drink(image_bytes, image_name, additional_inputs, additional_notes, timer=None, user_key=None):
+    """
+    Run the full analysis for one photo and return the API payload
+    (``image_url``, ``analysis``, ``cached``). Raises DrinkAnalysisError.
+    ``user_key`` identifies the caller to the per-user Gemini rate limit.
+    The upload's declared content type is not needed: the photo is decoded
+    and re-encoded, and stored with the type of the re-encoded bytes.
+    """
+    timer = timer or StageTimer()
+    pending = _prepare_analysis(image_bytes, image_name, additional_inputs, additional_notes, timer)
+    if not isinstance(pending, _PendingAnalysis):
+        return pending
+
+    # 5. Call Gemini for AI analysis on the in-memory image
+    try:
+        with timer.stage("gemini"):
+            gemini_response = get_governor().generate(
+                "gemini-2.0-flash", [pending.prompt, pending.image],
+                user_key=user_key, config=drink_schema.generation_config(),
+            )
+            response_text = gemini_response.text
+        logger.debug("Gemini drink analysis response:\n%s", response_text)
+    except Exception as e:
+        raise _gemini_error(e)
+
+    return _finish_analysis(pending, response_text, timer)
+
+
+async def aanalyze_drink(image_bytes, image_name, additional_inputs, additional_notes, timer=None, user_key=None):
+    """
+    Async counterpart of ``analyze_drink``. The image and database work run in
+    a worker thread; the Gemini call and the upload wait only suspend the
+    coroutine, so one event loop can keep many analyses in flight.
+    """
+    timer = timer or StageTimer()
+    pending = await sync_to_async(_prepare_analysis)(
+        image_bytes, image_name, additional_inputs, additional_notes, timer
+    )
+    if not isinstance(pending, _PendingAnalysis):
+        return pending
+
+    # 5. Call Gemini without holding a thread
+    try:
+        with timer.stage("gemini"):
+            gemini_response = await get_governor().agenerate(
+                "gemini-2.0-flash", [pending.prompt, pending.image],
+                user_key=user_key, config=drink_schema.generation_config(),
+            )
+            response_text = gemini_response.text
+        logger.debug("Gemini drink analysis response:\n%s", response_text)
+    except Exception as e:
+        raise _gemini_error(e)
+
+    try:
+        await asyncio.wrap_future(pending.upload)
+    except Exception:
+        pass  # Reported by _finish_analysis
+    return await sync_to_async(_finish_analysis)(pending, response_text, timer)
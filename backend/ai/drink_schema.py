@@ -0,0 +1,85 @@
+"""
+Structured-output schema for drink photo analysis.
+
+The schema Gemini must answer with is generated from the CaffeineLog fields,
+so the analysis maps one to one onto a log and can be validated by
+CaffeineLogSerializer in a single pass. Gemini schemas cannot express maps
+with free-form keys, so the JSON fields (``b_vitamins``,
+``other_ingredients``) are requested as lists of ``{"name", "amount"}`` and
+turned back into the ``{name: amount}`` objects the logs store.
+"""
+
+from django.db import models
+from google.genai import types
+
+from caffeine.models import CaffeineLog
+
+# Log fields the user or server supplies rather than the photo
+EXCLUDED_FIELDS = {"id", "user", "image_url", "additional_notes", "confirmed", "created_at"}
+
+JSON_FIELD_DESCRIPTIONS = {
+    "b_vitamins": "B vitamins, e.g. name vitamin_b6_mg with amount 5. Use the unit as the name's suffix.",
+    "other_ingredients": "Other notable ingredients, e.g. name carbonated_water. Amount only if printed.",
+}
+
+
+def analysis_fields():
+    """The CaffeineLog fields Gemini fills in, in model order."""
+    return [field for field in CaffeineLog._meta.concrete_fields if field.name not in EXCLUDED_FIELDS]
+
+
+def _field_schema(field):
+    if isinstance(field, models.JSONField):
+        return types.Schema(
+            type=types.Type.ARRAY,
+            nullable=True,
+            description=JSON_FIELD_DESCRIPTIONS.get(field.name),
+            items=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    "name": types.Schema(type=types.Type.STRING),
+                    "amount": types.Schema(type=types.Type.NUMBER, nullable=True),
+                },
+                required=["name"],
+            ),
+        )
+    if isinstance(field, models.FloatField):
+        return types.Schema(type=types.Type.NUMBER, nullable=field.null, minimum=0)
+    return types.Schema(type=types.Type.STRING, nullable=field.null)
+
+
+def response_schema():
+    fields = analysis_fields()
+    return types.Schema(
+        type=types.Type.OBJECT,
+        properties={field.name: _field_schema(field) for field in fields},
+        property_ordering=[field.name for field in fields],
+        required=[field.name for field in fields],  # Unknown values come back as null, not missing
+    )
+
+
+def generation_config():
+    return types.GenerateContentConfig(response_mime_type="application/json", response_schema=response_schema())
+
+
+def log_data(analysis):
+    """
+    Map an analysis onto CaffeineLog field names, ready for the serializer.
+    Analyses stored before structured output (``calories``, JSON fields as
+    objects) are accepted too.
+    """
+    data = {}
+    for field in analysis_fields():
+        value = analysis.get(field.name)
+        if field.name == "calories_kcal" and value is None:
+            value = analysis.get("calories")
+        if isinstance(field, models.JSONField) and isinstance(value, list):
+            value = {
+                item["name"]: item.get("amount") if item.get("amount") is not None else True
+                for item in value
+                if isinstance(item, dict) and item.get("name")
+            } or None
+        if isinstance(value, str) and field.max_length:
+            value = value[:field.max_length]
+        data[field.name] = value
+    return data
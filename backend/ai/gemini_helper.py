@@ -1,11 +1,237 @@
+import asyncio
+import atexit
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
 from google import genai
 from google.genai import types
 import PIL.Image
 
-def generate_content_with_gemini(api_key, model, contents):
-    client = genai.Client(api_key=api_key)
-    response = client.models.generate_content(
-        model=model,
-        contents=contents
-    )
-    return response
+
+class GeminiClientManager:
+    """
+    Process-wide pool of warm ``genai.Client`` instances.
+
+    Each client keeps its own HTTP connections, so reusing them avoids a TLS
+    handshake and auth setup per request. At most ``pool_size`` clients are
+    leased at a time, which makes the manager safe to share between threads
+    and async workers. Async connections belong to the event loop that opened
+    them, so async leases draw from a separate pool per loop: one per worker
+    under ASGI, while under WSGI each async view runs on a loop of its own and
+    its clients are closed once that loop is gone.
+    """
+
+    def __init__(self, api_key, pool_size=4, timeout=30.0, base_url=None, acquire_timeout=None):
+        self.api_key = api_key
+        self.pool_size = max(1, int(pool_size))
+        self.timeout = timeout
+        self.base_url = base_url
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else timeout
+
+        self._slots = threading.BoundedSemaphore(self.pool_size)  # One per leased client
+        self._idle = []  # Idle sync clients; the most recently used (warmest) is taken first
+        self._loop_idle = weakref.WeakKeyDictionary()  # event loop -> its idle clients
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _http_options(self, timeout=None):
+        options = {"timeout": int((timeout or self.timeout) * 1000)}  # genai expects milliseconds
+        if self.base_url:
+            options["base_url"] = self.base_url
+        return types.HttpOptions(**options)
+
+    def _acquire_slot(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"No Gemini client available within {self.acquire_timeout}s.")
+
+    def _take(self, idle):
+        """Pop the warmest client from ``idle``, or create one. The caller holds a slot."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Gemini client manager has been shut down.")
+            if idle:
+                return idle.pop()
+        return genai.Client(api_key=self.api_key, http_options=self._http_options())
+
+    def _checkin(self, client, idle):
+        """Return a client to ``idle`` and free its slot. False if it must be closed instead."""
+        with self._lock:
+            kept = not self._closed
+            if kept:
+                idle.append(client)
+        self._slots.release()
+        return kept
+
+    @contextmanager
+    def lease(self):
+        """Borrow a client for the duration of a ``with`` block."""
+        self._acquire_slot()
+        try:
+            client = self._take(self._idle)
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            yield client
+        finally:
+            if not self._checkin(client, self._idle):
+                _close_client(client)
+
+    def _loop_pool(self, loop):
+        with self._lock:
+            idle = self._loop_idle.get(loop)
+            if idle is None:
+                idle = self._loop_idle[loop] = []
+                weakref.finalize(loop, _close_clients, idle)
+        return idle
+
+    async def _aacquire_slot(self):
+        if self._slots.acquire(blocking=False):
+            return
+        # Shielded: cancelling the wait must not strand the slot the thread goes on to take
+        acquire = asyncio.ensure_future(asyncio.to_thread(self._acquire_slot))
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            acquire.add_done_callback(self._release_abandoned)
+            raise
+
+    def _release_abandoned(self, acquire):
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def alease(self):
+        """Async counterpart of ``lease`` that never blocks the event loop."""
+        await self._aacquire_slot()
+        try:
+            idle = self._loop_pool(asyncio.get_running_loop())
+            client = self._take(idle)
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            yield client
+        finally:
+            if not self._checkin(client, idle):
+                await _aclose_client(client)
+
+    def _config(self, config, timeout):
+        if timeout is None:
+            return config
+        # A copy: the caller may reuse its config for calls with other timeouts
+        return types.GenerateContentConfig.model_validate(config or {}).model_copy(
+            update={"http_options": self._http_options(timeout)}
+        )
+
+    def generate_content(self, model, contents, config=None, timeout=None):
+        with self.lease() as client:
+            return client.models.generate_content(
+                model=model, contents=contents, config=self._config(config, timeout)
+            )
+
+    async def agenerate_content(self, model, contents, config=None, timeout=None):
+        async with self.alease() as client:
+            return await client.aio.models.generate_content(
+                model=model, contents=contents, config=self._config(config, timeout)
+            )
+
+    async def astream_content(self, model, contents, config=None, timeout=None):
+        """Yield response chunks as Gemini produces them, holding one client throughout."""
+        async with self.alease() as client:
+            stream = await client.aio.models.generate_content_stream(
+                model=model, contents=contents, config=self._config(config, timeout)
+            )
+            async for chunk in stream:
+                yield chunk
+
+    def shutdown(self):
+        """Close every idle client. Leased clients are closed when returned."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            loop_pools = []
+            for loop, clients in list(self._loop_idle.items()):
+                loop_pools.append((loop, clients[:]))
+                clients.clear()
+        _close_clients(idle)
+        for loop, clients in loop_pools:
+            if loop.is_running():
+                # Async connections are closed on the loop that owns them
+                asyncio.run_coroutine_threadsafe(_aclose_clients(clients), loop)
+            else:
+                _close_clients(clients)
+
+
+def _close_client(client):
+    close = getattr(client, "close", None)  # Older genai releases have no close()
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def _close_clients(clients):
+    for client in clients:
+        _close_client(client)
+
+
+async def _aclose_client(client):
+    aclose = getattr(client.aio, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:
+            pass
+    _close_client(client)
+
+
+async def _aclose_clients(clients):
+    for client in clients:
+        await _aclose_client(client)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_gemini_manager():
+    """Return the process-wide manager, creating it from settings on first use."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = GeminiClientManager(
+                    api_key=settings.GEMINI_API_KEY,
+                    pool_size=settings.GEMINI_POOL_SIZE,
+                    timeout=settings.GEMINI_TIMEOUT_SECONDS,
+                    base_url=settings.GEMINI_BASE_URL,
+                )
+    return _manager
+
+
+def shutdown_gemini_clients():
+    """Shutdown hook: close pooled connections. A later call starts a fresh pool."""
+    global _manager
+    with _manager_lock:
+        manager, _manager = _manager, None
+    if manager is not None:
+        manager.shutdown()
+
+
+atexit.register(shutdown_gemini_clients)
+
+
+def generate_content_with_gemini(api_key, model, contents, config=None, timeout=None):
+    manager = get_gemini_manager()
+    if api_key != manager.api_key:
+        # A one-off key cannot use the shared pool
+        client = genai.Client(api_key=api_key, http_options=manager._http_options(timeout))
+        try:
+            return client.models.generate_content(model=model, contents=contents, config=config)
+        finally:
+            _close_client(client)
+    return manager.generate_content(model, contents, config=config, timeout=timeout)
@@ -0,0 +1,373 @@
+"""
+Admission control and resilience around Gemini calls.
+
+Every Gemini request from the views, the drink pipeline and the job runner
+goes through the process-wide GeminiGovernor, which:
+
+1. Fails fast while the circuit breaker is open. After
+   GEMINI_BREAKER_FAILURES consecutive upstream failures it stays open for
+   GEMINI_BREAKER_COOLDOWN_SECONDS, then lets a single probe through. A
+   probe that ends without an upstream answer (rejected, cancelled, a
+   stream abandoned by its client) hands the slot back.
+2. Enforces a per-user token bucket (GEMINI_USER_RATE_PER_MINUTE /
+   GEMINI_USER_BURST); over-limit calls are rejected right away.
+3. Coalesces identical in-flight requests (same model, contents and config):
+   followers wait for the leader's result instead of calling Gemini again.
+4. Takes a token from the global bucket (GEMINI_GLOBAL_RATE_PER_SECOND /
+   GEMINI_GLOBAL_BURST) for every attempt, waiting at most
+   GEMINI_QUEUE_WAIT_SECONDS for one.
+5. Retries transient failures (429, 5xx, timeouts, connection errors) with
+   full-jitter exponential backoff, within GEMINI_RETRY_ATTEMPTS and
+   GEMINI_RETRY_BUDGET_SECONDS.
+
+Rejections raise GeminiUnavailable with the HTTP status and Retry-After the
+views should answer with. All outcomes are counted in api.metrics under
+``gemini_*``. State is per worker process.
+"""
+
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import httpx
+import PIL.Image
+from cachetools import TTLCache
+from django.conf import settings
+from google.genai import errors
+
+from api import metrics
+from .gemini_helper import get_gemini_manager
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class GeminiUnavailable(Exception):
+    """A Gemini call refused or abandoned by the governor."""
+
+    def __init__(self, message, status_code=503, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate`` tokens per second."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=0.0):
+        """
+        Reserve a token. Returns the seconds to wait before using it (0 when
+        one is free now), or None, reserving nothing, if that would exceed
+        ``max_wait``. Reservations queue callers in arrival order.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else float("inf")
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def retry_after(self):
+        """Seconds until a token frees up."""
+        with self._lock:
+            missing = 1 - self.tokens - (time.monotonic() - self.updated) * self.rate
+            return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold, cooldown):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe = None  # Token of the half-open probe in flight
+        self._lock = threading.Lock()
+
+    def admit(self):
+        """
+        Return ``(wait, probe)``. ``wait`` is None if the call may proceed, else
+        the seconds until the breaker half-opens. ``probe`` is a token when the
+        call is the half-open probe, to hand to ``release_probe`` once it ends.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    return remaining, None
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe is not None:
+                    return self.cooldown, None
+                self._probe = object()
+                return None, self._probe
+            return None, None
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe = None
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    metrics.increment("gemini_circuit_opened")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_probe(self, probe):
+        """
+        Free the half-open slot if ``probe`` still holds it: the call ended
+        without telling us anything about Gemini's health. Safe to call for any
+        call, and after the outcome was recorded.
+        """
+        with self._lock:
+            if probe is not None and self._probe is probe:
+                self._probe = None
+
+
+def is_transient(error):
+    if isinstance(error, errors.APIError):
+        return error.code in TRANSIENT_STATUS_CODES
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+
+def _fingerprint(model, contents, config):
+    digest = hashlib.sha256(model.encode())
+    for part in contents:
+        if isinstance(part, PIL.Image.Image):
+            digest.update(f"image:{part.mode}:{part.size}".encode())
+            digest.update(part.tobytes())
+        else:
+            digest.update(repr(part).encode())
+    digest.update(repr(config).encode())
+    return digest.hexdigest()
+
+
+class GeminiGovernor:
+    def __init__(self, manager=None):
+        self._manager = manager
+        self.global_bucket = TokenBucket(settings.GEMINI_GLOBAL_RATE_PER_SECOND, settings.GEMINI_GLOBAL_BURST)
+        self.breaker = CircuitBreaker(settings.GEMINI_BREAKER_FAILURES, settings.GEMINI_BREAKER_COOLDOWN_SECONDS)
+        self._user_buckets = TTLCache(maxsize=10000, ttl=3600)
+        self._user_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    @property
+    def manager(self):
+        return self._manager or get_gemini_manager()
+
+    # Admission
+
+    def _admit(self, user_key):
+        """Admit a call or raise GeminiUnavailable. Returns the breaker's probe token (usually None)."""
+        wait, probe = self.breaker.admit()
+        if wait is not None:
+            metrics.increment("gemini_circuit_rejected")
+            raise GeminiUnavailable("The AI service is temporarily unavailable; try again shortly.",
+                                    503, retry_after=wait)
+        if user_key is not None:
+            with self._user_lock:
+                bucket = self._user_buckets.get(user_key)
+                if bucket is None:
+                    bucket = self._user_buckets[user_key] = TokenBucket(
+                        settings.GEMINI_USER_RATE_PER_MINUTE / 60.0, settings.GEMINI_USER_BURST
+                    )
+            if bucket.reserve() is None:
+                self.breaker.release_probe(probe)
+                metrics.increment("gemini_rate_limited", scope="user")
+                raise GeminiUnavailable("Too many AI requests; slow down.", 429, retry_after=bucket.retry_after())
+        return probe
+
+    def _global_wait(self):
+        """Seconds to sleep before the next attempt may start; raises if the queue wait is exceeded."""
+        wait = self.global_bucket.reserve(settings.GEMINI_QUEUE_WAIT_SECONDS)
+        if wait is None:
+            metrics.increment("gemini_rate_limited", scope="global")
+            raise GeminiUnavailable("The AI service is busy; try again shortly.", 503,
+                                    retry_after=self.global_bucket.retry_after())
+        return wait
+
+    def _backoff(self, attempt, started):
+        """Seconds to wait before retry number ``attempt``, or None when retrying is not allowed."""
+        if attempt >= settings.GEMINI_RETRY_ATTEMPTS or self.breaker.state == CircuitBreaker.OPEN:
+            return None
+        delay = random.uniform(0, min(settings.GEMINI_RETRY_MAX_SECONDS,
+                                      settings.GEMINI_RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+        if time.monotonic() - started + delay > settings.GEMINI_RETRY_BUDGET_SECONDS:
+            return None
+        return delay
+
+    def _record(self, error):
+        if error is None:
+            self.breaker.record_success()
+            metrics.increment("gemini_calls", outcome="ok")
+        elif is_transient(error):
+            self.breaker.record_failure()
+            metrics.increment("gemini_calls", outcome="transient_error")
+        else:
+            # A bad request says nothing about Gemini's health; the caller releases the probe
+            metrics.increment("gemini_calls", outcome="error")
+
+    # Coalescing
+
+    def _join(self, key):
+        """Return ``(future, is_leader)`` for the in-flight call with this fingerprint."""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                metrics.increment("gemini_coalesced")
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _settle(self, key, future, result=None, error=None):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    # Calls
+
+    def generate(self, model, contents, user_key=None, config=None):
+        probe = self._admit(user_key)
+        try:
+            key = _fingerprint(model, contents, config)
+            future, leader = self._join(key)
+            if not leader:
+                return future.result()
+            try:
+                result = self._call_with_retries(model, contents, config)
+            except BaseException as e:
+                self._settle(key, future, error=e)
+                raise
+            self._settle(key, future, result=result)
+            return result
+        finally:
+            self.breaker.release_probe(probe)
+
+    def _call_with_retries(self, model, contents, config):
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            time.sleep(self._global_wait())
+            try:
+                result = self.manager.generate_content(model, contents, config=config)
+            except Exception as e:
+                self._record(e)
+                if not is_transient(e):
+                    raise
+                delay = self._backoff(attempt, started)
+                if delay is None:
+                    raise GeminiUnavailable("The AI service is not responding; try again shortly.", 503) from e
+                metrics.increment("gemini_retries")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._record(None)
+            return result
+
+    async def agenerate(self, model, contents, user_key=None, config=None):
+        probe = self._admit(user_key)
+        try:
+            key = _fingerprint(model, contents, config)
+            future, leader = self._join(key)
+            if not leader:
+                return await asyncio.wrap_future(future)
+            try:
+                result = await self._acall_with_retries(model, contents, config)
+            except BaseException as e:
+                self._settle(key, future, error=e)
+                raise
+            self._settle(key, future, result=result)
+            return result
+        finally:
+            # Also reached when the caller is cancelled mid-call (CancelledError)
+            self.breaker.release_probe(probe)
+
+    async def _acall_with_retries(self, model, contents, config):
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            await asyncio.sleep(self._global_wait())
+            try:
+                result = await self.manager.agenerate_content(model, contents, config=config)
+            except Exception as e:
+                self._record(e)
+                if not is_transient(e):
+                    raise
+                delay = self._backoff(attempt, started)
+                if delay is None:
+                    raise GeminiUnavailable("The AI service is not responding; try again shortly.", 503) from e
+                metrics.increment("gemini_retries")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._record(None)
+            return result
+
+    async def astream(self, model, contents, user_key=None, config=None):
+        """
+        Async iterator over the chunks of a streamed call. Admission happens on
+        the first iteration, so a stream that is never iterated holds nothing;
+        callers that want to answer a rejection with its 429/503 status await
+        the first chunk before starting their response. Streams are not
+        coalesced or retried, since chunks may already have reached the client.
+        """
+        probe = self._admit(user_key)
+        try:
+            await asyncio.sleep(self._global_wait())
+            try:
+                async for chunk in self.manager.astream_content(model, contents, config=config):
+                    yield chunk
+            except Exception as e:
+                self._record(e)
+                raise
+            self._record(None)
+        finally:
+            # Also reached when the client disconnects (GeneratorExit) or the task is cancelled
+            self.breaker.release_probe(probe)
+
+    def stats(self):
+        return {
+            "circuit": {"state": self.breaker.state, "consecutive_failures": self.breaker.failures},
+            "counters": metrics.counters("gemini_"),
+        }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """Return the process-wide governor, creating it from settings on first use."""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = GeminiGovernor()
+    return _governor
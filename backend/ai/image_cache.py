@@ -0,0 +1,139 @@
+"""
+Perceptual-hash cache for drink image analysis.
+
+Photos are reduced to a 64-bit difference hash (dHash): near-identical
+pictures of the same can differ in only a few bits. A lookup returns the
+stored analysis of the closest cached photo within DRINK_CACHE_THRESHOLD bits
+(Hamming distance), as long as it is younger than DRINK_CACHE_TTL_SECONDS and
+was analysed with the same user hints. The table is capped at
+DRINK_CACHE_MAX_ENTRIES, evicting the least recently used rows.
+
+Entries are shared by all users, so they hold the analysis only, never the
+photo or its URL: a hit still uploads and links the caller's own picture.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+import PIL.Image
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from api import metrics
+from .models import DrinkAnalysisCache
+
+_BANDS = 4
+_BAND_BITS = 16
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def perceptual_hash(image):
+    """64-bit dHash: compare horizontally adjacent pixels of a 9x8 grayscale thumbnail."""
+    small = image.convert("L").resize((9, 8), PIL.Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def inputs_digest(additional_inputs, additional_notes):
+    """Analyses only match when the user supplied the same hints."""
+    payload = json.dumps(additional_inputs, sort_keys=True) + "|" + (additional_notes or "")
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _bands(value):
+    return [(value >> (_BAND_BITS * i)) & _BAND_MASK for i in range(_BANDS)]
+
+
+def _to_signed(value):
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def _probe_values(band, radius):
+    """The band value plus every value within ``radius`` (0 or 1) flipped bits."""
+    values = [band]
+    if radius >= 1:
+        values += [band ^ (1 << bit) for bit in range(_BAND_BITS)]
+    return values
+
+
+def lookup(phash, digest, threshold=None):
+    """Return the closest cached entry within ``threshold`` bits, or None."""
+    threshold = settings.DRINK_CACHE_THRESHOLD if threshold is None else threshold
+    # Pigeonhole: if 4 bands differ by <= threshold bits in total, at least one
+    # band differs by <= threshold // 4 bits, so probing that radius finds every
+    # match. The probe radius is capped at 1, which keeps this exact up to 7 bits.
+    radius = min(threshold // _BANDS, 1)
+    band_filter = Q()
+    for i, band in enumerate(_bands(phash)):
+        band_filter |= Q(**{f"band{i}__in": _probe_values(band, radius)})
+
+    candidates = DrinkAnalysisCache.objects.filter(
+        band_filter,
+        inputs_digest=digest,
+        created_at__gte=now() - timedelta(seconds=settings.DRINK_CACHE_TTL_SECONDS),
+    ).only("id", "phash", "analysis")
+
+    best, best_distance = None, threshold + 1
+    for entry in candidates:
+        distance = (_to_unsigned(entry.phash) ^ phash).bit_count()
+        if distance < best_distance:
+            best, best_distance = entry, distance
+
+    if best is None:
+        metrics.increment("drink_analysis_cache_misses")
+        return None
+
+    DrinkAnalysisCache.objects.filter(pk=best.pk).update(hits=F("hits") + 1, last_used_at=now())
+    metrics.increment("drink_analysis_cache_hits")
+    return best
+
+
+def store(phash, digest, analysis):
+    """Cache an analysis and evict expired and least recently used entries."""
+    entry = DrinkAnalysisCache.objects.create(
+        phash=_to_signed(phash),
+        inputs_digest=digest,
+        analysis=analysis,
+        **{f"band{i}": band for i, band in enumerate(_bands(phash))},
+    )
+    evict()
+    return entry
+
+
+def evict():
+    expired = DrinkAnalysisCache.objects.filter(
+        created_at__lt=now() - timedelta(seconds=settings.DRINK_CACHE_TTL_SECONDS)
+    ).delete()[0]
+    overflow = DrinkAnalysisCache.objects.count() - settings.DRINK_CACHE_MAX_ENTRIES
+    evicted = 0
+    if overflow > 0:
+        stale_ids = list(
+            DrinkAnalysisCache.objects.order_by("last_used_at").values_list("id", flat=True)[:overflow]
+        )
+        evicted = DrinkAnalysisCache.objects.filter(id__in=stale_ids).delete()[0]
+    if expired or evicted:
+        metrics.increment("drink_analysis_cache_evictions", expired + evicted)
+
+
+def stats():
+    hits = metrics.get("drink_analysis_cache_hits")
+    misses = metrics.get("drink_analysis_cache_misses")
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": metrics.ratio(hits, misses),
+        "evictions": metrics.get("drink_analysis_cache_evictions"),
+        "entries": DrinkAnalysisCache.objects.count(),
+    }
@@ -0,0 +1,58 @@
+"""
+Normalization of uploaded drink photos before analysis and storage.
+
+Phones send multi-megabyte JPEG or HEIC files with the orientation stored in
+EXIF. Every photo is rotated upright, downscaled so its longest side is at
+most DRINK_IMAGE_MAX_SIDE pixels and re-encoded (WebP by default). The
+result is stored under the SHA-256 of its bytes, so the same photo maps to
+the same R2 key and is never uploaded twice.
+"""
+
+import hashlib
+from io import BytesIO
+
+import PIL.Image
+import PIL.ImageOps
+from django.conf import settings
+
+try:  # HEIC support is optional
+    from pillow_heif import register_heif_opener
+except ImportError:
+    pass
+else:
+    register_heif_opener()
+
+_FORMATS = {
+    "WEBP": ("image/webp", "webp"),
+    "JPEG": ("image/jpeg", "jpg"),
+}
+
+
+class NormalizedImage:
+    def __init__(self, image, data, image_format):
+        self.image = image  # Upright, downscaled PIL image (what Gemini sees)
+        self.data = data  # Encoded bytes (what R2 stores)
+        self.content_type, extension = _FORMATS[image_format]
+        self.sha256 = hashlib.sha256(data).hexdigest()
+        self.key = f"uploads/caffeine_drinks/{self.sha256}.{extension}"
+
+
+def normalize_image(raw_bytes, max_side=None, image_format=None, quality=None):
+    """Decode, orient, downscale and re-encode an uploaded photo."""
+    max_side = max_side or settings.DRINK_IMAGE_MAX_SIDE
+    image_format = (image_format or settings.DRINK_IMAGE_FORMAT).upper()
+    quality = quality or settings.DRINK_IMAGE_QUALITY
+
+    image = PIL.Image.open(BytesIO(raw_bytes))
+    image = PIL.ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "L"):
+        # Flatten transparency onto white instead of letting it turn black
+        background = PIL.Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+    image.thumbnail((max_side, max_side), PIL.Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, quality=quality, optimize=True)
+    return NormalizedImage(image, buffer.getvalue(), image_format)
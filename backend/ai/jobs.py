@@ -0,0 +1,249 @@
+"""
+Database-backed queue for drink photo analysis.
+
+``enqueue`` stores the photo and returns immediately. A bounded pool of
+worker threads (DRINK_JOB_WORKERS) claims queued jobs with an optimistic
+conditional UPDATE, runs the shared analysis pipeline and records the
+result. Failed attempts are retried with exponential backoff up to
+``max_attempts``; jobs whose worker died are re-claimed once their lease
+expires, or failed if that was their last attempt. Finished jobs are purged
+after DRINK_JOB_RETENTION_SECONDS, unconfirmed draft logs after
+DRINK_DRAFT_RETENTION_SECONDS.
+
+Workers start lazily inside the web process on the first submission, or run
+standalone with ``manage.py run_drink_jobs``.
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from api import metrics
+from users.models import User
+from .drink_pipeline import DrinkAnalysisError, analyze_drink, purge_drafts, save_draft_log
+from .models import DrinkAnalysisJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = [DrinkAnalysisJob.QUEUED, DrinkAnalysisJob.RUNNING]
+
+
+class JobLimitExceeded(Exception):
+    pass
+
+
+def enqueue(user, image_bytes, image_name, additional_inputs, additional_notes):
+    """Persist a new job and make sure workers are running. Raises JobLimitExceeded."""
+    with transaction.atomic():
+        # Lock the user's row so concurrent submissions can't both pass the limit check
+        User.objects.select_for_update().only("pk").get(pk=user.pk)
+        pending = DrinkAnalysisJob.objects.filter(user=user, status__in=ACTIVE_STATUSES).count()
+        if pending >= settings.DRINK_JOB_MAX_PENDING_PER_USER:
+            raise JobLimitExceeded(
+                f"You already have {pending} drink analyses in progress; try again when one finishes."
+            )
+
+        job = DrinkAnalysisJob.objects.create(
+            user=user,
+            image=image_bytes,
+            image_name=image_name,
+            additional_inputs=additional_inputs,
+            additional_notes=additional_notes or "",
+            max_attempts=settings.DRINK_JOB_MAX_ATTEMPTS,
+        )
+    metrics.increment("drink_jobs_enqueued")
+    if settings.DRINK_JOBS_IN_PROCESS:
+        get_runner().start()
+        get_runner().wake()
+    return job
+
+
+def fail_abandoned(current=None):
+    """Fail running jobs whose lease expired on their last attempt. Returns the count."""
+    failed = DrinkAnalysisJob.objects.filter(
+        status=DrinkAnalysisJob.RUNNING,
+        lease_expires_at__lt=current or now(),
+        attempts__gte=F("max_attempts"),
+    ).update(
+        status=DrinkAnalysisJob.FAILED,
+        error="The analysis stopped responding and ran out of attempts.",
+        image=None,
+        finished_at=now(),
+        lease_expires_at=None,
+    )
+    if failed:
+        metrics.increment("drink_jobs_failed", failed)
+    return failed
+
+
+def claim_next():
+    """Atomically take the next runnable job, or return None."""
+    current = now()
+    fail_abandoned(current)
+    candidates = (
+        DrinkAnalysisJob.objects.filter(
+            Q(status=DrinkAnalysisJob.QUEUED, available_at__lte=current)
+            | Q(status=DrinkAnalysisJob.RUNNING, lease_expires_at__lt=current, attempts__lt=F("max_attempts"))
+        )
+        .order_by("available_at")
+        .values_list("id", "status", "attempts")[:5]
+    )
+    for job_id, job_status, attempts in candidates:
+        # Only one worker can win the UPDATE for a given (status, attempts) pair
+        claimed = DrinkAnalysisJob.objects.filter(id=job_id, status=job_status, attempts=attempts).update(
+            status=DrinkAnalysisJob.RUNNING,
+            attempts=attempts + 1,
+            lease_expires_at=current + timedelta(seconds=settings.DRINK_JOB_LEASE_SECONDS),
+        )
+        if claimed:
+            return DrinkAnalysisJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Run one claimed job and record its outcome."""
+    try:
+        result = analyze_drink(
+            bytes(job.image), job.image_name, job.additional_inputs, job.additional_notes, user_key=job.user_id,
+        )
+        result = save_draft_log(job.user, result, job.additional_notes)
+        result = json.loads(json.dumps(result, cls=DjangoJSONEncoder))  # The draft's UUIDs, for the JSONField
+    except Exception as e:
+        retryable = e.retryable if isinstance(e, DrinkAnalysisError) else True
+        message = e.message if isinstance(e, DrinkAnalysisError) else f"Unexpected error: {str(e)}"
+        if retryable and job.attempts < job.max_attempts:
+            backoff = settings.DRINK_JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+            if getattr(e, "retry_after", None):
+                backoff = max(backoff, e.retry_after)  # The Gemini governor knows when capacity frees up
+            DrinkAnalysisJob.objects.filter(id=job.id).update(
+                status=DrinkAnalysisJob.QUEUED,
+                error=message,
+                available_at=now() + timedelta(seconds=backoff),
+                lease_expires_at=None,
+            )
+            metrics.increment("drink_jobs_retried")
+        else:
+            DrinkAnalysisJob.objects.filter(id=job.id).update(
+                status=DrinkAnalysisJob.FAILED,
+                error=message,
+                image=None,
+                finished_at=now(),
+                lease_expires_at=None,
+            )
+            metrics.increment("drink_jobs_failed")
+        return
+
+    DrinkAnalysisJob.objects.filter(id=job.id).update(
+        status=DrinkAnalysisJob.SUCCEEDED,
+        result=result,
+        error=None,
+        image=None,
+        finished_at=now(),
+        lease_expires_at=None,
+    )
+    metrics.increment("drink_jobs_succeeded")
+
+
+def purge_finished(older_than=None):
+    """Delete finished jobs older than the retention window. Returns the count."""
+    cutoff = now() - timedelta(seconds=older_than if older_than is not None else settings.DRINK_JOB_RETENTION_SECONDS)
+    deleted, _ = DrinkAnalysisJob.objects.filter(
+        status__in=[DrinkAnalysisJob.SUCCEEDED, DrinkAnalysisJob.FAILED],
+        finished_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+class JobRunner:
+    """A fixed number of worker threads polling the job table."""
+
+    PURGE_INTERVAL = 600
+
+    def __init__(self, workers, poll_interval):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"drink-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def wake(self):
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def stop(self, timeout=None):
+        """Stop claiming new jobs and wait up to ``timeout`` seconds in total for running ones to finish."""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()) if deadline is not None else None)
+        self._threads = []
+
+    def run_forever(self):
+        self.start()
+        try:
+            while not self._stopping.is_set():
+                self._stopping.wait(1.0)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job = None
+            try:
+                close_old_connections()
+                self._maybe_purge()
+                job = claim_next()
+                if job is not None:
+                    run_job(job)
+            except Exception as e:
+                logger.exception("Drink job worker error: %s", e)
+            finally:
+                close_old_connections()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+
+    def _maybe_purge(self):
+        with self._lock:
+            if time.monotonic() - self._last_purge < self.PURGE_INTERVAL:
+                return
+            self._last_purge = time.monotonic()
+        purge_finished()
+        purge_drafts()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner(settings.DRINK_JOB_WORKERS, settings.DRINK_JOB_POLL_SECONDS)
+                atexit.register(_runner.stop, 5)
+    return _runner
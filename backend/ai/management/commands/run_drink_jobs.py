@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ai import jobs
+
+
+class Command(BaseCommand):
+    help = "Run drink analysis job workers in the foreground (or purge finished jobs and stale drafts)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, help="Number of worker threads (default DRINK_JOB_WORKERS).")
+        parser.add_argument("--purge", action="store_true", help="Delete expired finished jobs and unconfirmed drafts, then exit.")
+
+    def handle(self, *args, **options):
+        if options["purge"]:
+            deleted = jobs.purge_finished()
+            drafts = jobs.purge_drafts()
+            self.stdout.write(self.style.SUCCESS(f"Purged {deleted} finished jobs and {drafts} unconfirmed drafts."))
+            return
+
+        runner = jobs.get_runner()
+        if options["workers"]:
+            runner.workers = options["workers"]
+        self.stdout.write(f"Running {runner.workers} drink analysis workers. Press Ctrl+C to stop.")
+        runner.run_forever()
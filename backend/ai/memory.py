@@ -0,0 +1,155 @@
+"""
+Persistent chat memory.
+
+Every exchange is stored as a ChatMessage. The chat prompt gets a rolling
+summary of the older conversation (ChatSummary) plus the last
+CHAT_MEMORY_RECENT_MESSAGES exchanges verbatim, so its size stays bounded
+however long the conversation gets.
+
+Once more than CHAT_MEMORY_SUMMARY_BATCH exchanges have piled up behind the
+verbatim window, a background thread folds them into the summary with one
+Gemini call: the old summary plus the new exchanges go in, an updated summary
+of at most CHAT_MEMORY_SUMMARY_MAX_CHARS comes out. The summary only moves
+forward if no other worker advanced it in the meantime.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils.timezone import now
+
+from api import metrics
+from .governor import get_governor
+from .models import ChatMessage, ChatSummary
+
+logger = logging.getLogger(__name__)
+
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+_summarizing = set()  # Users with a summary update queued or running in this process
+_summarizing_lock = threading.Lock()
+
+
+def _clip(text, limit):
+    text = (text or "").strip()
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+def _pending(user, summary):
+    """Messages not folded into ``summary`` yet."""
+    messages = ChatMessage.objects.filter(user=user)
+    if summary is not None:
+        messages = messages.filter(timestamp__gt=summary.covered_until)
+    return messages
+
+
+def render(user):
+    """The conversation so far as prompt text, or "" for a new conversation."""
+    summary = ChatSummary.objects.filter(user=user).first()
+    recent = list(
+        _pending(user, summary).order_by("-timestamp", "-id")
+        .values("message", "response")[:settings.CHAT_MEMORY_RECENT_MESSAGES]
+    )
+    limit = settings.CHAT_MEMORY_MESSAGE_MAX_CHARS
+    sections = []
+    if summary is not None and summary.summary:
+        sections.append(f"**Summary of the earlier conversation:**\n{summary.summary}")
+    if recent:
+        turns = [
+            f"User: {_clip(row['message'], limit)}\nAssistant: {_clip(row['response'], limit)}"
+            for row in reversed(recent)
+        ]
+        sections.append("**Most recent messages:**\n" + "\n\n".join(turns))
+    return "\n\n".join(sections)
+
+
+def record_exchange(user, message, response):
+    """Store one exchange and, if enough have piled up, update the summary in the background."""
+    chat_message = ChatMessage.objects.create(user=user, message=message, response=response)
+    summary = ChatSummary.objects.filter(user=user).first()
+    threshold = settings.CHAT_MEMORY_RECENT_MESSAGES + settings.CHAT_MEMORY_SUMMARY_BATCH
+    if _pending(user, summary).count() > threshold:
+        with _summarizing_lock:
+            if user.pk in _summarizing:
+                return chat_message
+            _summarizing.add(user.pk)
+        _summary_executor.submit(_summarize_in_background, user)
+    return chat_message
+
+
+def _summarize_in_background(user):
+    try:
+        summarize(user)
+    except Exception as e:
+        metrics.increment("chat_summary_failures")
+        logger.warning("Chat summary update for user %s failed: %s", user.pk, e)
+    finally:
+        with _summarizing_lock:
+            _summarizing.discard(user.pk)
+        close_old_connections()
+
+
+def build_summary_prompt(previous, messages):
+    limit = settings.CHAT_MEMORY_MESSAGE_MAX_CHARS
+    transcript = "\n\n".join(
+        f"User: {_clip(m.message, limit)}\nAssistant: {_clip(m.response, limit)}" for m in messages
+    )
+    return (
+        "You maintain the memory of a caffeine-tracking assistant's conversation with one user. "
+        "Update the summary below with the new messages. Keep facts the user shared about themselves, "
+        "their goals and preferences, questions still open and advice already given. Drop small talk and "
+        "anything the user's logs already record. Answer with the summary only, in plain sentences, "
+        f"at most {settings.CHAT_MEMORY_SUMMARY_MAX_CHARS} characters.\n\n"
+        f"Current summary:\n{previous or '(none yet)'}\n\n"
+        f"New messages:\n{transcript}"
+    )
+
+
+def summarize(user):
+    """
+    Fold the exchanges older than the verbatim window into the summary.
+    Returns True if the summary was updated.
+    """
+    summary = ChatSummary.objects.filter(user=user).first()
+    pending = _pending(user, summary)
+    fold = pending.count() - settings.CHAT_MEMORY_RECENT_MESSAGES
+    if fold < settings.CHAT_MEMORY_SUMMARY_BATCH:
+        return False
+    messages = list(pending.order_by("timestamp", "id")[:fold])
+
+    # 1. One Gemini call: previous summary + new exchanges -> updated summary
+    with metrics.span("chat_stage_seconds", stage="summary"):
+        response = get_governor().generate(
+            "gemini-2.0-flash", [build_summary_prompt(summary.summary if summary else "", messages)]
+        )
+    text = _clip(response.text, settings.CHAT_MEMORY_SUMMARY_MAX_CHARS)
+    covered_until = messages[-1].timestamp
+
+    # 2. Advance the summary unless another worker already did
+    if summary is None:
+        try:
+            with transaction.atomic():
+                ChatSummary.objects.create(
+                    user=user, summary=text, covered_until=covered_until, messages_covered=len(messages)
+                )
+        except IntegrityError:
+            return False
+    else:
+        updated = ChatSummary.objects.filter(user=user, covered_until=summary.covered_until).update(
+            summary=text, covered_until=covered_until, messages_covered=summary.messages_covered + len(messages),
+            updated_at=now(),
+        )
+        if not updated:
+            return False
+    metrics.increment("chat_summaries")
+    return True
+
+
+def clear(user):
+    """Forget the whole conversation."""
+    with transaction.atomic():
+        ChatSummary.objects.filter(user=user).delete()
+        deleted, _ = ChatMessage.objects.filter(user=user).delete()
+    return deleted
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrinkAnalysisCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phash', models.BigIntegerField()),
+                ('band0', models.IntegerField(db_index=True)),
+                ('band1', models.IntegerField(db_index=True)),
+                ('band2', models.IntegerField(db_index=True)),
+                ('band3', models.IntegerField(db_index=True)),
+                ('inputs_digest', models.CharField(max_length=64)),
+                ('analysis', models.JSONField()),
+                ('image_url', models.URLField(blank=True, null=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
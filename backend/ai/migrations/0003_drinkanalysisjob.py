@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:13
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0002_drinkanalysiscache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrinkAnalysisJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('image', models.BinaryField(blank=True, null=True)),
+                ('image_name', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('additional_inputs', models.JSONField(blank=True, default=dict)),
+                ('additional_notes', models.TextField(blank=True, default='')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drink_analysis_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at'], name='ai_job_status_available_idx'), models.Index(fields=['user', 'status'], name='ai_job_user_status_idx')],
+            },
+        ),
+    ]
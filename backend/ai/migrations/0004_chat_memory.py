@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0003_drinkanalysisjob'),
+        ('users', '0004_userdataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='chat_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('summary', models.TextField(blank=True, default='')),
+                ('covered_until', models.DateTimeField()),
+                ('messages_covered', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'timestamp'], name='ai_chat_user_timestamp_idx'),
+        ),
+    ]
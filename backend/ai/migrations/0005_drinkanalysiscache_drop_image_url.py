@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:01
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0004_chat_memory'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='drinkanalysiscache',
+            name='image_url',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0005_drinkanalysiscache_drop_image_url'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='drinkanalysisjob',
+            name='content_type',
+        ),
+    ]
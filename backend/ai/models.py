@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 from users.models import User
 
 class ChatMessage(models.Model):
@@ -9,5 +10,96 @@ class ChatMessage(models.Model):
     response = models.TextField(blank=True, null=True)  # The AI-generated response
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Backs the history endpoint and the recent-turns lookup of every chat prompt
+            models.Index(fields=["user", "timestamp"], name="ai_chat_user_timestamp_idx"),
+        ]
+
     def __str__(self):
         return f"Chat with {self.user.username} at {self.timestamp}"
+
+
+class ChatSummary(models.Model):
+    """
+    Rolling summary of a user's chat history. It covers every message up to
+    and including ``covered_until``; later messages are sent verbatim.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="chat_summary")
+    summary = models.TextField(blank=True, default="")
+    covered_until = models.DateTimeField()  # Timestamp of the newest message folded into the summary
+    messages_covered = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Chat summary for {self.user.username} ({self.messages_covered} messages)"
+
+
+class DrinkAnalysisCache(models.Model):
+    """
+    Stored Gemini drink analysis, keyed by a 64-bit perceptual hash of the photo.
+
+    The hash is also split into four 16-bit bands so near-duplicate lookups
+    can use indexes instead of comparing against every row.
+    """
+    phash = models.BigIntegerField()  # Signed 64-bit storage of the unsigned dHash
+    band0 = models.IntegerField(db_index=True)
+    band1 = models.IntegerField(db_index=True)
+    band2 = models.IntegerField(db_index=True)
+    band3 = models.IntegerField(db_index=True)
+    inputs_digest = models.CharField(max_length=64)  # SHA-256 of the user-supplied hints
+    analysis = models.JSONField()  # Shared by all users, so no photo URL is kept alongside
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.analysis.get('beverage_name', 'Unknown drink')} ({self.hits} hits)"
+
+
+class DrinkAnalysisJob(models.Model):
+    """
+    A queued drink photo analysis. The photo is kept in the row until the job
+    finishes, so pending work survives restarts without an outside broker.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="drink_analysis_jobs")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+
+    # Inputs (image is cleared once the job finishes)
+    image = models.BinaryField(blank=True, null=True)
+    image_name = models.CharField(max_length=255)
+    additional_inputs = models.JSONField(default=dict, blank=True)
+    additional_notes = models.TextField(blank=True, default="")
+
+    # Scheduling
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    available_at = models.DateTimeField(default=timezone.now)  # Not picked up before this (retry backoff)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)  # Running jobs past this were abandoned
+
+    # Outcome
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="ai_job_status_available_idx"),
+            models.Index(fields=["user", "status"], name="ai_job_user_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Drink analysis {self.id} for {self.user.username} ({self.status})"
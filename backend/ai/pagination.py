@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ChatMessageCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a user's chat history, newest first, served by the
+    (user, timestamp) index however far back the client scrolls.
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-timestamp", "-id")
@@ -0,0 +1,30 @@
+from rest_framework import serializers
+from .models import ChatMessage, DrinkAnalysisJob
+
+
+class DrinkAnalysisJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DrinkAnalysisJob
+        fields = [
+            "id",
+            "status",
+            "attempts",
+            "max_attempts",
+            "result",
+            "error",
+            "created_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatMessage
+        fields = [
+            "id",
+            "message",
+            "response",
+            "timestamp",
+        ]
+        read_only_fields = fields
@@ -1,3 +1,570 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import math
+from concurrent.futures import Future
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import PIL.Image
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.timezone import now
+from google.genai import types
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from caffeine import services
+from caffeine.models import CaffeineLog
+from users.models import User
+
+from . import answer_cache, drink_pipeline, gemini_helper, image_cache, jobs, memory
+from .drink_pipeline import DrinkAnalysisError
+from .governor import CircuitBreaker, GeminiGovernor, GeminiUnavailable, TokenBucket
+from .models import ChatMessage, ChatSummary, DrinkAnalysisCache, DrinkAnalysisJob
+from .views import build_chat_prompt
+
+ANALYSIS = {
+    "beverage_name": "Test Cola",
+    "serving_size": "12 fl oz (355ml)",
+    "caffeine_mg": 34,
+    "total_fat_g": 0,
+    "sodium_mg": 45,
+    "total_carbohydrates_g": 39,
+    "sugars_g": 39,
+    "added_sugars_g": 39,
+    "protein_g": 0,
+    "taurine_mg": None,
+    "calories_kcal": 140,
+    "b_vitamins": None,
+    "other_ingredients": [{"name": "carbonated_water", "amount": None}],
+}
+
+
+def make_user(email="user@example.com"):
+    return User.objects.create_user(email=email, password="password", username=email.split("@")[0])
+
+
+@override_settings(DRINK_JOBS_IN_PROCESS=False, DRINK_JOB_MAX_ATTEMPTS=2, DRINK_JOB_RETRY_BACKOFF_SECONDS=5)
+class DrinkJobTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def enqueue(self, user=None):
+        return jobs.enqueue(user or self.user, b"photo", "drink.jpg", {}, "")
+
+    def test_a_job_is_claimed_once(self):
+        job = self.enqueue()
+        claimed = jobs.claim_next()
+        self.assertEqual((claimed.id, claimed.status, claimed.attempts), (job.id, DrinkAnalysisJob.RUNNING, 1))
+        self.assertIsNotNone(claimed.lease_expires_at)
+        self.assertIsNone(jobs.claim_next())
+
+    @mock.patch("ai.jobs.analyze_drink")
+    def test_success_saves_a_draft_and_drops_the_photo(self, analyze):
+        analyze.return_value = {"image_url": "https://example.com/drink.jpg", "analysis": dict(ANALYSIS), "cached": False}
+        self.enqueue()
+        jobs.run_job(jobs.claim_next())
+
+        job = DrinkAnalysisJob.objects.get()
+        self.assertEqual(job.status, DrinkAnalysisJob.SUCCEEDED)
+        self.assertIsNone(job.image)
+        self.assertIsNotNone(job.finished_at)
+        log = CaffeineLog.objects.get(user=self.user)
+        self.assertFalse(log.confirmed)
+        self.assertEqual(job.result["log"]["id"], str(log.pk))
+
+    @mock.patch("ai.jobs.analyze_drink")
+    def test_retryable_failure_backs_off_then_fails(self, analyze):
+        analyze.side_effect = DrinkAnalysisError("Gemini is busy.", status_code=503, retry_after=60)
+        self.enqueue()
+        jobs.run_job(jobs.claim_next())
+
+        job = DrinkAnalysisJob.objects.get()
+        self.assertEqual((job.status, job.error), (DrinkAnalysisJob.QUEUED, "Gemini is busy."))
+        self.assertGreater(job.available_at, now() + timedelta(seconds=55))  # retry_after beats the 5s backoff
+        self.assertIsNone(jobs.claim_next())
+
+        DrinkAnalysisJob.objects.update(available_at=now())
+        jobs.run_job(jobs.claim_next())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (DrinkAnalysisJob.FAILED, 2))
+        self.assertIsNone(job.image)
+
+    @mock.patch("ai.jobs.analyze_drink")
+    def test_permanent_failure_is_not_retried(self, analyze):
+        analyze.side_effect = DrinkAnalysisError("Not a drink.", status_code=400, retryable=False)
+        self.enqueue()
+        jobs.run_job(jobs.claim_next())
+        job = DrinkAnalysisJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (DrinkAnalysisJob.FAILED, 1))
+
+    def test_expired_lease_is_reclaimed_then_failed(self):
+        self.enqueue()
+        jobs.claim_next()
+        DrinkAnalysisJob.objects.update(lease_expires_at=now() - timedelta(seconds=1))
+        self.assertEqual(jobs.claim_next().attempts, 2)
+
+        DrinkAnalysisJob.objects.update(lease_expires_at=now() - timedelta(seconds=1))
+        self.assertIsNone(jobs.claim_next())  # Last attempt: failed instead of re-claimed
+        job = DrinkAnalysisJob.objects.get()
+        self.assertEqual(job.status, DrinkAnalysisJob.FAILED)
+        self.assertIsNone(job.image)
+
+    @override_settings(DRINK_JOB_MAX_PENDING_PER_USER=2)
+    def test_pending_limit_is_per_user(self):
+        self.enqueue()
+        self.enqueue()
+        with self.assertRaises(jobs.JobLimitExceeded):
+            self.enqueue()
+        self.enqueue(make_user("other@example.com"))
+
+    def test_finished_jobs_are_purged(self):
+        old, recent = self.enqueue(), self.enqueue()
+        DrinkAnalysisJob.objects.update(status=DrinkAnalysisJob.SUCCEEDED, finished_at=now() - timedelta(days=8))
+        DrinkAnalysisJob.objects.filter(pk=recent.pk).update(finished_at=now())
+        self.assertEqual(jobs.purge_finished(), 1)
+        self.assertFalse(DrinkAnalysisJob.objects.filter(pk=old.pk).exists())
+
+    def test_api_queues_and_scopes_jobs(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+        photo = SimpleUploadedFile("drink.jpg", b"photo", content_type="image/jpeg")
+        response = client.post("/api/ai/jobs/", {"image": photo, "additional_notes": "iced"}, format="multipart")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], DrinkAnalysisJob.QUEUED)
+        self.assertEqual(client.get(response.json()["status_url"]).json()["id"], response.json()["id"])
+
+        theirs = self.enqueue(make_user("other@example.com"))
+        self.assertEqual(client.get(f"/api/ai/jobs/{theirs.pk}/").status_code, 404)
+
+
+class ChatAnswerCacheTests(TestCase):
+    QUESTION = "How much caffeine have I had today?"
+
+    def setUp(self):
+        caches[answer_cache.CACHE_ALIAS].clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+        self.governor = mock.Mock()
+        self.governor.generate.side_effect = lambda *args, **kwargs: SimpleNamespace(
+            text=f"answer {self.governor.generate.call_count}"
+        )
+        patcher = mock.patch("ai.views.get_governor", return_value=self.governor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, question=QUESTION):
+        response = self.client.post("/api/ai/chat/sync/", {"message": question}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_key_normalizes_the_question(self):
+        self.assertEqual(answer_cache.cache_key(self.user, "How much caffeine, today?"),
+                         answer_cache.cache_key(self.user, "how much  CAFFEINE today"))
+        self.assertIsNone(answer_cache.cache_key(self.user, "and yesterday?"))
+
+    def test_key_follows_data_and_conversation(self):
+        key = answer_cache.cache_key(self.user, self.QUESTION, "")
+        self.assertNotEqual(answer_cache.cache_key(self.user, self.QUESTION, "User: hi\nAssistant: hello"), key)
+        log = CaffeineLog.objects.create(user=self.user, caffeine_mg=95, created_at=now(), confirmed=True)
+        services.log_created(log)
+        self.assertNotEqual(answer_cache.cache_key(self.user, self.QUESTION, ""), key)
+
+    def test_repeat_in_a_fresh_conversation_is_a_hit(self):
+        self.assertEqual(self.ask(), {"response": "answer 1", "cached": False})
+        memory.clear(self.user)
+        self.assertEqual(self.ask(), {"response": "answer 1", "cached": True})
+        self.assertEqual(self.governor.generate.call_count, 1)
+
+    def test_repeat_later_in_the_conversation_is_a_miss(self):
+        self.ask()
+        self.assertEqual(self.ask(), {"response": "answer 2", "cached": False})  # The first exchange is in the prompt
+
+    def test_new_log_invalidates(self):
+        self.ask()
+        memory.clear(self.user)
+        log = CaffeineLog.objects.create(user=self.user, caffeine_mg=95, created_at=now(), confirmed=True)
+        services.log_created(log)
+        self.assertEqual(self.ask(), {"response": "answer 2", "cached": False})
+
+
+@override_settings(CHAT_MEMORY_RECENT_MESSAGES=2, CHAT_MEMORY_SUMMARY_BATCH=2)
+class ChatMemoryTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.governor = mock.Mock()
+        self.governor.generate.return_value = SimpleNamespace(text="Prefers tea after noon.")
+        patcher = mock.patch("ai.memory.get_governor", return_value=self.governor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_exchanges(self, count):
+        start = now() - timedelta(hours=1)
+        existing = ChatMessage.objects.filter(user=self.user).count()
+        for number in range(existing, existing + count):
+            message = ChatMessage.objects.create(user=self.user, message=f"question {number}", response=f"answer {number}")
+            ChatMessage.objects.filter(pk=message.pk).update(timestamp=start + timedelta(minutes=number))
+
+    def test_recent_exchanges_are_verbatim(self):
+        self.assertEqual(memory.render(self.user), "")
+        self.add_exchanges(3)
+        rendered = memory.render(self.user)
+        self.assertNotIn("question 0", rendered)
+        self.assertLess(rendered.index("question 1"), rendered.index("question 2"))
+
+    def test_summary_waits_for_a_full_batch(self):
+        self.add_exchanges(3)  # One behind the verbatim window
+        self.assertFalse(memory.summarize(self.user))
+        self.governor.generate.assert_not_called()
+
+    def test_batch_is_folded_into_the_summary(self):
+        self.add_exchanges(4)
+        self.assertTrue(memory.summarize(self.user))
+        prompt = self.governor.generate.call_args.args[1][0]
+        self.assertIn("question 1", prompt)
+        self.assertNotIn("question 2", prompt)
+
+        summary = ChatSummary.objects.get(user=self.user)
+        self.assertEqual(summary.messages_covered, 2)
+        rendered = memory.render(self.user)
+        self.assertIn("Prefers tea after noon.", rendered)
+        self.assertNotIn("question 1", rendered)
+        self.assertIn("question 3", rendered)
+        self.assertFalse(memory.summarize(self.user))  # Nothing new to fold
+
+    @mock.patch("ai.memory._summary_executor")
+    def test_recording_past_the_threshold_starts_a_summary(self, executor):
+        self.add_exchanges(3)
+        memory.record_exchange(self.user, "question 3", "answer 3")
+        executor.submit.assert_not_called()
+        memory.record_exchange(self.user, "question 4", "answer 4")
+        executor.submit.assert_called_once()
+        memory.record_exchange(self.user, "question 5", "answer 5")
+        executor.submit.assert_called_once()  # Already queued for this user
+        memory._summarizing.discard(self.user.pk)
+
+    def test_history_api(self):
+        self.add_exchanges(3)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+        body = client.get("/api/ai/chat/history/?page_size=2").json()
+        self.assertEqual([row["message"] for row in body["results"]], ["question 2", "question 1"])
+        self.assertIsNotNone(body["next"])
+        self.assertEqual(client.delete("/api/ai/chat/history/").status_code, 204)
+        self.assertEqual(memory.render(self.user), "")
+
+
+class ChatPromptTests(TestCase):
+    def test_times_are_in_the_users_time_zone(self):
+        user = User.objects.create_user(email="tz@example.com", password="password", username="tz",
+                                        timezone="Europe/Berlin")
+        log = CaffeineLog.objects.create(user=user, caffeine_mg=95, beverage_name="Coffee",
+                                         created_at=now() - timedelta(hours=1), confirmed=True)
+        services.log_created(log)
+        prompt = build_chat_prompt(user, "When did I last have coffee?", "")
+        self.assertRegex(prompt, r"CES?T")
+        self.assertNotIn("EST", prompt.replace("CEST", ""))
+
+
+def fake_client(**kwargs):
+    client = mock.MagicMock(name="genai.Client")
+    client.aio.aclose = mock.AsyncMock()
+    client.aio.models.generate_content = mock.AsyncMock(return_value="answer")
+    return client
+
+
+@mock.patch("ai.gemini_helper.genai.Client", side_effect=fake_client)
+class GeminiClientManagerTests(SimpleTestCase):
+    def test_sync_leases_reuse_clients(self, client_class):
+        manager = gemini_helper.GeminiClientManager("key", pool_size=2)
+        with manager.lease() as first:
+            with manager.lease() as second:
+                self.assertIsNot(first, second)
+        with manager.lease() as again:
+            self.assertIs(again, first)  # The warmest: returned last
+        self.assertEqual(client_class.call_count, 2)
+
+    def test_pool_size_caps_leases(self, client_class):
+        manager = gemini_helper.GeminiClientManager("key", pool_size=1, acquire_timeout=0.01)
+        with manager.lease():
+            with self.assertRaises(TimeoutError):
+                with manager.lease():
+                    pass
+
+    def test_async_clients_stay_on_their_loop(self, client_class):
+        manager = gemini_helper.GeminiClientManager("key", pool_size=2)
+
+        async def two_calls():
+            async with manager.alease() as first:
+                pass
+            async with manager.alease() as second:
+                pass
+            return first, second
+
+        first, second = asyncio.run(two_calls())
+        self.assertIs(first, second)
+        other, _ = asyncio.run(two_calls())  # A new loop gets its own client
+        self.assertIsNot(other, first)
+        with manager.lease() as sync_client:
+            self.assertNotIn(sync_client, (first, other))
+
+    def test_shutdown_closes_idle_and_returned_clients(self, client_class):
+        manager = gemini_helper.GeminiClientManager("key", pool_size=2)
+        with manager.lease() as leased:
+            with manager.lease() as idle:
+                pass
+            manager.shutdown()
+            idle.close.assert_called_once()
+            leased.close.assert_not_called()
+        leased.close.assert_called_once()
+        with self.assertRaises(RuntimeError):
+            with manager.lease():
+                pass
+
+    def test_config_is_copied(self, client_class):
+        manager = gemini_helper.GeminiClientManager("key")
+        config = types.GenerateContentConfig(temperature=0.2)
+        copied = manager._config(config, timeout=5)
+        self.assertIsNone(config.http_options)
+        self.assertEqual((copied.temperature, copied.http_options.timeout), (0.2, 5000))
+
+    @override_settings(GEMINI_API_KEY="shared", GEMINI_POOL_SIZE=1, GEMINI_BASE_URL=None)
+    def test_one_off_key_client_is_closed(self, client_class):
+        created = []
+        client_class.side_effect = lambda **kwargs: created.append(fake_client(**kwargs)) or created[-1]
+        gemini_helper.shutdown_gemini_clients()
+        try:
+            gemini_helper.generate_content_with_gemini("own key", "gemini-2.0-flash", ["hi"])
+        finally:
+            gemini_helper.shutdown_gemini_clients()
+        self.assertEqual([call.kwargs["api_key"] for call in client_class.call_args_list], ["own key"])
+        created[0].close.assert_called_once()
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=1, burst=2)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertIsNone(bucket.reserve())  # Nothing reserved
+        self.assertGreater(bucket.retry_after(), 0.9)
+
+        wait = bucket.reserve(max_wait=2)
+        self.assertAlmostEqual(wait, 1.0, places=1)
+        self.assertAlmostEqual(bucket.reserve(max_wait=5), 2.0, places=1)  # Queued behind the first
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def open_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=30)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        return breaker
+
+    def expire_cooldown(self, breaker):
+        breaker.opened_at -= breaker.cooldown
+
+    def test_closed_admits_without_probe(self):
+        self.assertEqual(CircuitBreaker(2, 30).admit(), (None, None))
+
+    def test_success_resets_the_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_rejects_until_the_cooldown_ends(self):
+        breaker = self.open_breaker()
+        wait, probe = breaker.admit()
+        self.assertGreater(wait, 29)
+        self.assertIsNone(probe)
+
+    def test_half_open_admits_a_single_probe(self):
+        breaker = self.open_breaker()
+        self.expire_cooldown(breaker)
+        wait, probe = breaker.admit()
+        self.assertIsNone(wait)
+        self.assertIsNotNone(probe)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(breaker.admit(), (30, None))
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.admit(), (None, None))
+
+    def test_failed_probe_reopens(self):
+        breaker = self.open_breaker()
+        self.expire_cooldown(breaker)
+        breaker.admit()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertGreater(breaker.admit()[0], 29)
+
+    def test_released_probe_frees_the_slot(self):
+        breaker = self.open_breaker()
+        self.expire_cooldown(breaker)
+        _, probe = breaker.admit()
+        breaker.release_probe(None)  # Calls that were not the probe release nothing
+        self.assertEqual(breaker.admit(), (30, None))
+        breaker.release_probe(probe)
+        wait, second = breaker.admit()
+        self.assertIsNone(wait)
+        self.assertIsNotNone(second)
+        breaker.release_probe(probe)  # A stale token does not free the new probe
+        self.assertEqual(breaker.admit(), (30, None))
+
+
+class FakeManager:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else SimpleNamespace(text="ok")
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@override_settings(
+    GEMINI_BREAKER_FAILURES=2,
+    GEMINI_BREAKER_COOLDOWN_SECONDS=30,
+    GEMINI_RETRY_ATTEMPTS=3,
+    GEMINI_RETRY_BASE_SECONDS=0,
+    GEMINI_RETRY_MAX_SECONDS=0,
+    GEMINI_GLOBAL_RATE_PER_SECOND=1000,
+    GEMINI_GLOBAL_BURST=1000,
+    GEMINI_USER_RATE_PER_MINUTE=60,
+    GEMINI_USER_BURST=2,
+)
+class GeminiGovernorTests(SimpleTestCase):
+    def test_transient_failures_are_retried(self):
+        manager = FakeManager(httpx.ConnectTimeout("slow"), SimpleNamespace(text="ok"))
+        governor = GeminiGovernor(manager)
+        self.assertEqual(governor.generate("model", ["hi"]).text, "ok")
+        self.assertEqual(manager.calls, 2)
+        self.assertEqual(governor.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_repeated_failures_open_the_breaker(self):
+        manager = FakeManager(*[httpx.ConnectTimeout("down")] * 3)
+        governor = GeminiGovernor(manager)
+        with self.assertRaises(GeminiUnavailable) as raised:
+            governor.generate("model", ["hi"])
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(manager.calls, 2)  # No retry once the breaker opened
+        self.assertEqual(governor.breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(GeminiUnavailable) as raised:
+            governor.generate("model", ["other"])
+        self.assertGreater(raised.exception.retry_after, 0)
+        self.assertEqual(manager.calls, 2)
+
+    def test_probe_is_released_when_the_call_errors(self):
+        governor = GeminiGovernor(FakeManager(ValueError("bad request")))
+        governor.breaker.state = CircuitBreaker.OPEN
+        with self.assertRaises(ValueError):
+            governor.generate("model", ["hi"])  # The half-open probe, rejected for its own reasons
+        self.assertEqual(governor.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(governor.generate("model", ["hi"]).text, "ok")
+        self.assertEqual(governor.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_per_user_limit(self):
+        governor = GeminiGovernor(FakeManager())
+        governor.generate("model", ["a"], user_key="u1")
+        governor.generate("model", ["b"], user_key="u1")
+        with self.assertRaises(GeminiUnavailable) as raised:
+            governor.generate("model", ["c"], user_key="u1")
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertGreater(raised.exception.retry_after, 0)
+        governor.generate("model", ["c"], user_key="u2")  # Other users are unaffected
+
+
+def photo_bytes(marker=0):
+    """A wavy test pattern; ``marker`` changes a corner, so the bytes differ but the dHash does not."""
+    image = PIL.Image.new("L", (256, 256))
+    image.putdata([int(127 + 127 * math.sin(x / 17) * math.cos(y / 23)) for y in range(256) for x in range(256)])
+    image = image.convert("RGB")
+    for x in range(marker):
+        image.putpixel((x, 0), (255, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def finished_upload(data, file_key, content_type, timer=None):
+    future = Future()
+    future.set_result(drink_pipeline.public_url(file_key))
+    return future
+
+
+class ImageCacheTests(TestCase):
+    def test_lookup_within_threshold_and_same_hints(self):
+        phash = 0x0123456789ABCDEF
+        digest = image_cache.inputs_digest({}, "")
+        image_cache.store(phash, digest, ANALYSIS)
+
+        self.assertIsNotNone(image_cache.lookup(phash ^ 0b111, digest, threshold=6))
+        self.assertIsNone(image_cache.lookup(phash ^ 0b1111111, digest, threshold=6))
+        self.assertIsNone(image_cache.lookup(phash, image_cache.inputs_digest({}, "decaf")))
+
+    def test_entries_keep_no_photo(self):
+        fields = {field.name for field in DrinkAnalysisCache._meta.get_fields()}
+        self.assertNotIn("image_url", fields)
+
+    @mock.patch.object(drink_pipeline, "upload_image_async", side_effect=finished_upload)
+    @mock.patch.object(drink_pipeline, "get_governor")
+    def test_hit_links_the_callers_own_photo(self, get_governor, upload):
+        get_governor.return_value.generate.return_value = SimpleNamespace(text=json.dumps(ANALYSIS))
+
+        first = drink_pipeline.analyze_drink(photo_bytes(), "a.png", {}, "", user_key="a")
+        second = drink_pipeline.analyze_drink(photo_bytes(8), "b.png", {}, "", user_key="b")
+
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(get_governor.return_value.generate.call_count, 1)
+        self.assertEqual(second["analysis"], first["analysis"])
+        self.assertNotEqual(second["image_url"], first["image_url"])
+        uploaded = [drink_pipeline.public_url(call.args[1]) for call in upload.call_args_list]
+        self.assertEqual(uploaded, [first["image_url"], second["image_url"]])
+
+
+class DraftLogTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="draft@example.com", password="password", username="draft")
+
+    def test_valid_analysis_is_saved_unconfirmed(self):
+        payload = {"image_url": "https://r2.example.com/a.webp", "analysis": dict(ANALYSIS), "cached": False}
+        payload["analysis"]["other_ingredients"] = {"carbonated_water": True}
+        drink_pipeline.save_draft_log(self.user, payload, "iced")
+        log = CaffeineLog.objects.get(pk=payload["log"]["id"])
+        self.assertFalse(log.confirmed)
+        self.assertEqual(log.additional_notes, "iced")
+
+    def test_invalid_analysis_is_reported(self):
+        payload = {"image_url": "https://r2.example.com/a.webp", "analysis": {**ANALYSIS, "caffeine_mg": None}}
+        drink_pipeline.save_draft_log(self.user, payload)
+        self.assertIsNone(payload["log"])
+        self.assertIn("caffeine_mg", payload["log_errors"])
+
+    def test_stale_drafts_are_purged(self):
+        stale = CaffeineLog.objects.create(
+            user=self.user, caffeine_mg=10, confirmed=False, created_at=now() - timedelta(days=2)
+        )
+        fresh = CaffeineLog.objects.create(user=self.user, caffeine_mg=10, confirmed=False)
+        kept = CaffeineLog.objects.create(
+            user=self.user, caffeine_mg=10, confirmed=True, created_at=now() - timedelta(days=2)
+        )
+        self.assertEqual(drink_pipeline.purge_drafts(older_than=24 * 3600), 1)
+        self.assertEqual(
+            set(CaffeineLog.objects.values_list("pk", flat=True)), {fresh.pk, kept.pk}
+        )
+        self.assertFalse(CaffeineLog.objects.filter(pk=stale.pk).exists())
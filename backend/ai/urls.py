@@ -1,7 +1,28 @@
 from django.urls import path
-from .views import SubmitDrinkAPIView, GeminiChatView
+from .views import (
+    SubmitDrinkAPIView,
+    DrinkAnalysisJobCreateAPIView,
+    DrinkAnalysisJobDetailAPIView,
+    DrinkAnalysisCacheStatsView,
+    ChatAnswerCacheStatsView,
+    ChatHistoryAPIView,
+    GeminiChatView,
+    GeminiGovernorStatsView,
+    gemini_chat,
+    gemini_chat_stream,
+    submit_drink,
+)
 
 urlpatterns = [
-    path('submit-drink/', SubmitDrinkAPIView.as_view(), name='submit-drink'),
-    path('chat/', GeminiChatView.as_view(), name='gemini-chat'),
+    path('submit-drink/', submit_drink, name='submit-drink'),  # Async; Gemini calls don't hold a worker thread
+    path('submit-drink/sync/', SubmitDrinkAPIView.as_view(), name='submit-drink-sync'),
+    path('jobs/', DrinkAnalysisJobCreateAPIView.as_view(), name='drink-analysis-job-create'),  # Queue a photo, returns 202
+    path('jobs/<uuid:pk>/', DrinkAnalysisJobDetailAPIView.as_view(), name='drink-analysis-job-detail'),  # Poll status / result
+    path('submit-drink/cache-stats/', DrinkAnalysisCacheStatsView.as_view(), name='submit-drink-cache-stats'),
+    path('chat/', gemini_chat, name='gemini-chat'),  # Async
+    path('chat/sync/', GeminiChatView.as_view(), name='gemini-chat-sync'),
+    path('chat/stream/', gemini_chat_stream, name='gemini-chat-stream'),  # Server-sent events
+    path('chat/cache-stats/', ChatAnswerCacheStatsView.as_view(), name='gemini-chat-cache-stats'),
+    path('chat/history/', ChatHistoryAPIView.as_view(), name='gemini-chat-history'),  # Paginated; DELETE to forget
+    path('gemini-stats/', GeminiGovernorStatsView.as_view(), name='gemini-governor-stats'),  # Rate limits, retries, breaker
 ]
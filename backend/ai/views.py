@@ -1,16 +1,27 @@
 import json
-import requests
-from io import BytesIO
-import PIL.Image
+import math
 from caffeine.models import CaffeineLog
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import permissions, status, parsers
+from rest_framework import generics, permissions, status, parsers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
 from django.conf import settings
-from botocore.config import Config
-import boto3
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
 
-from .gemini_helper import generate_content_with_gemini
+from api import metrics
+from . import answer_cache, image_cache, jobs, memory
+from .context import ChatContextBuilder
+from .drink_pipeline import DrinkAnalysisError, StageTimer, aanalyze_drink, analyze_drink, save_draft_log
+from .governor import GeminiUnavailable, get_governor
+from .models import ChatMessage, DrinkAnalysisJob
+from .pagination import ChatMessageCursorPagination
+from .serializers import ChatMessageSerializer, DrinkAnalysisJobSerializer
 
 class SubmitDrinkAPIView(APIView):
     """
@@ -19,177 +30,187 @@ class SubmitDrinkAPIView(APIView):
       - Optional additional inputs (beverage_size_ml, sugar_content_g, calories_kcal)
       - additional_notes (free text)
 
-    Instead of relying on the default_storage or S3Boto3Storage,
-    we explicitly upload the file to R2 via boto3, verify the upload,
-    and construct the final public URL. Then we pass this URL to Gemini for analysis.
+    The image is analysed by Gemini straight from the in-memory upload while
+    the same bytes are uploaded to R2 via boto3 in the background. Checking the
+    uploaded object is optional (DRINK_UPLOAD_VERIFY) and never blocks the
+    response. Per-stage timings are returned in the Server-Timing header.
+
+    The analysis is saved as an unconfirmed CaffeineLog, returned as "log";
+    PATCH ``/api/caffeine/logs/<id>/`` with {"confirmed": true} to count it.
     """
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
 
     def post(self, request):
-        # 1. Debug: Print the relevant storage configuration from settings
-        print("=== [DEBUG] STORAGE CONFIGURATION (SETTINGS) ===")
-        print(f"DEFAULT_FILE_STORAGE: {settings.DEFAULT_FILE_STORAGE}")
-        print(f"INSTALLED_APPS: {settings.INSTALLED_APPS}")
-        print(f"AWS_STORAGE_BUCKET_NAME: {settings.AWS_STORAGE_BUCKET_NAME}")
-        print(f"AWS_S3_ENDPOINT_URL: {settings.AWS_S3_ENDPOINT_URL}")
-        print(f"AWS_S3_CUSTOM_DOMAIN: {settings.AWS_S3_CUSTOM_DOMAIN}")
-        
-        # 2. Retrieve the image from the request
+        timer = StageTimer()
+
+        # 1. Retrieve the image from the request
         image_file = request.FILES.get("image")
         if not image_file:
             return Response({"error": "Image file is required."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        print(f"=== [DEBUG] Received image: {image_file.name}, "
-              f"content_type={image_file.content_type}, size={image_file.size} bytes ===")
 
-        # 3. Create a direct boto3 S3 client for Cloudflare R2
-        try:
-            s3 = boto3.client(
-                's3',
-                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                config=Config(signature_version='s3v4')
-            )
-            print("=== [DEBUG] Successfully created S3 client for R2 ===")
-        except Exception as e:
-            print(f"=== [DEBUG] Failed to create S3 client: {str(e)} ===")
-            return Response({"error": f"Cannot create S3 client: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # 2. Collect additional inputs for AI analysis
+        additional_inputs = collect_additional_inputs(request.data)
+        additional_notes = request.data.get("additional_notes", "")
 
-        # 4. Upload the file directly using boto3
-        file_key = f"uploads/caffeine_drinks/{image_file.name}"
+        # 3. Analyse the in-memory image while it uploads to R2 (see ai/drink_pipeline.py)
+        with timer.stage("read"):
+            image_bytes = image_file.read()
         try:
-            print(f"=== [DEBUG] Attempting direct upload to R2 with key: {file_key} ===")
-            s3.upload_fileobj(
-                image_file,
-                settings.AWS_STORAGE_BUCKET_NAME,
-                file_key,
-                ExtraArgs={'ACL': 'public-read'}
+            final_response = analyze_drink(
+                image_bytes, image_file.name, additional_inputs, additional_notes, timer, user_key=request.user.pk,
             )
-            print("=== [DEBUG] Upload succeeded (boto3.upload_fileobj) ===")
-        except Exception as e:
-            print(f"=== [DEBUG] Upload error: {str(e)} ===")
-            return Response({"error": f"Failed to upload file: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except DrinkAnalysisError as e:
+            return _with_retry_after(Response({"error": e.message}, status=e.status_code), e.retry_after)
 
-        # 5. Verify the object exists in R2
-        try:
-            s3.head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)
-            print(f"=== [DEBUG] File verified in R2: {file_key} ===")
-        except Exception as e:
-            print(f"=== [DEBUG] File not found in R2 after upload: {str(e)} ===")
+        # 4. Store the analysis as a draft log for the client to confirm
+        with timer.stage("save"):
+            final_response = save_draft_log(request.user, final_response, additional_notes)
 
-        # 6. Construct the public URL using your custom domain
-        # e.g. https://r2.lucasdoell.dev/uploads/caffeine_drinks/<filename>
-        image_url = f"https://{settings.AWS_S3_CUSTOM_DOMAIN}/{file_key}"
-        print(f"=== [DEBUG] Constructed image_url: {image_url} ===")
+        return self._respond(final_response, timer)
+
+    def _respond(self, data, timer):
+        data["timings_ms"] = timer.as_ms()
+        response = Response(data, status=status.HTTP_200_OK)
+        response["Server-Timing"] = timer.server_timing()
+        return response
 
-        # 7. Test URL accessibility (HEAD request)
-        try:
-            head_resp = requests.head(image_url)
-            print(f"=== [DEBUG] URL HEAD status: {head_resp.status_code}, length={head_resp.headers.get('Content-Length')} ===")
-        except Exception as e:
-            print(f"=== [DEBUG] HEAD request to {image_url} failed: {str(e)} ===")
-
-        # 8. Collect additional inputs for AI analysis
-        additional_inputs = {
-            "beverage_size_ml": request.data.get("beverage_size_ml"),
-            "sugar_content_g": request.data.get("sugar_content_g"),
-            "calories_kcal": request.data.get("calories_kcal")
-        }
-        # Filter out None values
-        additional_inputs = {k: v for k, v in additional_inputs.items() if v is not None}
-        additional_notes = request.data.get("additional_notes", "")
 
-        print(f"=== [DEBUG] Additional inputs: {additional_inputs} ===")
-        print(f"=== [DEBUG] Additional notes: {additional_notes} ===")
-
-        # 9. Construct a prompt for Gemini that references the image_url
-        # Constructing a strict JSON-enforced prompt for Gemini
-        prompt = (
-            "You will analyze an image of a drink and return a **strictly formatted JSON object** with its nutritional details. "
-            "Ensure that the response is **always** in **valid JSON** format, without any additional text, comments, or explanations. "
-            "Use **exact numerical values** (avoid ranges like '140-160mg'; always provide a single number). "
-            "Units should be included where applicable (e.g., mg, g, fl oz). **Follow this format strictly:**\n\n"
-            "{\n"
-            "  \"beverage_name\": \"Monster Energy Zero Ultra\",\n"
-            "  \"serving_size\": \"16 fl oz (473ml)\",\n"
-            "  \"calories\": 10,\n"
-            "  \"total_fat_g\": 0,\n"
-            "  \"sodium_mg\": 200,\n"
-            "  \"total_carbohydrates_g\": 3,\n"
-            "  \"sugars_g\": 0,\n"
-            "  \"added_sugars_g\": 0,\n"
-            "  \"protein_g\": 0,\n"
-            "  \"caffeine_mg\": 140,\n"
-            "  \"taurine_mg\": 1000,\n"
-            "  \"b_vitamins\": {\n"
-            "    \"vitamin_b3_mg\": 20,\n"
-            "    \"vitamin_b6_mg\": 5,\n"
-            "    \"vitamin_b12_mcg\": 3\n"
-            "  },\n"
-            "  \"other_ingredients\": {\n"
-            "    \"carbonated_water\": true,\n"
-            "    \"natural_flavors\": true,\n"
-            "    \"sucralose\": true\n"
-            "  },\n"
-            "  \"other_notes\": \"Zero Sugar, Carbonated\"\n"
-            "}\n\n"
-            "If any value is missing, estimate it based on similar drinks. Ensure **all keys are present**."
-            f"Additional inputs: {json.dumps(additional_inputs)}. "
-            f"Additional notes: {additional_notes}. "
-            f"Image URL: {image_url}."
+def _with_retry_after(response, seconds):
+    """Tell the client when to try again after a rate limit or an open circuit."""
+    if seconds is not None:
+        response["Retry-After"] = str(max(1, math.ceil(seconds)))
+    return response
+
+
+def collect_additional_inputs(data):
+    """Optional drink facts sent along with a photo, without the missing ones."""
+    additional_inputs = {
+        "beverage_size_ml": data.get("beverage_size_ml"),
+        "sugar_content_g": data.get("sugar_content_g"),
+        "calories_kcal": data.get("calories_kcal")
+    }
+    return {k: v for k, v in additional_inputs.items() if v is not None}
+
+
+@csrf_exempt
+@require_POST
+async def submit_drink(request):
+    """
+    Async variant of SubmitDrinkAPIView with the same fields and response.
+
+    Under ASGI the Gemini call and the upload wait suspend the coroutine
+    instead of holding a worker thread, so one worker process can have many
+    analyses in flight.
+    """
+    user, error = await _require_user(request)
+    if error is not None:
+        return error
+
+    image_file = request.FILES.get("image")
+    if not image_file:
+        return JsonResponse({"error": "Image file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    timer = StageTimer()
+    with timer.stage("read"):
+        image_bytes = image_file.read()
+    try:
+        data = await aanalyze_drink(
+            image_bytes, image_file.name,
+            collect_additional_inputs(request.POST), request.POST.get("additional_notes", ""), timer,
+            user_key=user.pk,
         )
+    except DrinkAnalysisError as e:
+        return _with_retry_after(JsonResponse({"error": e.message}, status=e.status_code), e.retry_after)
+    with timer.stage("save"):
+        data = await sync_to_async(save_draft_log)(user, data, request.POST.get("additional_notes", ""))
+
+    data["timings_ms"] = timer.as_ms()
+    response = JsonResponse(data, status=status.HTTP_200_OK)
+    response["Server-Timing"] = timer.server_timing()
+    return response
 
-        print(f"=== [DEBUG] Constructed prompt for Gemini:\n{prompt} ===")
 
-        # 10. Download the image from the constructed URL (only if needed by Gemini)
-        try:
-            dl_resp = requests.get(image_url)
-            print(f"=== [DEBUG] Downloaded image from {image_url}, status_code={dl_resp.status_code}, length={len(dl_resp.content)} bytes ===")
-            if dl_resp.status_code != 200:
-                return Response({"error": f"Image not accessible at {image_url} (status {dl_resp.status_code})"}, status=status.HTTP_400_BAD_REQUEST)
-            image = PIL.Image.open(BytesIO(dl_resp.content))
-            print("=== [DEBUG] PIL recognized the image ===")
-        except Exception as e:
-            print(f"=== [DEBUG] Error processing downloaded image: {str(e)} ===")
-            return Response({"error": f"Error processing downloaded image: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 11. Call Gemini for AI analysis
+class DrinkAnalysisJobCreateAPIView(APIView):
+    """
+    Queue a drink photo for analysis and return immediately.
+
+    Accepts the same multipart fields as SubmitDrinkAPIView and responds with
+    202 and the job id; poll ``jobs/<id>/`` for the result.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [parsers.MultiPartParser, parsers.FormParser]
+
+    def post(self, request):
+        image_file = request.FILES.get("image")
+        if not image_file:
+            return Response({"error": "Image file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        additional_inputs = collect_additional_inputs(request.data)
+
         try:
-            gemini_response = generate_content_with_gemini(
-                api_key=settings.GEMINI_API_KEY,
-                model="gemini-2.0-flash",
-                contents=[prompt, image]
+            job = jobs.enqueue(
+                request.user, image_file.read(), image_file.name,
+                additional_inputs, request.data.get("additional_notes", ""),
             )
-            response_text = gemini_response.text
-            print(f"=== [DEBUG] Gemini response text:\n{response_text} ===")
-        except Exception as e:
-            print(f"=== [DEBUG] Gemini API error: {e} ===")
-            return Response({"error": f"Gemini API error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except jobs.JobLimitExceeded as e:
+            return Response({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
 
-        # 12. Parse the AI response
-        try:
-            parsed_response = json.loads(response_text)
-            print("=== [DEBUG] Parsed Gemini response as JSON successfully ===")
-        except Exception:
-            parsed_response = {"raw_response": response_text}
-            print("=== [DEBUG] Failed to parse JSON; returning raw response ===")
+        data = DrinkAnalysisJobSerializer(job).data
+        data["status_url"] = reverse("drink-analysis-job-detail", kwargs={"pk": job.id})
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+class DrinkAnalysisJobDetailAPIView(generics.RetrieveAPIView):
+    """Status and, once finished, result of one of the user's analysis jobs."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = DrinkAnalysisJobSerializer
+
+    def get_queryset(self):
+        return DrinkAnalysisJob.objects.filter(user=self.request.user).defer("image")
+
+    def retrieve(self, request, *args, **kwargs):
+        if settings.DRINK_JOBS_IN_PROCESS:
+            jobs.get_runner().start()  # Resume queued work after a restart
+        return super().retrieve(request, *args, **kwargs)
+
+
+class DrinkAnalysisCacheStatsView(APIView):
+    """
+    Hit/miss counters for the drink analysis cache (this worker process) and
+    the number of stored analyses.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(image_cache.stats(), status=status.HTTP_200_OK)
 
-        # 13. Return the final results
-        final_response = {
-            "image_url": image_url,
-            "analysis": parsed_response
-        }
-        print(f"=== [DEBUG] Final response:\n{final_response} ===")
 
-        return Response(final_response, status=status.HTTP_200_OK)
+class ChatAnswerCacheStatsView(APIView):
+    """Hit/miss counters of the chat answer cache (this worker process)."""
+    permission_classes = [permissions.IsAdminUser]
 
+    def get(self, request):
+        return Response(answer_cache.stats(), status=status.HTTP_200_OK)
+
+
+class GeminiGovernorStatsView(APIView):
+    """
+    Circuit breaker state and the Gemini governor's counters (calls by
+    outcome, rate-limit rejections, coalesced calls, retries) for this
+    worker process.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_governor().stats(), status=status.HTTP_200_OK)
 
 
 class GeminiChatView(APIView):
     """
-    Endpoint for text-based chat responses from Gemini, with user data context.
+    Endpoint for text-based chat responses from Gemini, with user data context
+    and the conversation so far. Each exchange is stored (see ai/memory.py).
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -198,46 +219,210 @@ class GeminiChatView(APIView):
         if not user_input:
             return Response({"error": "Message field is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 1. Fetch user logs in descending order
-        logs = CaffeineLog.objects.filter(user=request.user).order_by("-created_at")
-
-        # 2. Format logs explicitly with clear timestamps
-        if logs.exists():
-            formatted_logs = []
-            for log in logs:
-                # Ensure accurate timestamp formatting with timezone awareness
-                date_str = log.created_at.strftime("%b %d, %I:%M %p %Z")  # Example: "Feb 23, 03:22 AM UTC"
-                beverage = log.beverage_name or "Unknown drink"
-                caffeine_mg = f"{int(log.caffeine_mg)} mg" if log.caffeine_mg else "Unknown caffeine amount"
-                sugar_g = f"{log.sugars_g} g sugar" if log.sugars_g is not None else "Unknown sugar content"
-
-                # Explicit tabular formatting
-                formatted_logs.append(f"- **{date_str}** | **{caffeine_mg}** from *{beverage}* | {sugar_g}")
-
-            logs_text = "\n".join(formatted_logs)
-        else:
-            logs_text = "No caffeine logs recorded."
-
-        # 3. Enhanced Prompt Engineering for Better AI Understanding
-        prompt = (
-            "You have access to the user's **caffeine intake history** with accurate timestamps.\n"
-            "Ensure all timestamps are converted to EST/EDT for consistency.\n\n"
-            "Use this data to provide insightful and accurate responses regarding their caffeine consumption:\n\n"
-            f"{logs_text}\n\n"
-            "Now, the user is asking:\n"
-            f"**{user_input}**\n\n"
-            "Provide a **personalized response** based on their logged caffeine consumption. Ensure accuracy with timestamps."
-        )
+        # 1. Answer a repeated question from the cache while the user's data and conversation are unchanged
+        conversation = memory.render(request.user)
+        cache_key = answer_cache.cache_key(request.user, user_input, conversation)
+        cached = answer_cache.lookup(cache_key)
+        if cached is not None:
+            memory.record_exchange(request.user, user_input, cached)
+            return Response({"response": cached, "cached": True}, status=status.HTTP_200_OK)
+
+        # 2. Build the prompt from the user's caffeine history
+        with metrics.span("chat_stage_seconds", stage="context"):
+            prompt = build_chat_prompt(request.user, user_input, conversation)
 
-        # 4. Call Gemini AI with structured context
+        # 3. Call Gemini AI with structured context
         try:
-            gemini_response = generate_content_with_gemini(
-                api_key=settings.GEMINI_API_KEY,
-                model="gemini-2.0-flash",
-                contents=[prompt]
-            )
+            with metrics.span("chat_stage_seconds", stage="gemini"):
+                gemini_response = get_governor().generate("gemini-2.0-flash", [prompt], user_key=request.user.pk)
             response_text = gemini_response.text
+        except GeminiUnavailable as e:
+            return _with_retry_after(Response({"error": e.message}, status=e.status_code), e.retry_after)
         except Exception as e:
             return Response({"error": f"Gemini API error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        return Response({"response": response_text}, status=status.HTTP_200_OK)
+
+        # 4. Remember the exchange for the next turn and the answer for repeats
+        memory.record_exchange(request.user, user_input, response_text)
+        answer_cache.store(cache_key, response_text)
+        return Response({"response": response_text, "cached": False}, status=status.HTTP_200_OK)
+
+
+class ChatHistoryAPIView(generics.ListAPIView):
+    """
+    The user's chat exchanges, newest first, one cursor page at a time
+    (``page_size``, default 20, max 100). DELETE forgets the conversation,
+    summary included.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ChatMessageSerializer
+    pagination_class = ChatMessageCursorPagination
+
+    def get_queryset(self):
+        return ChatMessage.objects.filter(user=self.request.user)  # Ordering is applied by the cursor paginator
+
+    def delete(self, request):
+        memory.clear(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@csrf_exempt
+@require_POST
+async def gemini_chat(request):
+    """Async variant of GeminiChatView: {"message": ...} in, {"response": ...} out."""
+    user, error = await _require_user(request)
+    if error is not None:
+        return error
+
+    user_input = _message_from_body(request)
+    if not user_input:
+        return JsonResponse({"error": "Message field is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    conversation = await sync_to_async(memory.render)(user)
+    cache_key = await sync_to_async(answer_cache.cache_key)(user, user_input, conversation)
+    cached = answer_cache.lookup(cache_key)
+    if cached is not None:
+        await sync_to_async(memory.record_exchange)(user, user_input, cached)
+        return JsonResponse({"response": cached, "cached": True}, status=status.HTTP_200_OK)
+
+    with metrics.span("chat_stage_seconds", stage="context"):
+        prompt = await sync_to_async(build_chat_prompt)(user, user_input, conversation)
+    try:
+        with metrics.span("chat_stage_seconds", stage="gemini"):
+            gemini_response = await get_governor().agenerate("gemini-2.0-flash", [prompt], user_key=user.pk)
+        response_text = gemini_response.text
+    except GeminiUnavailable as e:
+        return _with_retry_after(JsonResponse({"error": e.message}, status=e.status_code), e.retry_after)
+    except Exception as e:
+        return JsonResponse({"error": f"Gemini API error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    await sync_to_async(memory.record_exchange)(user, user_input, response_text)
+    answer_cache.store(cache_key, response_text)
+    return JsonResponse({"response": response_text, "cached": False}, status=status.HTTP_200_OK)
+
+
+def build_chat_prompt(user, user_input, conversation):
+    """
+    Build the Gemini chat prompt from the user's caffeine history, the
+    conversation so far (``memory.render(user)``) and the question.
+    """
+    # 1. Bounded summary of the user's history (recent logs, aggregates, current level)
+    logs_text = ChatContextBuilder(user).build()
+
+    # 2. Enhanced Prompt Engineering for Better AI Understanding
+    prompt = (
+        "You have access to the user's **caffeine intake history** with accurate timestamps.\n"
+        "All times are already in the user's local time zone; keep them that way.\n\n"
+        "Use this data to provide insightful and accurate responses regarding their caffeine consumption:\n\n"
+        f"{logs_text}\n\n"
+    )
+    # 3. Bounded conversation memory (rolling summary + last few exchanges)
+    if conversation:
+        prompt += f"Your conversation with the user so far:\n\n{conversation}\n\n"
+    prompt += (
+        "Now, the user is asking:\n"
+        f"**{user_input}**\n\n"
+        "Provide a **personalized response** based on their logged caffeine consumption. Ensure accuracy with timestamps."
+    )
+
+    return prompt
+
+
+def _sse(data, event=None):
+    """Format one server-sent event."""
+    payload = f"data: {json.dumps(data)}\n\n"
+    return f"event: {event}\n{payload}" if event else payload
+
+
+async def _authenticate(request):
+    """Run the configured DRF authenticators against a plain Django request."""
+    drf_request = Request(request)
+    for authenticator_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = await sync_to_async(authenticator_class().authenticate)(drf_request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+async def _require_user(request):
+    """Return ``(user, None)``, or ``(None, error_response)`` when not authenticated."""
+    try:
+        user = await _authenticate(request)
+    except AuthenticationFailed as e:
+        return None, JsonResponse({"error": str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if user is None or not user.is_active:
+        return None, JsonResponse({"error": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+    return user, None
+
+
+def _message_from_body(request):
+    try:
+        return json.loads(request.body or b"{}").get("message", "")
+    except (ValueError, AttributeError):
+        return ""
+
+
+@csrf_exempt
+@require_POST
+async def gemini_chat_stream(request):
+    """
+    Streaming variant of GeminiChatView.
+
+    Returns the answer as server-sent events (``data: {"text": ...}``) while
+    Gemini generates it, followed by a ``done`` event. Served as an async view,
+    so under ASGI no worker thread is held while waiting on the model.
+    """
+    user, error = await _require_user(request)
+    if error is not None:
+        return error
+
+    user_input = _message_from_body(request)
+    if not user_input:
+        return JsonResponse({"error": "Message field is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    conversation = await sync_to_async(memory.render)(user)
+    cache_key = await sync_to_async(answer_cache.cache_key)(user, user_input, conversation)
+    cached = answer_cache.lookup(cache_key)
+    stream = first = None
+    if cached is None:
+        prompt = await sync_to_async(build_chat_prompt)(user, user_input, conversation)
+        stream = get_governor().astream("gemini-2.0-flash", [prompt], user_key=user.pk)
+        try:
+            # Admission happens on the first chunk; take it before answering so rejections keep their status
+            first = await anext(stream, None)
+        except GeminiUnavailable as e:
+            return _with_retry_after(JsonResponse({"error": e.message}, status=e.status_code), e.retry_after)
+        except Exception as e:
+            return JsonResponse({"error": f"Gemini API error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def chunks():
+        try:
+            if first is not None:
+                yield first
+                async for chunk in stream:
+                    yield chunk
+        finally:
+            await stream.aclose()  # Ends the Gemini call right away if the client disconnects
+
+    async def events():
+        if stream is None:  # A cached answer arrives as a single chunk
+            await sync_to_async(memory.record_exchange)(user, user_input, cached)
+            yield _sse({"text": cached})
+            yield _sse({"cached": True}, event="done")
+            return
+        parts = []
+        try:
+            async for chunk in chunks():
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield _sse({"text": chunk.text})
+        except Exception as e:
+            yield _sse({"error": f"Gemini API error: {str(e)}"}, event="error")
+            return
+        response_text = "".join(parts)
+        await sync_to_async(memory.record_exchange)(user, user_input, response_text)
+        answer_cache.store(cache_key, response_text)
+        yield _sse({"cached": False}, event="done")
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Keep reverse proxies from buffering the stream
+    return response
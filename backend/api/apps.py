@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def _install_query_metrics(sender, connection, **kwargs):
+    from .middleware import record_query
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Lets RequestMetricsMiddleware count queries on every connection, in any thread
+        connection_created.connect(_install_query_metrics)
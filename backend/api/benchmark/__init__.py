@@ -0,0 +1,8 @@
+"""
+Scale and load testing tools.
+
+``manage.py benchmark`` seeds users (seed.py), replaces R2 and Gemini with
+local servers (standins.py) and drives the API's endpoints concurrently
+(runner.py). ``manage.py generate_synthetic_data`` fills the database with
+realistic history at production sizes (synthetic.py).
+"""
@@ -0,0 +1,179 @@
+"""
+Scenario definitions, the concurrent load loop and baseline comparison.
+
+Each scenario is one endpoint driven by ``concurrency`` clients until
+``requests`` responses have been collected. Queries per request are read
+from the ``db`` entry RequestMetricsMiddleware adds to ``Server-Timing``;
+for streamed responses that only covers the work done before the first byte.
+"""
+
+import asyncio
+import io
+import math
+import random
+import re
+import time
+import uuid
+
+import httpx
+from PIL import Image
+
+from .seed import DRINK_PREFIX, EMAIL_DOMAIN, PASSWORD
+
+_DB_TIMING = re.compile(r'db;desc="(\d+) queries"')
+QUERY_SLACK = 0.5
+
+
+def _random_photo(rng):
+    """A PNG of random blocks; no two share a perceptual hash, so the analysis cache never hits."""
+    grid = Image.frombytes("RGB", (8, 8), bytes(rng.getrandbits(8) for _ in range(8 * 8 * 3)))
+    buffer = io.BytesIO()
+    grid.resize((640, 480), Image.NEAREST).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class Scenario:
+    def __init__(self, name, method, path, build=None, expect=(200,)):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.build = build or (lambda user, rng: {})
+        self.expect = expect
+
+
+SCENARIOS = [
+    Scenario("users/register", "POST", "/api/users/register/", lambda user, rng: {"json": {
+        "email": f"bench-{uuid.uuid4().hex[:12]}@{EMAIL_DOMAIN}",
+        "username": f"bench-{uuid.uuid4().hex[:12]}",
+        "password": PASSWORD,
+    }}, expect=(201,)),
+    Scenario("users/login", "POST", "/api/users/login/",
+             lambda user, rng: {"json": {"email": user.email, "password": PASSWORD}}),
+    Scenario("users/profile", "GET", "/api/users/profile/"),
+    Scenario("caffeine/logs", "GET", "/api/caffeine/logs/"),
+    Scenario("caffeine/logs/create", "POST", "/api/caffeine/logs/create/", lambda user, rng: {"json": {
+        "beverage_name": f"{DRINK_PREFIX}Espresso", "caffeine_mg": rng.choice([63, 126]), "confirmed": True,
+    }}, expect=(201,)),
+    Scenario("caffeine/caffeine-over-time", "GET", "/api/caffeine/caffeine-over-time/"),
+    Scenario("caffeine/current-level", "GET", "/api/caffeine/current-level/"),
+    Scenario("caffeine/daily", "GET", "/api/caffeine/daily/"),
+    Scenario("caffeine/daily/today", "GET", "/api/caffeine/daily/today/"),
+    Scenario("caffeine/beverages", "GET", "/api/caffeine/beverages/",
+             lambda user, rng: {"params": {"q": rng.choice(["bench", "benchmark c", "benchmark energy", "benchmark s"])}}),
+    Scenario("caffeine/logs/export/ndjson", "GET", "/api/caffeine/logs/export/ndjson/"),
+    Scenario("ai/submit-drink", "POST", "/api/ai/submit-drink/", lambda user, rng: {
+        "files": {"image": ("drink.png", _random_photo(rng), "image/png")},
+        "data": {"additional_notes": "benchmark"},
+    }),
+    Scenario("ai/chat", "POST", "/api/ai/chat/",
+             lambda user, rng: {"json": {"message": "How much caffeine have I had today?"}}),
+]
+
+
+def select(names):
+    """Scenarios whose name starts with any of ``names`` (all when empty)."""
+    if not names:
+        return list(SCENARIOS)
+    return [scenario for scenario in SCENARIOS if any(scenario.name.startswith(name) for name in names)]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+async def _drive(base_url, scenario, users, requests, concurrency, seed):
+    rng = random.Random(seed)
+    latencies = []
+    queries = []
+    errors = {}
+    issued = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            nonlocal issued
+            while issued < requests:
+                user = users[issued % len(users)]
+                issued += 1
+                kwargs = scenario.build(user, rng)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(scenario.method, scenario.path, headers=user.headers, **kwargs)
+                    await response.aread()
+                    outcome = response.status_code
+                except httpx.HTTPError as e:
+                    response, outcome = None, type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                if outcome not in scenario.expect:
+                    errors[str(outcome)] = errors.get(str(outcome), 0) + 1
+                elif response is not None:
+                    match = _DB_TIMING.search(response.headers.get("Server-Timing", ""))
+                    if match:
+                        queries.append(int(match.group(1)))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": sum(errors.values()),
+        "error_kinds": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "mean_ms": _ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run(base_url, scenarios, users, requests, concurrency, warmup=0, seed=0, progress=None):
+    """Run each scenario in turn and return ``{name: result}``."""
+    results = {}
+    for scenario in scenarios:
+        if warmup:
+            asyncio.run(_drive(base_url, scenario, users, warmup, min(concurrency, warmup), seed))
+        results[scenario.name] = asyncio.run(_drive(base_url, scenario, users, requests, concurrency, seed))
+        if progress is not None:
+            progress(scenario.name, results[scenario.name])
+    return results
+
+
+def compare(current, baseline, tolerance=0.2, min_delta_ms=5.0):
+    """
+    Regressions of ``current`` against ``baseline`` (both ``{name: result}``).
+
+    Latency and throughput may drift by ``tolerance`` (a fraction) before they
+    count; latency changes under ``min_delta_ms`` are always noise. Queries per
+    request only move with cache hit ratios, so more than QUERY_SLACK extra
+    queries on average is reported.
+    """
+    regressions = []
+    for name, after in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            old, new = before.get(metric), after.get(metric)
+            if old is not None and new is not None and new > old * (1 + tolerance) and new - old >= min_delta_ms:
+                regressions.append(f"{name}: {metric} {old} -> {new}")
+        old, new = before.get("throughput_rps"), after.get("throughput_rps")
+        if old and new is not None and new < old * (1 - tolerance):
+            regressions.append(f"{name}: throughput_rps {old} -> {new}")
+        old, new = before.get("queries_per_request"), after.get("queries_per_request")
+        if old is not None and new is not None and new > old + QUERY_SLACK:
+            regressions.append(f"{name}: queries_per_request {old} -> {new}")
+        if after.get("errors", 0) > before.get("errors", 0):
+            regressions.append(f"{name}: errors {before.get('errors', 0)} -> {after['errors']}")
+    return regressions
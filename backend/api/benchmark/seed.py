@@ -0,0 +1,54 @@
+"""
+Benchmark users (with history from synthetic.py) and their cleanup.
+
+Every benchmark account lives under EMAIL_DOMAIN and every stand-in drink is
+named "Benchmark ...", so ``cleanup`` can remove the accounts (and, through
+cascades, everything they logged) plus the catalog entries and cached
+analyses they produced without touching real data. All accounts share one
+password hash; hashing is deliberately slow and would otherwise dominate
+seeding.
+"""
+
+from django.contrib.auth.hashers import make_password
+from rest_framework.authtoken.models import Token
+
+from ai.models import DrinkAnalysisCache
+from caffeine.models import Beverage
+from users.models import User
+from . import synthetic
+
+EMAIL_DOMAIN = "benchmark.invalid"
+DRINK_PREFIX = "Benchmark "
+PASSWORD = "benchmark-password-1"
+
+
+class BenchmarkUser:
+    def __init__(self, user, token):
+        self.user = user
+        self.email = user.email
+        self.token = token
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Token {self.token}"}
+
+
+def cleanup():
+    """Delete every benchmark account and stand-in drink. Returns the number of users removed."""
+    Beverage.objects.filter(normalized_name__startswith=DRINK_PREFIX.casefold()).delete()
+    DrinkAnalysisCache.objects.filter(analysis__beverage_name__startswith=DRINK_PREFIX).delete()
+    deleted, per_model = User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
+    return per_model.get(User._meta.label, 0)
+
+
+def seed(users=10, logs_per_user=500, days=90, seed=0):
+    """Create ``users`` accounts, each with ``logs_per_user`` logs spread over ``days``, and their tokens."""
+    synthetic.generate_users(
+        0, users, seed=seed, email_domain=EMAIL_DOMAIN, logs_per_user=logs_per_user,
+        energy_per_user=logs_per_user // 5, days=days, end=synthetic.default_end(),
+        chunk_size=5000, use_copy=False, rebuild_derived=True, password_hash=make_password(PASSWORD),
+    )
+    seeded = []
+    for user in User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").order_by("username"):
+        seeded.append(BenchmarkUser(user, Token.objects.create(user=user).key))
+    return seeded
@@ -0,0 +1,160 @@
+"""
+Local stand-ins for the external services the API calls.
+
+FakeGeminiServer answers the Gemini REST endpoints used by google-genai
+(``generateContent`` and ``streamGenerateContent``) after a configurable
+delay; requests carrying an image get a drink analysis JSON, text-only
+requests a short chat answer. FakeS3Server keeps PUT objects in memory and
+serves HEAD/GET, which is all the drink pipeline needs from R2.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Names carry a "Benchmark" prefix so the catalog entries they create can be told apart
+DRINKS = [
+    ("Benchmark Energy Zero", "16 fl oz (473ml)", 140, 10),
+    ("Benchmark Energy Original", "8.4 fl oz (250ml)", 80, 110),
+    ("Benchmark Sparkling Orange", "12 fl oz (355ml)", 200, 10),
+    ("Benchmark Cold Brew", "16 fl oz (473ml)", 205, 5),
+    ("Benchmark Cola", "12 fl oz (355ml)", 34, 140),
+]
+
+
+def drink_analysis(rng=random):
+    """A response in the structured-output schema of ai/drink_schema.py."""
+    name, serving, caffeine_mg, calories = rng.choice(DRINKS)
+    return {
+        "beverage_name": name,
+        "serving_size": serving,
+        "caffeine_mg": caffeine_mg,
+        "total_fat_g": 0,
+        "sodium_mg": 200,
+        "total_carbohydrates_g": 3,
+        "sugars_g": 0,
+        "added_sugars_g": 0,
+        "protein_g": 0,
+        "taurine_mg": 1000,
+        "calories_kcal": calories,
+        "b_vitamins": [{"name": "vitamin_b6_mg", "amount": 5}],
+        "other_ingredients": [{"name": "carbonated_water", "amount": None}],
+    }
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, host="127.0.0.1", port=0):
+        super().__init__((host, port), handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+class _GeminiHandler(_QuietHandler):
+    def do_POST(self):
+        request = json.loads(self._read_body() or b"{}")
+        time.sleep(self.server.delay())
+
+        has_image = any(
+            "inline_data" in part or "inlineData" in part
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = json.dumps(drink_analysis()) if has_image else "You have had about 200 mg of caffeine today."
+
+        if "streamGenerateContent" in self.path:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for word in text.split(" "):
+                event = f"data: {json.dumps(self._candidate(word + ' '))}\r\n\r\n".encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        self._send(200, json.dumps(self._candidate(text)).encode())
+
+    @staticmethod
+    def _candidate(text):
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": 0, "totalTokenCount": 0},
+        }
+
+
+class FakeGeminiServer(_StandInServer):
+    """Gemini REST stand-in that waits ``latency_ms`` (plus up to ``jitter_ms``) per call."""
+
+    def __init__(self, latency_ms=500, jitter_ms=0, host="127.0.0.1", port=0):
+        super().__init__(_GeminiHandler, host, port)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def delay(self):
+        return (self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000.0
+
+
+class _S3Handler(_QuietHandler):
+    def do_PUT(self):
+        if self.headers.get("Expect", "").lower() == "100-continue":
+            self.send_response_only(100)
+            self.end_headers()
+        self.server.objects[self.path.split("?")[0]] = self._read_body()
+        self._send(200, headers={"ETag": '"benchmark"'})
+
+    def do_HEAD(self):
+        self._get()
+
+    def do_GET(self):
+        self._get()
+
+    def _get(self):
+        data = self.server.objects.get(self.path.split("?")[0])
+        if data is None:
+            self._send(404, b"<Error><Code>NoSuchKey</Code></Error>", "application/xml")
+        else:
+            self._send(200, data, "application/octet-stream")
+
+
+class FakeS3Server(_StandInServer):
+    """In-memory, path-style S3 stand-in for the R2 bucket."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__(_S3Handler, host, port)
+        self.objects = {}
@@ -0,0 +1,243 @@
+"""
+Realistic synthetic users, caffeine logs and energy ratings at production scale.
+
+Each user's data comes from its own generator seeded with the run's seed,
+email domain and user index, so the output is identical however users are
+split across worker processes. Users get a habit (favourite drinks, usual
+drinking hours, timezone) and logs follow it; energy ratings rise in the
+hours after a drink, so the correlation analytics have something to find. Rows are written a chunk at a time with
+``bulk_create``, or with ``COPY ... FROM STDIN`` on PostgreSQL, so memory stays
+flat however many rows are generated.
+"""
+
+import csv
+import io
+import json
+import math
+import random
+import uuid
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+
+from caffeine import services
+from caffeine.models import CaffeineLog
+from energy.models import EnergyLog
+from users.models import User
+
+PASSWORD = "synthetic-password-1"
+TIMEZONES = [
+    "America/New_York", "America/Chicago", "America/Denver", "America/Los_Angeles",
+    "Europe/London", "Europe/Berlin", "Asia/Tokyo", "Australia/Sydney", "UTC",
+]
+
+# name, serving size, caffeine mg, calories, fat g, sodium mg, carbs g, sugars g, added sugars g, protein g, taurine mg
+BEVERAGES = [
+    ("Drip Coffee", "12 fl oz (355ml)", 145, 5, 0, 10, 0, 0, 0, 0.3, None),
+    ("Espresso", "1 fl oz (30ml)", 63, 3, 0.2, 5, 0.5, 0, 0, 0.1, None),
+    ("Cold Brew", "16 fl oz (473ml)", 205, 5, 0, 15, 0, 0, 0, 0.5, None),
+    ("Caffe Latte", "16 fl oz (473ml)", 150, 190, 7, 170, 19, 18, 0, 13, None),
+    ("Black Tea", "8 fl oz (237ml)", 47, 2, 0, 7, 0.7, 0, 0, 0, None),
+    ("Green Tea", "8 fl oz (237ml)", 28, 2, 0, 2, 0, 0, 0, 0.5, None),
+    ("Monster Energy Zero Ultra", "16 fl oz (473ml)", 140, 10, 0, 200, 3, 0, 0, 0, 1000),
+    ("Red Bull", "8.4 fl oz (250ml)", 80, 110, 0, 105, 28, 27, 27, 1, 1000),
+    ("Celsius Sparkling Orange", "12 fl oz (355ml)", 200, 10, 0, 0, 2, 0, 0, 0, 1000),
+    ("Coca-Cola", "12 fl oz (355ml)", 34, 140, 0, 45, 39, 39, 39, 0, None),
+    ("Diet Coke", "12 fl oz (355ml)", 46, 0, 0, 40, 0, 0, 0, 0, None),
+    ("Mountain Dew", "20 fl oz (591ml)", 91, 290, 0, 105, 77, 77, 77, 0, None),
+]
+ENERGY_DRINK_VITAMINS = {"vitamin_b3_mg": 20, "vitamin_b6_mg": 5, "vitamin_b12_mcg": 3}
+ENERGY_DRINK_INGREDIENTS = {"carbonated_water": True, "natural_flavors": True, "sucralose": True}
+
+# Local hour-of-day mixture for drinks: (weight, mean hour, standard deviation)
+DRINK_HOURS = [(0.55, 8.0, 1.2), (0.3, 13.5, 1.5), (0.15, 16.5, 2.0)]
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _local_hour(rng):
+    pick = rng.random()
+    for weight, mean, sd in DRINK_HOURS:
+        if pick < weight:
+            return min(23.99, max(5.0, rng.gauss(mean, sd)))
+        pick -= weight
+    return 12.0
+
+
+class UserPlan:
+    """One synthetic user: the account row plus the habit its history is drawn from."""
+
+    def __init__(self, seed, index, email_domain, password_hash):
+        self.rng = random.Random(f"{seed}:{email_domain}:{index}")  # String seeds hash the same in every process
+        rng = self.rng
+        self.user = User(
+            id=_uuid(rng),
+            email=f"synth-{index}@{email_domain}",
+            username=f"{email_domain.split('.')[0]}-{index}"[:50],  # Unique per domain
+            password=password_hash,
+            caffeine_sensitivity=round(rng.uniform(0.2, 0.8), 2),
+            timezone=rng.choice(TIMEZONES),
+        )
+        self.favourites = rng.sample(range(len(BEVERAGES)), k=rng.randint(1, 4))
+        offset = datetime.now(ZoneInfo(self.user.timezone)).utcoffset()
+        self.utc_offset_hours = offset.total_seconds() / 3600  # DST is ignored; close enough for load data
+
+    def caffeine_logs(self, count, days, end):
+        """``count`` confirmed logs over the ``days`` before ``end``, oldest first."""
+        rng = self.rng
+        start_day = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        moments = sorted(
+            start_day + timedelta(days=rng.randrange(days), hours=_local_hour(rng) - self.utc_offset_hours)
+            for _ in range(count)
+        )
+        for created_at in moments:
+            beverage = BEVERAGES[rng.choice(self.favourites) if rng.random() < 0.8 else rng.randrange(len(BEVERAGES))]
+            yield self._log(beverage, min(created_at, end))
+
+    def _log(self, beverage, created_at):
+        rng = self.rng
+        name, serving, caffeine, calories, fat, sodium, carbs, sugars, added, protein, taurine = beverage
+        jitter = rng.uniform(0.9, 1.1)  # Brews and pours vary
+        energy_drink = taurine is not None
+        return {
+            "id": _uuid(rng),
+            "user_id": self.user.id,
+            "caffeine_mg": round(caffeine * jitter, 1),
+            "beverage_name": name,
+            "serving_size": serving,
+            "total_fat_g": fat,
+            "sodium_mg": sodium,
+            "total_carbohydrates_g": carbs,
+            "sugars_g": sugars,
+            "added_sugars_g": added,
+            "protein_g": protein,
+            "taurine_mg": taurine,
+            "calories_kcal": round(calories * jitter),
+            "b_vitamins": ENERGY_DRINK_VITAMINS if energy_drink else None,
+            "other_ingredients": ENERGY_DRINK_INGREDIENTS if energy_drink else None,
+            "image_url": None,
+            "additional_notes": "Synthetic" if rng.random() < 0.05 else None,
+            "confirmed": True,
+            "created_at": created_at,
+        }
+
+    def energy_logs(self, count, days, end, intake_times):
+        """``count`` ratings, higher in the few hours after one of ``intake_times`` (sorted)."""
+        rng = self.rng
+        start_day = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        moments = sorted(
+            start_day + timedelta(days=rng.randrange(days), hours=rng.uniform(7, 22) - self.utc_offset_hours)
+            for _ in range(count)
+        )
+        for timestamp in moments:
+            timestamp = min(timestamp, end)
+            previous = bisect_right(intake_times, timestamp) - 1
+            hours_since = (timestamp - intake_times[previous]).total_seconds() / 3600 if previous >= 0 else math.inf
+            boost = 1.5 * math.exp(-((hours_since - 1.0) ** 2) / 4.0) if hours_since < 8 else 0.0
+            yield {
+                "id": _uuid(rng),
+                "user_id": self.user.id,
+                "energy_level": max(1, min(5, round(rng.gauss(2.6 + boost, 0.8)))),
+                "timestamp": timestamp,
+            }
+
+
+@contextmanager
+def _keep_timestamps(model, field_name):
+    """Let bulk_create write the given value of an ``auto_now_add`` field."""
+    field = model._meta.get_field(field_name)
+    original = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = original
+
+
+def _copy_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value  # None becomes an unquoted empty field, which COPY reads as NULL
+
+
+def _copy_rows(model, rows):
+    """Load dicts keyed by attname into ``model``'s table with COPY (PostgreSQL only)."""
+    fields = model._meta.concrete_fields
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row[field.attname]) for field in fields])
+    buffer.seek(0)
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    sql = f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    with connection.cursor() as cursor:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+class _ChunkWriter:
+    def __init__(self, model, chunk_size, use_copy):
+        self.model = model
+        self.chunk_size = chunk_size
+        self.use_copy = use_copy
+        self.rows = []
+        self.written = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.use_copy:
+            _copy_rows(self.model, self.rows)
+        else:
+            self.model.objects.bulk_create([self.model(**row) for row in self.rows], batch_size=self.chunk_size)
+        self.written += len(self.rows)
+        self.rows = []
+
+
+def generate_users(start, stop, *, seed, email_domain, logs_per_user, energy_per_user, days, end,
+                   chunk_size, use_copy, rebuild_derived, password_hash=None):
+    """
+    Generate users ``start`` to ``stop - 1`` with their history. Returns the
+    number of ``(users, caffeine logs, energy logs)`` written.
+    """
+    password_hash = password_hash or make_password(PASSWORD)
+    plans = [UserPlan(seed, index, email_domain, password_hash) for index in range(start, stop)]
+    User.objects.bulk_create([plan.user for plan in plans], batch_size=chunk_size)
+
+    logs = _ChunkWriter(CaffeineLog, chunk_size, use_copy)
+    ratings = _ChunkWriter(EnergyLog, chunk_size, use_copy)
+    with _keep_timestamps(EnergyLog, "timestamp"):
+        for plan in plans:
+            intake_times = []
+            for row in plan.caffeine_logs(logs_per_user, days, end):
+                intake_times.append(row["created_at"])
+                logs.add(row)
+            for row in plan.energy_logs(energy_per_user, days, end, intake_times):
+                ratings.add(row)
+        logs.flush()
+        ratings.flush()
+
+    if rebuild_derived:
+        for plan in plans:
+            services.logs_imported(plan.user)  # Rollups, body load and data version
+    return len(plans), logs.written, ratings.written
+
+
+def default_end():
+    return datetime.now(dt_timezone.utc).replace(microsecond=0)
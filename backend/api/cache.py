@@ -0,0 +1,72 @@
+"""
+Per-user cache of rendered API data.
+
+``cache_user_response`` stores ``response.data`` of successful GETs in the
+"responses" cache under a key derived from the same fingerprint as the ETag
+(user, data version, path, query string, Accept header and ``vary_on``). A
+write bumps the data version, so every entry for that user stops matching at
+once and the stale ones are evicted by the backend's size bound or timeout.
+Only the serialized data is cached; rendering still goes through DRF.
+
+Hits and misses are counted per view in api.metrics (``stats()``).
+"""
+
+from functools import wraps
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils.decorators import method_decorator
+from rest_framework.response import Response
+
+from . import metrics
+from .conditional import user_data_etag
+
+CACHE_ALIAS = "responses"
+
+
+def cache_user_response(vary_on=None, timeout=DEFAULT_TIMEOUT):
+    """Decorator for ``get`` methods of authenticated APIViews."""
+    fingerprint = user_data_etag(vary_on)
+
+    def decorator(view):
+        name = view.__qualname__.split(".")[0]
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            tag = fingerprint(request, *args, **kwargs)
+            if tag is None:
+                return view(request, *args, **kwargs)
+
+            cache = caches[CACHE_ALIAS]
+            key = f"resp:{name}:{tag}"
+            cached = cache.get(key)
+            if cached is not None:
+                metrics.increment("response_cache_hits", view=name)
+                return Response(cached)
+
+            metrics.increment("response_cache_misses", view=name)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response):
+                cache.set(key, response.data, timeout)
+            return response
+
+        return wrapper
+
+    return method_decorator(decorator)
+
+
+def stats():
+    hits = metrics.by_label("response_cache_hits", "view")
+    misses = metrics.by_label("response_cache_misses", "view")
+    views = {
+        view: {"hits": hits.get(view, 0), "misses": misses.get(view, 0)}
+        for view in sorted(set(hits) | set(misses))
+    }
+    for totals in views.values():
+        totals["hit_ratio"] = metrics.ratio(totals["hits"], totals["misses"])
+    return {
+        "hits": sum(hits.values()),
+        "misses": sum(misses.values()),
+        "hit_ratio": metrics.ratio(sum(hits.values()), sum(misses.values())),
+        "views": views,
+    }
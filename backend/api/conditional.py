@@ -0,0 +1,63 @@
+"""
+Conditional GET for per-user read endpoints.
+
+``conditional_on_user_data`` gives a view method a strong ETag derived from
+the user's data version (users/versioning.py), the URL, its query string and
+the negotiated media type. A matching ``If-None-Match`` is answered with 304
+by Django's ``condition`` decorator before the view body runs, so no
+queryset is evaluated and nothing is serialized. Responses are marked
+``private, no-cache`` so browsers keep them but always revalidate.
+
+Endpoints whose output also depends on the clock pass ``vary_on``, a
+function of the request returning e.g. the current grid bucket or day.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from users import versioning
+
+
+def request_data_version(request):
+    """The user's data version, read at most once per request."""
+    version = getattr(request, "_user_data_version", None)
+    if version is None:
+        version = request._user_data_version = versioning.current(request.user)
+    return version
+
+
+def user_data_etag(vary_on=None):
+    def etag(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return None
+        parts = [
+            str(request.user.pk),
+            str(request_data_version(request)),
+            request.get_host(),  # Paginated responses embed absolute links
+            request.path,
+            "&".join(f"{key}={value}" for key, values in sorted(request.GET.lists()) for value in values),
+            request.META.get("HTTP_ACCEPT", ""),
+            str(vary_on(request)) if vary_on else "",
+        ]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+    return etag
+
+
+def _revalidate_privately(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
+
+
+def conditional_on_user_data(vary_on=None):
+    """Decorator for ``get`` methods of authenticated APIViews."""
+    return method_decorator([_revalidate_privately, condition(etag_func=user_data_etag(vary_on))])
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import platform
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.timezone import now
+
+from api.benchmark import runner, seed
+from api.benchmark.standins import FakeGeminiServer, FakeS3Server
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API end to end against local Gemini and R2 stand-ins: p50/p95/p99 latency, "
+        "throughput and queries per request for each endpoint, optionally compared with a saved baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", nargs="*", default=[],
+                            help="Scenario name prefixes to run, e.g. users caffeine/logs ai/chat (default: all).")
+        parser.add_argument("--list", action="store_true", help="List the scenarios and exit.")
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients.")
+        parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario first.")
+        parser.add_argument("--users", type=int, default=10, help="Synthetic users to seed.")
+        parser.add_argument("--logs-per-user", type=int, default=500, help="Caffeine logs seeded per user.")
+        parser.add_argument("--days", type=int, default=90, help="History the seeded logs are spread over.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for data and requests.")
+        parser.add_argument("--gemini-latency-ms", type=float, default=500, help="Delay of every fake Gemini call.")
+        parser.add_argument("--gemini-jitter-ms", type=float, default=0, help="Extra uniform random delay.")
+        parser.add_argument("--gemini-rate-limits", action="store_true",
+                            help="Keep the Gemini governor's rate limits (lifted by default so they do not cap the load).")
+        parser.add_argument("--gemini-port", type=int, default=0, help="Fake Gemini port (default: any free port).")
+        parser.add_argument("--s3-port", type=int, default=0, help="Fake S3 port (default: any free port).")
+        parser.add_argument("--url", help=(
+            "Benchmark an already running server instead of an in-process one. It must use the same "
+            "database and point GEMINI_BASE_URL / AWS_S3_ENDPOINT_URL at the stand-ins (fix their ports)."
+        ))
+        parser.add_argument("--save", metavar="PATH", help="Write the results as a JSON baseline.")
+        parser.add_argument("--baseline", metavar="PATH", help="Compare with a saved baseline; exit 1 on regressions.")
+        parser.add_argument("--tolerance", type=float, default=0.2,
+                            help="Allowed fractional latency/throughput drift against the baseline.")
+        parser.add_argument("--keep-data", action="store_true", help="Do not delete the benchmark users afterwards.")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for scenario in runner.SCENARIOS:
+                self.stdout.write(f"{scenario.name:32} {scenario.method:5} {scenario.path}")
+            return
+        scenarios = runner.select(options["only"])
+        if not scenarios:
+            raise CommandError("No scenario matches --only.")
+        baseline = self._load_baseline(options["baseline"])
+
+        # 1. Local stand-ins for Gemini and R2
+        gemini = FakeGeminiServer(options["gemini_latency_ms"], options["gemini_jitter_ms"],
+                                  port=options["gemini_port"]).start()
+        s3 = FakeS3Server(port=options["s3_port"]).start()
+        server = None
+        try:
+            # 2. The server under test
+            if options["url"]:
+                base_url = options["url"].rstrip("/")
+                self.stdout.write(
+                    f"Target {base_url} must run with GEMINI_BASE_URL={gemini.url} AWS_S3_ENDPOINT_URL={s3.url}"
+                )
+            else:
+                settings.GEMINI_BASE_URL = gemini.url
+                settings.AWS_S3_ENDPOINT_URL = s3.url
+                if not options["gemini_rate_limits"]:
+                    settings.GEMINI_GLOBAL_RATE_PER_SECOND = settings.GEMINI_USER_RATE_PER_MINUTE = 1e9
+                    settings.GEMINI_GLOBAL_BURST = settings.GEMINI_USER_BURST = 10 ** 9
+                server, base_url = self._start_server()
+            if options["verbosity"] < 2:
+                logging.getLogger("ai").setLevel(logging.WARNING)  # One INFO line per analysis drowns the table
+
+            # 3. Synthetic users with history
+            seed.cleanup()
+            started = time.perf_counter()
+            users = seed.seed(options["users"], options["logs_per_user"], options["days"], options["seed"])
+            self.stdout.write(f"Seeded {len(users)} users x {options['logs_per_user']} logs "
+                              f"in {time.perf_counter() - started:.1f}s")
+
+            # 4. Drive every scenario
+            self.stdout.write(f"{'scenario':32} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                              f"{'queries':>8} {'errors':>7}")
+            results = runner.run(
+                base_url, scenarios, users, options["requests"], options["concurrency"],
+                warmup=options["warmup"], seed=options["seed"], progress=self._report,
+            )
+        finally:
+            if server is not None:
+                server.should_exit = True
+            gemini.stop()
+            s3.stop()
+            if not options["keep_data"]:
+                seed.cleanup()
+
+        # 5. Save and compare
+        document = {"meta": self._meta(options), "scenarios": results}
+        if options["save"]:
+            with open(options["save"], "w") as f:
+                json.dump(document, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved results to {options['save']}")
+        if baseline is not None:
+            regressions = runner.compare(results, baseline["scenarios"], tolerance=options["tolerance"])
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(f"REGRESSION {line}")
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+
+    def _report(self, name, result):
+        self.stdout.write(
+            f"{name:32} {result['throughput_rps'] or 0:8.1f} {result['p50_ms'] or 0:8.1f} "
+            f"{result['p95_ms'] or 0:8.1f} {result['p99_ms'] or 0:8.1f} "
+            f"{result['queries_per_request'] if result['queries_per_request'] is not None else '-':>8} "
+            f"{result['errors']:7}"
+        )
+
+    def _load_baseline(self, path):
+        if not path:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read baseline {path}: {e}")
+
+    def _start_server(self):
+        """Serve core.asgi with Uvicorn on a free local port in a background thread."""
+        import uvicorn
+
+        from core.asgi import application
+
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        if "127.0.0.1" not in settings.ALLOWED_HOSTS and "*" not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "127.0.0.1"]
+
+        server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=port,
+                                               lifespan="off", log_level="warning"))
+        threading.Thread(target=server.run, name="benchmark-server", daemon=True).start()
+        deadline = time.monotonic() + 10
+        while not server.started:
+            if time.monotonic() > deadline:
+                raise CommandError("The in-process server did not start.")
+            time.sleep(0.05)
+        return server, f"http://127.0.0.1:{port}"
+
+    def _meta(self, options):
+        return {
+            "created_at": now().isoformat(),
+            "target": options["url"] or "in-process uvicorn",
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            **{key: options[key] for key in (
+                "requests", "concurrency", "warmup", "users", "logs_per_user", "days", "seed",
+                "gemini_latency_ms", "gemini_jitter_ms",
+            )},
+        }
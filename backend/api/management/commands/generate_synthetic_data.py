@@ -0,0 +1,114 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils.dateparse import parse_datetime
+
+from api.benchmark import synthetic
+from users.models import User
+
+
+def _init_worker():
+    django.setup()  # A no-op when the worker was forked from a set-up parent
+
+
+def _generate(start, stop, options):
+    try:
+        return synthetic.generate_users(start, stop, **options)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users with realistic caffeine and energy history, for testing at "
+        "production data sizes. Output depends only on --seed, not on --workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100, help="Users to create.")
+        parser.add_argument("--logs-per-user", type=int, default=1000, help="Caffeine logs per user.")
+        parser.add_argument("--energy-per-user", type=int, default=200, help="Energy ratings per user.")
+        parser.add_argument("--days", type=int, default=365, help="History the rows are spread over.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same rows.")
+        parser.add_argument("--end", help="ISO 8601 datetime the history ends at (default: now). Fix it for identical reruns.")
+        parser.add_argument("--start-index", type=int, default=0,
+                            help="First user index, to add users to an earlier run without clashes.")
+        parser.add_argument("--workers", type=int, default=1, help="Parallel worker processes.")
+        parser.add_argument("--users-per-task", type=int, default=50, help="Users handed to a worker at a time.")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per INSERT / COPY.")
+        parser.add_argument("--copy", action="store_true", help="Load rows with COPY (PostgreSQL only).")
+        parser.add_argument("--email-domain", default="synthetic.invalid", help="Domain of the generated emails.")
+        parser.add_argument("--skip-derived", action="store_true",
+                            help="Do not rebuild daily rollups and body load for the new users.")
+        parser.add_argument("--replace", action="store_true",
+                            help="Delete existing users under --email-domain (and their data) first.")
+
+    def handle(self, *args, **options):
+        if options["copy"] and connection.vendor != "postgresql":
+            raise CommandError("--copy needs PostgreSQL; drop it to use bulk_create.")
+        workers = options["workers"]
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stderr.write("SQLite allows a single writer; using one worker.")
+            workers = 1
+
+        end = synthetic.default_end()
+        if options["end"]:
+            end = parse_datetime(options["end"])
+            if end is None or end.tzinfo is None:
+                raise CommandError("--end must be an ISO 8601 datetime with a UTC offset.")
+
+        domain = options["email_domain"]
+        existing = User.objects.filter(email__endswith=f"@{domain}")
+        if options["replace"]:
+            started = time.perf_counter()
+            deleted, _ = existing.delete()
+            self.stdout.write(f"Deleted {deleted} existing rows in {time.perf_counter() - started:.1f}s")
+        elif not options["start_index"] and existing.exists():
+            raise CommandError(f"Users under @{domain} already exist; pass --replace or a new --start-index.")
+
+        first = options["start_index"]
+        last = first + options["users"]
+        step = max(1, options["users_per_task"])
+        tasks = [(start, min(start + step, last)) for start in range(first, last, step)]
+        generate_options = {
+            "seed": options["seed"],
+            "email_domain": domain,
+            "logs_per_user": options["logs_per_user"],
+            "energy_per_user": options["energy_per_user"],
+            "days": options["days"],
+            "end": end,
+            "chunk_size": options["chunk_size"],
+            "use_copy": options["copy"],
+            "rebuild_derived": not options["skip_derived"],
+            "password_hash": make_password(synthetic.PASSWORD),  # Hashed once; every user shares it
+        }
+
+        started = time.perf_counter()
+        totals = [0, 0, 0]
+        if workers > 1:
+            connections.close_all()  # Forked workers must not share the parent's sockets
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(_generate, start, stop, generate_options) for start, stop in tasks]
+                for future in as_completed(futures):
+                    self._progress(totals, future.result(), started, options["users"])
+        else:
+            for start, stop in tasks:
+                self._progress(totals, synthetic.generate_users(start, stop, **generate_options),
+                               started, options["users"])
+
+        elapsed = time.perf_counter() - started
+        rows = sum(totals)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {totals[0]} users, {totals[1]} caffeine logs and {totals[2]} energy logs in {elapsed:.1f}s "
+            f"({rows / elapsed:,.0f} rows/s). Password for every user: {synthetic.PASSWORD}"
+        ))
+
+    def _progress(self, totals, counts, started, target):
+        for i, count in enumerate(counts):
+            totals[i] += count
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  {totals[0]}/{target} users, {totals[1] + totals[2]} rows, {elapsed:.1f}s")
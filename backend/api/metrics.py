@@ -0,0 +1,145 @@
+"""
+In-process metric counters and histograms shared by the apps.
+
+Metrics are per worker process and reset on restart; they are meant for
+quick operational visibility (cache hit ratios, stage latencies and the
+like), not billing. ``prometheus_text`` renders everything in the Prometheus
+text exposition format for the ``/metrics`` endpoint.
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds in seconds; suits everything from a cache lookup to a Gemini call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_histograms = {}
+_buckets = {}
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size):
+        self.counts = [0] * size  # Per bucket, not cumulative; the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def increment(name, amount=1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += amount
+
+
+def get(name, **labels):
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def counters(prefix=""):
+    """Snapshot of counters as ``{"name{label=value}": total}``."""
+    with _lock:
+        items = list(_counters.items())
+    snapshot = {}
+    for (name, labels), value in sorted(items):
+        if name.startswith(prefix):
+            label_text = ",".join(f"{k}={v}" for k, v in labels)
+            snapshot[f"{name}{{{label_text}}}" if label_text else name] = value
+    return snapshot
+
+
+def by_label(name, label):
+    """Totals of counter ``name`` grouped by the value of one label."""
+    with _lock:
+        items = list(_counters.items())
+    totals = defaultdict(int)
+    for (counter, labels), value in items:
+        if counter == name:
+            totals[dict(labels).get(label)] += value
+    return dict(totals)
+
+
+def ratio(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def observe(name, value, buckets=None, **labels):
+    """
+    Record ``value`` in histogram ``name``. The bucket bounds are fixed by the
+    first observation of a name (DEFAULT_BUCKETS unless ``buckets`` is given).
+    """
+    with _lock:
+        bounds = _buckets.setdefault(name, tuple(buckets or DEFAULT_BUCKETS))
+        histogram = _histograms.get(_key(name, labels))
+        if histogram is None:
+            histogram = _histograms[_key(name, labels)] = _Histogram(len(bounds) + 1)
+        histogram.counts[bisect.bisect_left(bounds, value)] += 1
+        histogram.sum += value
+        histogram.count += 1
+
+
+@contextmanager
+def span(name, **labels):
+    """Time the ``with`` block into histogram ``name``, whether or not it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels, extra=()):
+    pairs = [*labels, *extra]
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def prometheus_text():
+    """All counters and histograms in the Prometheus text exposition format (0.0.4)."""
+    with _lock:
+        counter_items = sorted(_counters.items())
+        histogram_items = sorted(
+            ((key, list(h.counts), h.sum, h.count) for key, h in _histograms.items()), key=lambda item: item[0]
+        )
+        bounds = dict(_buckets)
+
+    lines = []
+    previous = None
+    for (name, labels), value in counter_items:
+        if name != previous:
+            lines.append(f"# TYPE {name} counter")
+            previous = name
+        lines.append(f"{name}{_label_text(labels)} {value}")
+
+    previous = None
+    for (name, labels), counts, total, count in histogram_items:
+        if name != previous:
+            lines.append(f"# TYPE {name} histogram")
+            previous = name
+        cumulative = 0
+        for bound, bucket_count in zip((*bounds[name], math.inf), counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_label_text(labels, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(labels)} {_number(total)}")
+        lines.append(f"{name}_count{_label_text(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -1,3 +1,65 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from caffeine import services
+from caffeine.models import CaffeineLog
+from users.models import User
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="etag@example.com", password="password", username="etag")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+        self.add_log(80)
+
+    def add_log(self, caffeine_mg):
+        log = CaffeineLog.objects.create(
+            user=self.user, caffeine_mg=caffeine_mg, created_at=now() - timedelta(hours=1), confirmed=True
+        )
+        services.log_created(log)
+        return log
+
+    def test_unchanged_data_answers_304(self):
+        response = self.client.get("/api/caffeine/logs/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        revalidated = self.client.get("/api/caffeine/logs/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b"")
+        self.assertEqual(revalidated["ETag"], response["ETag"])
+
+    def test_new_log_changes_the_etag(self):
+        etag = self.client.get("/api/caffeine/logs/")["ETag"]
+        self.add_log(40)
+        response = self.client.get("/api/caffeine/logs/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_etag_depends_on_the_query(self):
+        etag = self.client.get("/api/caffeine/logs/")["ETag"]
+        response = self.client.get("/api/caffeine/logs/?page_size=1", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get("/api/caffeine/logs/")["ETag"]
+        other = User.objects.create_user(email="other@example.com", password="password", username="other")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=other).key)
+        response = client.get("/api/caffeine/logs/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [])
 
-# Create your tests here.
+    def test_profile_edit_changes_the_etag(self):
+        etag = self.client.get("/api/users/profile/")["ETag"]
+        self.client.patch("/api/users/profile/", {"first_name": "Ada"}, format="json")
+        response = self.client.get("/api/users/profile/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["first_name"], "Ada")
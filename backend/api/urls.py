@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ResponseCacheStatsView
+
+urlpatterns = [
+    path('cache-stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
+]
@@ -1,3 +1,34 @@
-from django.shortcuts import render
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import cache, metrics
+
+
+class ResponseCacheStatsView(APIView):
+    """
+    Hit/miss counters of the per-user response cache (this worker process),
+    overall and per view.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(cache.stats(), status=status.HTTP_200_OK)
+
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Counters and latency histograms of this worker process in the Prometheus
+    text format. Protected by METRICS_TOKEN when it is set.
+    """
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), settings.METRICS_TOKEN.encode()):
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(metrics.prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
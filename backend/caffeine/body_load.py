@@ -0,0 +1,93 @@
+"""
+Per-user caffeine body-load checkpoints.
+
+The checkpoint is rolled forward in O(1) for new intakes. Anything that
+changes the past (a back-dated, moved or deleted log, or a new half-life)
+rebuilds it from the few days of history that can still contribute.
+
+The checkpoint always covers every confirmed log, so a log dated in the
+future moves it ahead of the clock. Until the clock catches up, the current
+level is computed from the logs instead.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils.timezone import now
+
+from .decay import decay_factor, half_life_hours, levels_at, lookback_seconds
+from .models import CaffeineBodyLoad, CaffeineLog
+
+
+def current_level(user):
+    """Caffeine (mg) in the user's body right now."""
+    at = now()
+    snapshot = CaffeineBodyLoad.objects.filter(user=user).first()
+    if snapshot is None or snapshot.half_life_hours != half_life_hours(user.caffeine_sensitivity):
+        snapshot = rebuild(user, at)
+    if snapshot.as_of > at:
+        # Includes intakes that have not happened yet
+        return level_at(user, at)
+    elapsed = max((at - snapshot.as_of).total_seconds(), 0.0)
+    return float(snapshot.load_mg * decay_factor(elapsed, snapshot.half_life_hours))
+
+
+def record_intake(user, caffeine_mg, taken_at):
+    """Fold a newly saved log into the checkpoint."""
+    half_life = half_life_hours(user.caffeine_sensitivity)
+    with transaction.atomic():
+        snapshot = CaffeineBodyLoad.objects.select_for_update().filter(user=user).first()
+        if snapshot is None or snapshot.half_life_hours != half_life or taken_at < snapshot.as_of:
+            # Back-dated intakes change the past; recompute instead of guessing
+            return rebuild(user, max(taken_at, snapshot.as_of) if snapshot else taken_at)
+
+        elapsed = (taken_at - snapshot.as_of).total_seconds()
+        snapshot.load_mg = float(snapshot.load_mg * decay_factor(elapsed, half_life)) + caffeine_mg
+        snapshot.as_of = taken_at
+        snapshot.save(update_fields=["load_mg", "as_of", "updated_at"])
+        return snapshot
+
+
+def invalidate(user, changed_at):
+    """Recompute the checkpoint if a log at ``changed_at`` was already folded in."""
+    snapshot = CaffeineBodyLoad.objects.filter(user=user).first()
+    if snapshot is not None and changed_at <= snapshot.as_of:
+        rebuild(user, snapshot.as_of)
+
+
+def level_at(user, at):
+    """Caffeine (mg) in the user's body at ``at``, computed from the logs."""
+    half_life = half_life_hours(user.caffeine_sensitivity)
+    rows = list(
+        CaffeineLog.objects.filter(
+            user=user,
+            confirmed=True,
+            created_at__gte=at - timedelta(seconds=lookback_seconds(half_life)),
+            created_at__lte=at,
+        ).order_by("created_at").values_list("created_at", "caffeine_mg")
+    )
+    intake_times = [created.timestamp() for created, _ in rows]
+    intake_mg = [mg for _, mg in rows]
+    return float(levels_at([at.timestamp()], intake_times, intake_mg, half_life)[0])
+
+
+def rebuild(user, at=None):
+    """
+    Recompute the checkpoint at ``at`` (default now), or at the user's latest
+    log if that is later, from the history that still matters.
+    """
+    at = at or now()
+    latest = CaffeineLog.objects.filter(user=user, confirmed=True, created_at__gt=at).aggregate(
+        latest=Max("created_at")
+    )["latest"]
+    at = latest or at
+    snapshot, _ = CaffeineBodyLoad.objects.update_or_create(
+        user=user,
+        defaults={
+            "load_mg": level_at(user, at),
+            "as_of": at,
+            "half_life_hours": half_life_hours(user.caffeine_sensitivity),
+        },
+    )
+    return snapshot
@@ -0,0 +1,105 @@
+"""
+Maintenance and lookup of the shared Beverage catalog.
+
+The first confirmed log or Gemini analysis of a drink creates its entry;
+later confirmed logs only bump ``times_logged`` (one UPDATE by the unique
+``normalized_name``), so a single user's edits never rewrite shared facts.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Beverage
+
+FACT_FIELDS = [
+    "serving_size",
+    "caffeine_mg",
+    "total_fat_g",
+    "sodium_mg",
+    "total_carbohydrates_g",
+    "sugars_g",
+    "added_sugars_g",
+    "protein_g",
+    "taurine_mg",
+    "calories_kcal",
+    "b_vitamins",
+    "other_ingredients",
+]
+NUMERIC_FIELDS = [
+    "caffeine_mg",
+    "total_fat_g",
+    "sodium_mg",
+    "total_carbohydrates_g",
+    "sugars_g",
+    "added_sugars_g",
+    "protein_g",
+    "taurine_mg",
+    "calories_kcal",
+]
+NAME_LENGTH = Beverage._meta.get_field("normalized_name").max_length
+
+
+def normalize_name(name):
+    """Casefold and collapse whitespace: "  Monster  ZERO Ultra" -> "monster zero ultra"."""
+    return " ".join((name or "").casefold().split())[:NAME_LENGTH]
+
+
+def search(query, limit=10):
+    """Most-logged beverages whose normalized name starts with ``query``."""
+    prefix = normalize_name(query)
+    if not prefix:
+        return Beverage.objects.none()
+    return Beverage.objects.filter(normalized_name__startswith=prefix).order_by("-times_logged", "normalized_name")[:limit]
+
+
+def _create(name, facts, source, times_logged):
+    try:
+        with transaction.atomic():
+            return Beverage.objects.create(
+                name=" ".join(name.split())[:NAME_LENGTH],
+                normalized_name=normalize_name(name),
+                source=source,
+                times_logged=times_logged,
+                **facts,
+            )
+    except IntegrityError:
+        return None  # Someone else created it first
+
+
+def record_log(log):
+    """Count a confirmed log against its catalog entry, creating the entry if needed."""
+    if not log.confirmed or not normalize_name(log.beverage_name) or log.caffeine_mg is None:
+        return
+    updated = Beverage.objects.filter(normalized_name=normalize_name(log.beverage_name)).update(
+        times_logged=F("times_logged") + 1
+    )
+    if not updated and _create(log.beverage_name, {field: getattr(log, field) for field in FACT_FIELDS},
+                               Beverage.SOURCE_LOG, times_logged=1) is None:
+        record_log(log)
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def record_analysis(analysis):
+    """Add a parsed Gemini drink analysis to the catalog unless the drink is already known."""
+    if not isinstance(analysis, dict) or not isinstance(analysis.get("beverage_name"), str):
+        return
+    name = analysis["beverage_name"]
+    if not normalize_name(name) or Beverage.objects.filter(normalized_name=normalize_name(name)).exists():
+        return
+
+    # Analyses cached before structured output used "calories"; everything else uses the log field names
+    facts = {field: _number(analysis.get(field)) for field in NUMERIC_FIELDS}
+    facts["calories_kcal"] = _number(analysis.get("calories_kcal", analysis.get("calories")))
+    if facts["caffeine_mg"] is None:
+        return
+    for field in ("b_vitamins", "other_ingredients"):
+        facts[field] = analysis.get(field) if isinstance(analysis.get(field), dict) else None
+    serving_size = analysis.get("serving_size")
+    facts["serving_size"] = serving_size[:50] if isinstance(serving_size, str) else None
+    _create(name, facts, Beverage.SOURCE_ANALYSIS, times_logged=0)
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caffeine', '0004_rename_beverage_size_ml_caffeinelog_added_sugars_g_and_more'),
+        ('users', '0002_alter_user_caffeine_sensitivity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaffeineBodyLoad',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='caffeine_body_load', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('load_mg', models.FloatField(default=0)),
+                ('as_of', models.DateTimeField()),
+                ('half_life_hours', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caffeine', '0005_caffeinebodyload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='caffeinelog',
+            index=models.Index(fields=['user', '-created_at'], name='caffeine_log_user_created_idx'),
+        ),
+    ]
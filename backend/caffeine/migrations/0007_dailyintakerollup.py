@@ -0,0 +1,54 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:15
+
+import django.db.models.deletion
+from datetime import timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+ROLLUP_FIELDS = ["caffeine_mg", "sugars_g", "added_sugars_g", "calories_kcal", "sodium_mg", "total_carbohydrates_g"]
+
+
+def backfill_rollups(apps, schema_editor):
+    # Every user starts out on UTC (users.0003), so one grouped query covers everyone.
+    # Only confirmed logs count, the same as rollups.rebuild.
+    CaffeineLog = apps.get_model("caffeine", "CaffeineLog")
+    DailyIntakeRollup = apps.get_model("caffeine", "DailyIntakeRollup")
+    rows = (
+        CaffeineLog.objects.filter(confirmed=True).annotate(day=TruncDate("created_at", tzinfo=timezone.utc))
+        .values("user_id", "day")
+        .annotate(drinks=Count("id"), **{field: Coalesce(Sum(field), 0.0) for field in ROLLUP_FIELDS})
+    )
+    DailyIntakeRollup.objects.bulk_create((DailyIntakeRollup(**row) for row in rows), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caffeine', '0006_caffeinelog_user_created_index'),
+        ('users', '0003_user_timezone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyIntakeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('drinks', models.IntegerField(default=0)),
+                ('caffeine_mg', models.FloatField(default=0)),
+                ('sugars_g', models.FloatField(default=0)),
+                ('added_sugars_g', models.FloatField(default=0)),
+                ('calories_kcal', models.FloatField(default=0)),
+                ('sodium_mg', models.FloatField(default=0)),
+                ('total_carbohydrates_g', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_intake_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='caffeine_rollup_user_day_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
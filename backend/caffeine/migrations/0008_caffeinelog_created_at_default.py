@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caffeine', '0007_dailyintakerollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='caffeinelog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
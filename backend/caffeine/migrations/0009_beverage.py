@@ -0,0 +1,66 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:19
+
+import uuid
+from django.db import migrations, models
+
+
+def backfill_catalog(apps, schema_editor):
+    # First confirmed log of each drink supplies its facts; every confirmed log counts
+    CaffeineLog = apps.get_model("caffeine", "CaffeineLog")
+    Beverage = apps.get_model("caffeine", "Beverage")
+    fields = [
+        "serving_size", "caffeine_mg", "total_fat_g", "sodium_mg", "total_carbohydrates_g", "sugars_g",
+        "added_sugars_g", "protein_g", "taurine_mg", "calories_kcal", "b_vitamins", "other_ingredients",
+    ]
+    beverages = {}
+    logs = (
+        CaffeineLog.objects.filter(confirmed=True, beverage_name__isnull=False)
+        .order_by("created_at").values("beverage_name", *fields).iterator(chunk_size=2000)
+    )
+    for row in logs:
+        normalized = " ".join(row["beverage_name"].casefold().split())[:100]
+        if not normalized:
+            continue
+        if normalized in beverages:
+            beverages[normalized].times_logged += 1
+            continue
+        name = row.pop("beverage_name")
+        beverages[normalized] = Beverage(
+            name=" ".join(name.split())[:100], normalized_name=normalized, source="log", times_logged=1, **row
+        )
+    Beverage.objects.bulk_create(beverages.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caffeine', '0008_caffeinelog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Beverage',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('normalized_name', models.CharField(max_length=100, unique=True)),
+                ('serving_size', models.CharField(blank=True, max_length=50, null=True)),
+                ('caffeine_mg', models.FloatField()),
+                ('total_fat_g', models.FloatField(blank=True, null=True)),
+                ('sodium_mg', models.FloatField(blank=True, null=True)),
+                ('total_carbohydrates_g', models.FloatField(blank=True, null=True)),
+                ('sugars_g', models.FloatField(blank=True, null=True)),
+                ('added_sugars_g', models.FloatField(blank=True, null=True)),
+                ('protein_g', models.FloatField(blank=True, null=True)),
+                ('taurine_mg', models.FloatField(blank=True, null=True)),
+                ('calories_kcal', models.FloatField(blank=True, null=True)),
+                ('b_vitamins', models.JSONField(blank=True, null=True)),
+                ('other_ingredients', models.JSONField(blank=True, null=True)),
+                ('source', models.CharField(choices=[('log', 'Confirmed log'), ('analysis', 'Gemini analysis')], default='log', max_length=10)),
+                ('times_logged', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_catalog, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 from users.models import User
 
 class CaffeineLog(models.Model):
@@ -29,7 +30,98 @@ class CaffeineLog(models.Model):
     image_url = models.URLField(blank=True, null=True)
     additional_notes = models.TextField(blank=True, null=True)
     confirmed = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)  # Settable so imported history keeps its dates
+
+    class Meta:
+        indexes = [
+            # Backs per-user listings ordered by created_at DESC and time-range filters
+            models.Index(fields=["user", "-created_at"], name="caffeine_log_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.beverage_name} ({self.caffeine_mg} mg)"
+
+
+class CaffeineBodyLoad(models.Model):
+    """
+    Checkpoint of how much caffeine a user carried at ``as_of``.
+
+    Decay is memoryless, so the current level is ``load_mg`` decayed from
+    ``as_of`` to now, without reading any CaffeineLog rows.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="caffeine_body_load")
+    load_mg = models.FloatField(default=0)
+    as_of = models.DateTimeField()
+    half_life_hours = models.FloatField()  # Half-life the checkpoint was computed with
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.load_mg:.1f} mg at {self.as_of}"
+
+
+class DailyIntakeRollup(models.Model):
+    """
+    Per-user, per-day totals of caffeine and key nutrients.
+
+    ``day`` is the calendar day in the user's timezone. Rows are maintained
+    incrementally as logs are created, edited or deleted (see rollups.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_intake_rollups")
+    day = models.DateField()
+    drinks = models.IntegerField(default=0)
+    caffeine_mg = models.FloatField(default=0)
+    sugars_g = models.FloatField(default=0)
+    added_sugars_g = models.FloatField(default=0)
+    calories_kcal = models.FloatField(default=0)
+    sodium_mg = models.FloatField(default=0)
+    total_carbohydrates_g = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="caffeine_rollup_user_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.day}: {self.caffeine_mg} mg"
+
+
+class Beverage(models.Model):
+    """
+    Shared catalog of known drinks and their nutrition facts.
+
+    Entries are created from the first confirmed log or Gemini analysis of a
+    drink (see catalog.py) and looked up by ``normalized_name`` prefix for
+    autocomplete, so a known drink can be logged without another analysis.
+    On PostgreSQL Django pairs the unique index with a ``varchar_pattern_ops``
+    one, which serves the prefix lookups. Entries are shared by all users, so
+    they never carry anyone's photo.
+    """
+    SOURCE_LOG = "log"
+    SOURCE_ANALYSIS = "analysis"
+    SOURCE_CHOICES = [
+        (SOURCE_LOG, "Confirmed log"),
+        (SOURCE_ANALYSIS, "Gemini analysis"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100)
+    normalized_name = models.CharField(max_length=100, unique=True)  # Casefolded, single-spaced name
+    serving_size = models.CharField(max_length=50, blank=True, null=True)
+    caffeine_mg = models.FloatField()
+    total_fat_g = models.FloatField(blank=True, null=True)
+    sodium_mg = models.FloatField(blank=True, null=True)
+    total_carbohydrates_g = models.FloatField(blank=True, null=True)
+    sugars_g = models.FloatField(blank=True, null=True)
+    added_sugars_g = models.FloatField(blank=True, null=True)
+    protein_g = models.FloatField(blank=True, null=True)
+    taurine_mg = models.FloatField(blank=True, null=True)
+    calories_kcal = models.FloatField(blank=True, null=True)
+    b_vitamins = models.JSONField(blank=True, null=True)
+    other_ingredients = models.JSONField(blank=True, null=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default=SOURCE_LOG)
+    times_logged = models.IntegerField(default=0)  # Ranks autocomplete suggestions
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.caffeine_mg} mg)"
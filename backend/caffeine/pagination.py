@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CaffeineLogCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a user's logs, newest first.
+
+    The cursor encodes the last seen ``created_at``, so every page is an index
+    range scan on (user, created_at) no matter how deep the client pages.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = ("-created_at", "-id")
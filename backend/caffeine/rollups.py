@@ -0,0 +1,62 @@
+"""
+Maintenance of DailyIntakeRollup rows.
+
+Each log write adjusts exactly one (user, day) row with F() expressions, so
+totals stay correct under concurrent writes. ``rebuild`` recomputes a user's
+rows in one grouped query, for backfills and timezone changes.
+"""
+
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+from .models import CaffeineLog, DailyIntakeRollup
+
+ROLLUP_FIELDS = [
+    "caffeine_mg",
+    "sugars_g",
+    "added_sugars_g",
+    "calories_kcal",
+    "sodium_mg",
+    "total_carbohydrates_g",
+]
+
+
+def user_timezone(user):
+    return ZoneInfo(user.timezone or "UTC")
+
+
+def local_day(user, moment):
+    return moment.astimezone(user_timezone(user)).date()
+
+
+def apply(log, sign):
+    """Add (sign=1) or remove (sign=-1) a log's contribution to its day."""
+    day = local_day(log.user, log.created_at)
+    rollup, _ = DailyIntakeRollup.objects.get_or_create(user=log.user, day=day)
+    changes = {"drinks": F("drinks") + sign}
+    for field in ROLLUP_FIELDS:
+        value = getattr(log, field)
+        if value:
+            changes[field] = F(field) + sign * value
+    DailyIntakeRollup.objects.filter(pk=rollup.pk).update(**changes)
+
+
+def rebuild(user):
+    """Recompute all of a user's rollups from their logs."""
+    rows = (
+        CaffeineLog.objects.filter(user=user, confirmed=True)
+        .annotate(day=TruncDate("created_at", tzinfo=user_timezone(user)))
+        .values("day")
+        .annotate(
+            drinks=Count("id"),
+            **{field: Coalesce(Sum(field), 0.0) for field in ROLLUP_FIELDS},
+        )
+    )
+    with transaction.atomic():
+        DailyIntakeRollup.objects.filter(user=user).delete()
+        DailyIntakeRollup.objects.bulk_create(
+            [DailyIntakeRollup(user=user, **row) for row in rows], batch_size=1000
+        )
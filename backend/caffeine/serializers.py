@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import CaffeineLog
+from .models import Beverage, CaffeineLog, DailyIntakeRollup
 
 class CaffeineLogSerializer(serializers.ModelSerializer):
     class Meta:
@@ -28,6 +28,75 @@ class CaffeineLogSerializer(serializers.ModelSerializer):
         read_only_fields = ["user", "created_at", "confirmed"]
 
 
+class CaffeineLogUpdateSerializer(CaffeineLogSerializer):
+    """Edits a log; ``confirmed: true`` turns a draft from drink analysis into a counted log."""
+
+    class Meta(CaffeineLogSerializer.Meta):
+        read_only_fields = ["user", "created_at"]
+
+    def validate_confirmed(self, value):
+        if not value and self.instance is not None and self.instance.confirmed:
+            raise serializers.ValidationError("A confirmed log cannot be unconfirmed.")
+        return value
+
+
+class CaffeineLogImportSerializer(CaffeineLogSerializer):
+    """Validates one imported row; unlike the API serializer it accepts ``created_at``."""
+    created_at = serializers.DateTimeField(required=False)
+
+    class Meta(CaffeineLogSerializer.Meta):
+        read_only_fields = ["id", "user", "confirmed"]
+
+
+class BeverageLogSerializer(serializers.Serializer):
+    """Optional body of a log created from a catalog beverage."""
+    additional_notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
 class CaffeineOverTimeSerializer(serializers.Serializer):
     date = serializers.DateTimeField()
     caffeine_remaining_mg = serializers.FloatField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Render timestamps in the requested timezone instead of settings.TIME_ZONE
+        tz = self.context.get("tz")
+        if tz is not None:
+            self.fields["date"].timezone = tz
+
+
+class DailyIntakeRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyIntakeRollup
+        fields = [
+            "day",
+            "drinks",
+            "caffeine_mg",
+            "sugars_g",
+            "added_sugars_g",
+            "calories_kcal",
+            "sodium_mg",
+            "total_carbohydrates_g",
+        ]
+
+
+class BeverageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Beverage
+        fields = [
+            "id",
+            "name",
+            "serving_size",
+            "caffeine_mg",
+            "total_fat_g",
+            "sodium_mg",
+            "total_carbohydrates_g",
+            "sugars_g",
+            "added_sugars_g",
+            "protein_g",
+            "taurine_mg",
+            "calories_kcal",
+            "b_vitamins",
+            "other_ingredients",
+            "times_logged",
+        ]
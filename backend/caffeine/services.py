@@ -0,0 +1,48 @@
+"""
+Side effects of CaffeineLog writes.
+
+Views (and anything else that writes logs) call these after saving so the
+derived per-user state stays consistent with the log table. Unconfirmed logs
+(drafts from drink photo analysis) count towards nothing until confirmed.
+"""
+
+from users import versioning
+from . import body_load, catalog, rollups
+
+
+def log_created(log):
+    if not log.confirmed:
+        versioning.bump(log.user)
+        return
+    body_load.record_intake(log.user, log.caffeine_mg, log.created_at)
+    rollups.apply(log, 1)
+    catalog.record_log(log)
+    versioning.bump(log.user)
+
+
+def log_updated(log, previous):
+    """``previous`` is the row as it was before the update."""
+    if not previous.confirmed:
+        log_created(log)  # A draft being edited or confirmed
+        return
+    if log.caffeine_mg != previous.caffeine_mg or log.created_at != previous.created_at:
+        body_load.invalidate(log.user, min(log.created_at, previous.created_at))
+    rollups.apply(previous, -1)
+    rollups.apply(log, 1)
+    versioning.bump(log.user)
+
+
+def log_deleted(log):
+    if not log.confirmed:
+        versioning.bump(log.user)
+        return
+    body_load.invalidate(log.user, log.created_at)
+    rollups.apply(log, -1)
+    versioning.bump(log.user)
+
+
+def logs_imported(user):
+    """Many logs were bulk inserted (possibly back-dated); recompute everything derived."""
+    body_load.rebuild(user)
+    rollups.rebuild(user)
+    versioning.bump(user)
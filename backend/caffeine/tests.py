@@ -1,3 +1,481 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users.models import User
+from . import body_load, catalog, rollups, services, transfer
+from .decay import half_life_hours, levels_at
+from .models import Beverage, CaffeineBodyLoad, CaffeineLog, DailyIntakeRollup
+
+
+def brute_force_levels(times, intake_times, intake_mg, half_life_h):
+    half_life_s = half_life_h * 3600.0
+    return np.array([
+        sum(mg * 0.5 ** ((t - t0) / half_life_s) for t0, mg in zip(intake_times, intake_mg) if t0 <= t)
+        for t in times
+    ])
+
+
+def make_user(email="user@example.com", **extra):
+    return User.objects.create_user(email=email, password="password", username=email.split("@")[0], **extra)
+
+
+def make_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+    return client
+
+
+def add_log(user, caffeine_mg, created_at, confirmed=True, **fields):
+    log = CaffeineLog.objects.create(
+        user=user, caffeine_mg=caffeine_mg, created_at=created_at, confirmed=confirmed, **fields
+    )
+    services.log_created(log)
+    return log
+
+
+class DecayTests(TestCase):
+    def test_single_intake_halves_every_half_life(self):
+        levels = levels_at([0, 3600, 5 * 3600, 10 * 3600], [3600], [100.0], 5.0)
+        np.testing.assert_allclose(levels, [0.0, 100.0, 100.0 * 0.5 ** 0.8, 100.0 * 0.5 ** 1.8])
+
+    def test_matches_brute_force_in_any_query_order(self):
+        rng = np.random.default_rng(7)
+        intake_times = np.sort(rng.uniform(0, 72 * 3600, 40))
+        intake_mg = rng.uniform(20, 200, 40)
+        times = rng.uniform(-3600, 80 * 3600, 200)  # Unsorted, some before the first intake
+        np.testing.assert_allclose(
+            levels_at(times, intake_times, intake_mg, 4.0),
+            brute_force_levels(times, intake_times, intake_mg, 4.0),
+            rtol=1e-9, atol=1e-9,
+        )
+
+    def test_spans_longer_than_one_block(self):
+        # 600 hours at a 1.5 hour half-life is 400 half-lives, more than one 256 half-life block
+        intake_times = np.arange(0, 600 * 3600, 7 * 3600, dtype=np.float64)
+        intake_mg = np.full(intake_times.shape, 80.0)
+        times = np.linspace(0, 600 * 3600, 500)
+        levels = levels_at(times, intake_times, intake_mg, 1.5)
+        self.assertTrue(np.all(np.isfinite(levels)))
+        np.testing.assert_allclose(
+            levels, brute_force_levels(times, intake_times, intake_mg, 1.5), rtol=1e-9, atol=1e-9
+        )
+
+    def test_empty_inputs(self):
+        self.assertEqual(levels_at([], [0], [100], 5.0).shape, (0,))
+        np.testing.assert_array_equal(levels_at([0, 1], [], [], 5.0), [0.0, 0.0])
+
+    def test_half_life_follows_sensitivity(self):
+        self.assertEqual(half_life_hours(0.5), 5.0)
+        self.assertEqual(half_life_hours(None), 5.0)
+        self.assertLess(half_life_hours(1.0), half_life_hours(0.25))
+        self.assertEqual(half_life_hours(100), 1.5)  # Clamped
+
+
+class CaffeineOverTimeTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = make_client(self.user)
+
+    def test_columnar_curve_includes_recent_intakes(self):
+        add_log(self.user, 100, now() - timedelta(hours=2))
+        add_log(self.user, 500, now() - timedelta(hours=1), confirmed=False)  # Drafts are left out
+        response = self.client.get("/api/caffeine/caffeine-over-time/?range=6h&resolution=15&layout=columnar")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["step_seconds"], 900)
+        self.assertEqual(len(body["caffeine_remaining_mg"]), 2 * 6 * 4 + 1)
+        self.assertEqual(body["intakes"]["caffeine_mg"], [100.0])
+        self.assertLessEqual(max(body["caffeine_remaining_mg"]), 100.0)
+
+    def test_rows_match_the_columnar_levels(self):
+        add_log(self.user, 100, now() - timedelta(hours=2))
+        rows = self.client.get("/api/caffeine/caffeine-over-time/?range=6h&resolution=15").json()
+        columnar = self.client.get("/api/caffeine/caffeine-over-time/?range=6h&resolution=15&layout=columnar").json()
+        self.assertEqual([row["caffeine_remaining_mg"] for row in rows], columnar["caffeine_remaining_mg"])
+
+    def test_invalid_parameters(self):
+        for query in ("range=91d", "range=99999999999d", "range=7w", "resolution=0",
+                      "range=90d&resolution=1", "tz=Mars/Olympus", "layout=csv"):
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/caffeine/caffeine-over-time/?{query}")
+                self.assertEqual(response.status_code, 400)
+
+
+class BodyLoadTests(TestCase):
+    def setUp(self):
+        self.user = make_user()  # Default sensitivity: 5 hour half-life
+        self.start = now() - timedelta(hours=20)
+
+    def load(self):
+        return CaffeineBodyLoad.objects.get(user=self.user)
+
+    def move(self, log, **changes):
+        previous = CaffeineLog.objects.get(pk=log.pk)
+        for field, value in changes.items():
+            setattr(log, field, value)
+        log.save()
+        services.log_updated(log, previous)
+
+    def test_new_intakes_roll_the_checkpoint_forward(self):
+        add_log(self.user, 100, self.start)
+        add_log(self.user, 50, self.start + timedelta(hours=5))
+
+        snapshot = self.load()
+        self.assertEqual(snapshot.as_of, self.start + timedelta(hours=5))
+        self.assertAlmostEqual(snapshot.load_mg, 100.0)  # 100 * 0.5 + 50
+
+        rebuilt = body_load.rebuild(self.user, snapshot.as_of)
+        self.assertAlmostEqual(rebuilt.load_mg, 100.0)
+
+    def test_back_dated_intake_rebuilds(self):
+        add_log(self.user, 100, self.start + timedelta(hours=10))
+        add_log(self.user, 100, self.start)  # Earlier than the checkpoint
+
+        snapshot = self.load()
+        self.assertEqual(snapshot.as_of, self.start + timedelta(hours=10))
+        self.assertAlmostEqual(snapshot.load_mg, 100.0 + 25.0)
+
+    def test_deleting_a_folded_in_log_rebuilds(self):
+        first = add_log(self.user, 100, self.start)
+        add_log(self.user, 100, self.start + timedelta(hours=5))
+        first.delete()
+        services.log_deleted(first)
+        self.assertAlmostEqual(self.load().load_mg, 100.0)
+
+    def test_editing_a_log_forward_in_time_keeps_its_dose(self):
+        add_log(self.user, 100, self.start)
+        latest = add_log(self.user, 100, self.start + timedelta(hours=5))
+        self.move(latest, created_at=self.start + timedelta(hours=10))
+
+        snapshot = self.load()
+        self.assertEqual(snapshot.as_of, self.start + timedelta(hours=10))
+        self.assertAlmostEqual(snapshot.load_mg, 100.0 + 25.0)
+        self.assertAlmostEqual(body_load.current_level(self.user), 125.0 * 0.5 ** 2, places=2)
+
+    def test_future_dated_intake_counts_once_it_happens(self):
+        add_log(self.user, 160, now() - timedelta(hours=10))
+        future = now() + timedelta(hours=5)
+        add_log(self.user, 100, future)
+
+        self.assertEqual(self.load().as_of, future)
+        self.assertAlmostEqual(body_load.current_level(self.user), 40.0, places=2)
+        with mock.patch.object(body_load, "now", return_value=future + timedelta(hours=5)):
+            self.assertAlmostEqual(body_load.current_level(self.user), 10.0 + 50.0, places=2)
+
+    def test_editing_a_log_into_the_future(self):
+        add_log(self.user, 160, now() - timedelta(hours=10))
+        log = add_log(self.user, 100, now() - timedelta(hours=1))
+        future = now() + timedelta(hours=5)
+        self.move(log, created_at=future)
+
+        self.assertAlmostEqual(body_load.current_level(self.user), 40.0, places=2)
+        with mock.patch.object(body_load, "now", return_value=future):
+            self.assertAlmostEqual(body_load.current_level(self.user), 20.0 + 100.0, places=2)
+
+    def test_drafts_do_not_count_until_confirmed(self):
+        add_log(self.user, 100, self.start)
+        draft = add_log(self.user, 300, self.start + timedelta(hours=5), confirmed=False)
+        self.assertAlmostEqual(self.load().load_mg, 100.0)
+
+        self.move(draft, confirmed=True)
+        self.assertAlmostEqual(self.load().load_mg, 350.0)
+
+    def test_current_level_decays_from_the_checkpoint(self):
+        add_log(self.user, 160, now() - timedelta(hours=10))
+        self.assertAlmostEqual(body_load.current_level(self.user), 40.0, places=2)
+
+    def test_new_half_life_rebuilds(self):
+        add_log(self.user, 160, now() - timedelta(hours=10))
+        self.user.caffeine_sensitivity = 1.0  # 2.5 hour half-life
+        self.user.save()
+        self.assertAlmostEqual(body_load.current_level(self.user), 10.0, places=2)
+
+    def test_current_level_endpoint(self):
+        add_log(self.user, 160, now() - timedelta(hours=10))
+        response = make_client(self.user).get("/api/caffeine/current-level/")
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.json()["caffeine_mg"], 40.0, places=1)
+        self.assertEqual(response.json()["half_life_hours"], 5.0)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = make_user(timezone="America/Los_Angeles")
+        # 06:00 UTC on March 10th is still March 9th in Los Angeles
+        self.moment = datetime(2024, 3, 10, 6, 0, tzinfo=dt_timezone.utc)
+
+    def rows(self):
+        return {
+            row.day: (row.drinks, row.caffeine_mg, row.sugars_g)
+            for row in DailyIntakeRollup.objects.filter(user=self.user)
+        }
+
+    def test_apply_buckets_by_local_day(self):
+        add_log(self.user, 80, self.moment, sugars_g=10)
+        add_log(self.user, 120, self.moment + timedelta(hours=9), sugars_g=None)
+        self.assertEqual(self.rows(), {date(2024, 3, 9): (1, 80.0, 10.0), date(2024, 3, 10): (1, 120.0, 0.0)})
+
+    def test_rebuild_matches_incremental_updates(self):
+        add_log(self.user, 80, self.moment, sugars_g=10)
+        add_log(self.user, 120, self.moment + timedelta(hours=1), sugars_g=5)
+        log = add_log(self.user, 40, self.moment + timedelta(days=1))
+        previous = CaffeineLog.objects.get(pk=log.pk)
+        log.caffeine_mg = 60
+        log.save()
+        services.log_updated(log, previous)
+        incremental = self.rows()
+
+        rollups.rebuild(self.user)
+        self.assertEqual(self.rows(), incremental)
+        self.assertEqual(incremental[date(2024, 3, 9)], (2, 200.0, 15.0))
+        self.assertEqual(incremental[date(2024, 3, 10)][1], 60.0)
+
+    def test_deleted_logs_are_subtracted(self):
+        add_log(self.user, 80, self.moment)
+        log = add_log(self.user, 40, self.moment)
+        log.delete()
+        services.log_deleted(log)
+        self.assertEqual(self.rows(), {date(2024, 3, 9): (1, 80.0, 0.0)})
+
+    def test_unconfirmed_logs_are_left_out(self):
+        add_log(self.user, 80, self.moment)
+        add_log(self.user, 500, self.moment, confirmed=False)
+        self.assertEqual(self.rows(), {date(2024, 3, 9): (1, 80.0, 0.0)})
+        rollups.rebuild(self.user)
+        self.assertEqual(self.rows(), {date(2024, 3, 9): (1, 80.0, 0.0)})
+
+    def test_rebuild_after_timezone_change(self):
+        add_log(self.user, 80, self.moment)
+        self.user.timezone = "UTC"
+        self.user.save()
+        rollups.rebuild(self.user)
+        self.assertEqual(self.rows(), {date(2024, 3, 10): (1, 80.0, 0.0)})
+
+    def test_daily_endpoint_fills_empty_days(self):
+        add_log(self.user, 80, self.moment)
+        response = make_client(self.user).get("/api/caffeine/daily/?start=2024-03-08&end=2024-03-10")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["day"], row["drinks"], row["caffeine_mg"]) for row in response.json()],
+            [("2024-03-08", 0, 0.0), ("2024-03-09", 1, 80.0), ("2024-03-10", 0, 0.0)],
+        )
+
+    def test_today_endpoint(self):
+        add_log(self.user, 80, now())
+        add_log(self.user, 300, now(), confirmed=False)
+        body = make_client(self.user).get("/api/caffeine/daily/today/").json()
+        self.assertEqual((body["drinks"], body["caffeine_mg"]), (1, 80.0))
+
+
+class BeverageCatalogTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = make_client(self.user)
+
+    def test_normalize_name(self):
+        self.assertEqual(catalog.normalize_name("  Monster  ZERO\tUltra "), "monster zero ultra")
+        self.assertEqual(catalog.normalize_name(None), "")
+        self.assertEqual(len(catalog.normalize_name("x" * 500)), catalog.NAME_LENGTH)
+
+    def test_confirmed_logs_create_then_count_one_entry(self):
+        add_log(self.user, 160, now(), beverage_name="Monster  Energy", sugars_g=54)
+        add_log(self.user, 999, now(), beverage_name="monster energy")  # Facts are not rewritten
+        add_log(self.user, 160, now(), beverage_name="Monster Energy", confirmed=False)
+
+        beverage = Beverage.objects.get()
+        self.assertEqual((beverage.name, beverage.normalized_name), ("Monster Energy", "monster energy"))
+        self.assertEqual((beverage.caffeine_mg, beverage.sugars_g, beverage.times_logged), (160.0, 54.0, 2))
+        self.assertEqual(beverage.source, Beverage.SOURCE_LOG)
+
+    def test_analysis_adds_unknown_drinks_only(self):
+        catalog.record_analysis({"beverage_name": "Red Bull", "caffeine_mg": "80", "calories": 110})
+        catalog.record_analysis({"beverage_name": "RED BULL", "caffeine_mg": 200})
+        catalog.record_analysis({"beverage_name": "Mystery", "caffeine_mg": None})
+
+        beverage = Beverage.objects.get()
+        self.assertEqual((beverage.caffeine_mg, beverage.calories_kcal), (80.0, 110.0))
+        self.assertEqual((beverage.source, beverage.times_logged), (Beverage.SOURCE_ANALYSIS, 0))
+
+    def test_search_by_prefix_most_logged_first(self):
+        for name, logged in (("Coke", 1), ("Coffee", 5), ("Cold Brew", 3), ("Espresso", 9)):
+            Beverage.objects.create(name=name, normalized_name=catalog.normalize_name(name),
+                                    caffeine_mg=50, times_logged=logged)
+        self.assertEqual([b.name for b in catalog.search("  CO")], ["Coffee", "Cold Brew", "Coke"])
+        self.assertEqual([b.name for b in catalog.search("co", limit=1)], ["Coffee"])
+        self.assertEqual(list(catalog.search("   ")), [])
+
+        response = self.client.get("/api/caffeine/beverages/?q=cold")
+        self.assertEqual([row["name"] for row in response.json()], ["Cold Brew"])
+        self.assertEqual(self.client.get("/api/caffeine/beverages/?q=co&limit=x").status_code, 400)
+
+    def test_logging_a_known_beverage(self):
+        beverage = Beverage.objects.create(name="Espresso", normalized_name="espresso", caffeine_mg=64,
+                                           serving_size="1 shot")
+        response = self.client.post(f"/api/caffeine/beverages/{beverage.pk}/log/",
+                                    {"additional_notes": "double"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        log = CaffeineLog.objects.get(pk=response.json()["id"])
+        self.assertEqual((log.beverage_name, log.caffeine_mg, log.serving_size), ("Espresso", 64.0, "1 shot"))
+        self.assertTrue(log.confirmed)
+        self.assertEqual(log.additional_notes, "double")
+        beverage.refresh_from_db()
+        self.assertEqual(beverage.times_logged, 1)
+        self.assertEqual(DailyIntakeRollup.objects.get(user=self.user).caffeine_mg, 64.0)
+
+    def test_logging_rejects_bad_bodies_and_unknown_drinks(self):
+        beverage = Beverage.objects.create(name="Espresso", normalized_name="espresso", caffeine_mg=64)
+        response = self.client.post(f"/api/caffeine/beverages/{beverage.pk}/log/", [1, 2], format="json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/caffeine/beverages/00000000-0000-0000-0000-000000000000/log/",
+                                    {}, format="json")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(CaffeineLog.objects.exists())
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = make_client(self.user)
+        self.other = make_user("other@example.com")
+        start = datetime(2024, 1, 1, 8, 0, tzinfo=dt_timezone.utc)
+        self.logs = [
+            add_log(self.user, 95, start, beverage_name="Coffee, black", sugars_g=0),
+            add_log(self.user, 160, start + timedelta(hours=5), beverage_name="Monster",
+                    b_vitamins={"vitamin_b6_mg": 2}, other_ingredients={"carbonated_water": True},
+                    additional_notes='said "zero"'),
+            add_log(self.user, 64, start + timedelta(days=1), beverage_name="Espresso"),
+        ]
+        add_log(self.user, 500, start, confirmed=False)  # Drafts are not exported
+
+    def export(self, fmt, query=""):
+        response = self.client.get(f"/api/caffeine/logs/export/{fmt}/{query}")
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def comparable(self, user):
+        return [
+            {field: row[field] for field in transfer.EXPORT_FIELDS if field != "id"}
+            for row in CaffeineLog.objects.filter(user=user, confirmed=True)
+            .order_by("created_at").values(*transfer.EXPORT_FIELDS)
+        ]
+
+    def import_file(self, name, content, query=""):
+        client = make_client(self.other)
+        return client.post(f"/api/caffeine/logs/import/{query}",
+                           {"file": SimpleUploadedFile(name, content)}, format="multipart")
+
+    def test_ndjson_round_trip(self):
+        content = self.export("ndjson")
+        self.assertEqual(len(content.splitlines()), 3)
+        response = self.import_file("logs.ndjson", content)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["imported"], 3)
+        self.assertEqual(self.comparable(self.other), self.comparable(self.user))
+
+    def test_csv_round_trip(self):
+        content = self.export("csv")
+        self.assertTrue(content.startswith(b"id,"))
+        response = self.import_file("logs.csv", content)
+        self.assertEqual(response.json()["imported"], 3)
+        self.assertEqual(self.comparable(self.other), self.comparable(self.user))
+
+    def test_import_rebuilds_derived_state(self):
+        self.import_file("logs.ndjson", self.export("ndjson"))
+        self.assertEqual(
+            list(DailyIntakeRollup.objects.filter(user=self.other).order_by("day").values_list("drinks", "caffeine_mg")),
+            [(2, 255.0), (1, 64.0)],
+        )
+        self.assertTrue(CaffeineBodyLoad.objects.filter(user=self.other).exists())
+
+    def test_export_range(self):
+        content = self.export("ndjson", "?since=2024-01-01T12:00:00Z&until=2024-01-02T00:00:00Z")
+        self.assertEqual([json.loads(line)["beverage_name"] for line in content.splitlines()], ["Monster"])
+
+    @override_settings(CAFFEINE_EXPORT_CHUNK_SIZE=2)
+    async def test_asgi_export_streams_keyset_pages(self):
+        await sync_to_async(add_log)(self.user, 30, self.logs[0].created_at, beverage_name="Tea")  # Same instant
+        expected = await sync_to_async(lambda: list(transfer.ndjson_lines(transfer.export_rows(
+            CaffeineLog.objects.filter(user=self.user, confirmed=True)
+        ))))()
+
+        token = await sync_to_async(lambda: Token.objects.get(user=self.user).key)()
+        response = await AsyncClient().get("/api/caffeine/logs/export/ndjson/", headers={"authorization": f"Token {token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)  # Not collected into a list by Django first
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(b"".join(lines).decode(), "".join(expected))
+        self.assertEqual(len(expected), 4)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        client = make_client(self.other)
+        response = client.post("/api/caffeine/logs/import/", [
+            {"caffeine_mg": 80, "created_at": "2024-02-01T08:00:00Z"},
+            {"beverage_name": "No caffeine"},
+            "not an object",
+        ], format="json")
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body["imported"], body["failed"]), (1, 2))
+        self.assertEqual([error["row"] for error in body["errors"]], [1, 2])
+
+    def test_dry_run_saves_nothing(self):
+        response = self.import_file("logs.ndjson", self.export("ndjson"), "?dry_run=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["imported"], response.json()["dry_run"]), (3, True))
+        self.assertFalse(CaffeineLog.objects.filter(user=self.other).exists())
+
+    def test_unreadable_file_rolls_back(self):
+        response = self.import_file("logs.ndjson", b'{"caffeine_mg": 10}\n{broken\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CaffeineLog.objects.filter(user=self.other).exists())
+
+    @override_settings(CAFFEINE_IMPORT_MAX_ROWS=2)
+    def test_row_limit(self):
+        response = self.import_file("logs.ndjson", self.export("ndjson"))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CaffeineLog.objects.filter(user=self.other).exists())
+
+
+class CaffeineLogPaginationTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = make_client(self.user)
+        start = now() - timedelta(days=1)
+        self.logs = [add_log(self.user, 10 + i, start + timedelta(minutes=i)) for i in range(7)]
+
+    def test_pages_newest_first_without_gaps(self):
+        seen = []
+        url = "/api/caffeine/logs/?page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row["id"] for row in response.json()["results"]]
+            url = response.json()["next"]
+        self.assertEqual(seen, [str(log.pk) for log in reversed(self.logs)])
+
+    def test_new_logs_do_not_shift_later_pages(self):
+        first = self.client.get("/api/caffeine/logs/?page_size=3").json()
+        add_log(self.user, 99, now())
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([row["id"] for row in second["results"]], [str(log.pk) for log in self.logs[3::-1][:3]])
+
+    def test_drafts_are_listed_separately(self):
+        draft = add_log(self.user, 99, now(), confirmed=False)
+        confirmed = self.client.get("/api/caffeine/logs/").json()["results"]
+        drafts = self.client.get("/api/caffeine/logs/?confirmed=false").json()["results"]
+        self.assertNotIn(str(draft.pk), [row["id"] for row in confirmed])
+        self.assertEqual([row["id"] for row in drafts], [str(draft.pk)])
+
+    def test_other_users_logs_are_not_listed(self):
+        add_log(make_user("other@example.com"), 50, now())
+        results = self.client.get("/api/caffeine/logs/?page_size=50").json()["results"]
+        self.assertEqual(len(results), len(self.logs))
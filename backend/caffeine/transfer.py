@@ -0,0 +1,172 @@
+"""
+Bulk export and import of caffeine logs.
+
+Exports walk the queryset with ``.iterator()`` (a server-side cursor on
+PostgreSQL) and are written out row by row, so memory use does not grow with
+the size of the history. Under ASGI a sync iterator would be read into a list
+before streaming, so ``aexport_rows`` pages through the rows by keyset
+instead, one ``sync_to_async`` query per chunk. Imports are validated and inserted with
+``bulk_create`` one chunk at a time; rows that fail validation are reported
+by position and skipped, and derived state is rebuilt once at the end. A
+file that cannot be parsed at all rolls the whole import back.
+"""
+
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from . import services
+from .models import CaffeineLog
+from .serializers import CaffeineLogImportSerializer, CaffeineLogSerializer
+
+EXPORT_FIELDS = [field for field in CaffeineLogSerializer.Meta.fields if field != "user"]
+JSON_FIELDS = {"b_vitamins", "other_ingredients"}
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def export_rows(queryset):
+    """Yield plain dicts for ``queryset`` in chronological order, a chunk at a time."""
+    return (
+        queryset.order_by("created_at", "id")
+        .values(*EXPORT_FIELDS)
+        .iterator(chunk_size=settings.CAFFEINE_EXPORT_CHUNK_SIZE)
+    )
+
+
+async def aexport_rows(queryset):
+    """Async counterpart of ``export_rows``: keyset pages of CAFFEINE_EXPORT_CHUNK_SIZE rows."""
+    chunk_size = settings.CAFFEINE_EXPORT_CHUNK_SIZE
+    rows = queryset.order_by("created_at", "id").values(*EXPORT_FIELDS)
+    page = await sync_to_async(list)(rows[:chunk_size])
+    while page:
+        for row in page:
+            yield row
+        if len(page) < chunk_size:
+            return
+        last = page[-1]
+        after = Q(created_at__gt=last["created_at"]) | Q(created_at=last["created_at"], id__gt=last["id"])
+        page = await sync_to_async(list)(rows.filter(after)[:chunk_size])
+
+
+def _ndjson_line(row):
+    return json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield _ndjson_line(row)
+
+
+async def andjson_lines(rows):
+    async for row in rows:
+        yield _ndjson_line(row)
+
+
+class _Echo:
+    """File-like object whose ``write`` hands back the line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_line(writer, row):
+    return writer.writerow([
+        json.dumps(row[field]) if field in JSON_FIELDS and row[field] is not None
+        else row[field].isoformat() if field == "created_at"
+        else row[field]
+        for field in EXPORT_FIELDS
+    ])
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield _csv_line(writer, row)
+
+
+async def acsv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    async for row in rows:
+        yield _csv_line(writer, row)
+
+
+def read_ndjson(stream):
+    for number, line in enumerate(io.TextIOWrapper(stream, encoding="utf-8"), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ImportFormatError(f"Line {number} is not valid JSON: {e}")
+
+
+def read_csv(stream):
+    for row in csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")):
+        cleaned = {}
+        for field, value in row.items():
+            if field is None or value in (None, ""):
+                continue  # Extra columns and empty cells
+            if field in JSON_FIELDS:
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass  # Leave it to the serializer to reject
+            cleaned[field] = value
+        yield cleaned
+
+
+def import_rows(user, rows, dry_run=False):
+    """
+    Validate and insert ``rows`` (an iterable of dicts) for ``user``.
+
+    Returns ``{"imported", "failed", "errors"}`` where ``errors`` lists the
+    first MAX_REPORTED_ERRORS failures as ``{"row": <0-based index>, "errors": ...}``.
+    """
+    # One serializer instance validates every row, so its fields are built once
+    serializer = CaffeineLogImportSerializer()
+    chunk_size = settings.CAFFEINE_IMPORT_CHUNK_SIZE
+    imported = failed = 0
+    errors = []
+    chunk = []
+
+    def flush():
+        if chunk and not dry_run:
+            CaffeineLog.objects.bulk_create(chunk, batch_size=chunk_size)
+        chunk.clear()
+
+    # Chunks bound memory; the transaction keeps a malformed file from leaving half an import
+    with transaction.atomic():
+        for index, row in enumerate(rows):
+            if index >= settings.CAFFEINE_IMPORT_MAX_ROWS:
+                raise ImportFormatError(f"Imports are limited to {settings.CAFFEINE_IMPORT_MAX_ROWS} rows.")
+            try:
+                if not isinstance(row, dict):
+                    raise ValidationError({"non_field_errors": ["Expected an object."]})
+                data = serializer.run_validation(row)
+            except ValidationError as e:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"row": index, "errors": e.detail})
+                continue
+            chunk.append(CaffeineLog(user=user, confirmed=True, **data))
+            imported += 1
+            if len(chunk) >= chunk_size:
+                flush()
+        flush()
+
+        if imported and not dry_run:
+            services.logs_imported(user)
+    return {"imported": imported, "failed": failed, "errors": errors}
@@ -1,11 +1,19 @@
 from django.urls import path
-from .views import CaffeineLogCreateAPIView, CaffeineLogListAPIView, CaffeineLogDetailAPIView, CaffeineOverTimeAPIView
+from .views import BeverageLogCreateAPIView, BeverageSearchAPIView, CaffeineLogCreateAPIView, CaffeineLogListAPIView, CaffeineLogDetailAPIView, CaffeineLogExportAPIView, CaffeineLogImportAPIView, CaffeineOverTimeAPIView, CurrentCaffeineLevelAPIView, DailyIntakeListAPIView, TodayIntakeAPIView
 
 urlpatterns = [
     path('logs/', CaffeineLogListAPIView.as_view(), name='caffeine-log-list'),  # List all logs
     path('logs/create/', CaffeineLogCreateAPIView.as_view(), name='caffeine-log-create'),  # Create log
-    path('logs/<uuid:pk>/', CaffeineLogDetailAPIView.as_view(), name='caffeine-log-detail'),  # Retrieve single log by UUID
+    path('logs/export/ndjson/', CaffeineLogExportAPIView.as_view(export_format='ndjson'), name='caffeine-log-export-ndjson'),  # Streamed, one JSON object per line
+    path('logs/export/csv/', CaffeineLogExportAPIView.as_view(export_format='csv'), name='caffeine-log-export-csv'),
+    path('logs/import/', CaffeineLogImportAPIView.as_view(), name='caffeine-log-import'),  # Bulk import (JSON list or file upload)
+    path('logs/<uuid:pk>/', CaffeineLogDetailAPIView.as_view(), name='caffeine-log-detail'),  # Retrieve, update or delete a log by UUID
     path('caffeine-over-time/', CaffeineOverTimeAPIView.as_view(), name='caffeine-over-time'), 
+    path('daily/', DailyIntakeListAPIView.as_view(), name='caffeine-daily'),  # Daily totals for a date range
+    path('daily/today/', TodayIntakeAPIView.as_view(), name='caffeine-daily-today'),
+    path('beverages/', BeverageSearchAPIView.as_view(), name='beverage-search'),  # Autocomplete: ?q=<prefix>
+    path('beverages/<uuid:pk>/log/', BeverageLogCreateAPIView.as_view(), name='beverage-log-create'),  # Log a known drink
+    path('current-level/', CurrentCaffeineLevelAPIView.as_view(), name='caffeine-current-level'),
 ]
 
 
@@ -1,10 +1,26 @@
-from rest_framework import generics, permissions
+from rest_framework import generics, parsers, permissions
 from rest_framework.views import APIView
-from .models import CaffeineLog
-from .serializers import CaffeineLogSerializer, CaffeineOverTimeSerializer
-from datetime import datetime, timedelta
+from .models import Beverage, CaffeineLog, DailyIntakeRollup
+from .pagination import CaffeineLogCursorPagination
+from .serializers import BeverageLogSerializer, BeverageSerializer, CaffeineLogSerializer, CaffeineLogUpdateSerializer, CaffeineOverTimeSerializer, DailyIntakeRollupSerializer
+from . import body_load, catalog, rollups, services, transfer
+from .decay import decay_curve, half_life_hours, levels_at, lookback_seconds
+from copy import copy
+import csv
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import re
+import numpy as np
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.utils.timezone import now
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from api.cache import cache_user_response
+from api.conditional import conditional_on_user_data
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_aware, make_aware, now
 
 # Create Caffeine Log
 class CaffeineLogCreateAPIView(generics.CreateAPIView):
@@ -12,46 +28,352 @@ class CaffeineLogCreateAPIView(generics.CreateAPIView):
     serializer_class = CaffeineLogSerializer
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user, confirmed=True)
+        log = serializer.save(user=self.request.user, confirmed=True)
+        services.log_created(log)
 
-# List All Caffeine Logs for the Authenticated User
+# List Caffeine Logs for the Authenticated User, newest first, one cursor page at a time
 class CaffeineLogListAPIView(generics.ListAPIView):
+    """
+    Query params:
+      - cursor: opaque cursor from the previous page's "next" / "previous" link
+      - page_size: logs per page (default 50, max 500)
+      - since / until: ISO 8601 datetimes bounding created_at (inclusive / exclusive)
+      - confirmed: "false" lists unconfirmed drafts from drink analysis instead (default "true")
+    """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CaffeineLogSerializer
+    pagination_class = CaffeineLogCursorPagination
 
     def get_queryset(self):
-        queryset = CaffeineLog.objects.filter(user=self.request.user).order_by('-created_at')
-        return queryset  # Simply return queryset without throwing an error
+        confirmed = self.request.query_params.get("confirmed", "true").lower() not in ("0", "false", "no")
+        queryset = CaffeineLog.objects.filter(user=self.request.user, confirmed=confirmed)
+        since = parse_datetime_param(self.request.query_params, "since")
+        until = parse_datetime_param(self.request.query_params, "until")
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        if until is not None:
+            queryset = queryset.filter(created_at__lt=until)
+        return queryset  # Ordering is applied by the cursor paginator
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset.exists():
-            return Response([], status=200)  # Return an empty list when there are no logs
-        return super().list(request, *args, **kwargs)
+    @conditional_on_user_data()
+    @cache_user_response()
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
-# Retrieve a Single Caffeine Log by ID
-class CaffeineLogDetailAPIView(generics.RetrieveAPIView):
+# Retrieve, Update or Delete a Single Caffeine Log by ID
+class CaffeineLogDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+    """PATCH {"confirmed": true}, optionally with corrections, confirms a draft from drink analysis."""
     permission_classes = [permissions.IsAuthenticated]
-    serializer_class = CaffeineLogSerializer
+    serializer_class = CaffeineLogUpdateSerializer
 
     def get_queryset(self):
         return CaffeineLog.objects.filter(user=self.request.user)
 
-# Caffeine Over Time API View - Ensures no error for empty logs
+    def perform_update(self, serializer):
+        previous = copy(serializer.instance)
+        log = serializer.save()
+        services.log_updated(log, previous)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        services.log_deleted(instance)
+
+# Stream all of the user's logs as NDJSON or CSV without loading them into memory
+class CaffeineLogExportAPIView(APIView):
+    """
+    Query params:
+      - since / until: ISO 8601 datetimes bounding created_at (inclusive / exclusive)
+
+    Rows are written oldest first. The CSV variant stores b_vitamins and
+    other_ingredients as JSON text; both formats can be fed back to logs/import/.
+    Unconfirmed drafts are left out.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    export_format = "ndjson"
+
+    CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+    def get(self, request):
+        queryset = CaffeineLog.objects.filter(user=request.user, confirmed=True)
+        since = parse_datetime_param(request.query_params, "since")
+        until = parse_datetime_param(request.query_params, "until")
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        if until is not None:
+            queryset = queryset.filter(created_at__lt=until)
+
+        if isinstance(request._request, ASGIRequest):
+            # Served as an async iterator, or Django would read every row into memory first
+            rows = transfer.aexport_rows(queryset)
+            lines = transfer.acsv_lines(rows) if self.export_format == "csv" else transfer.andjson_lines(rows)
+        else:
+            rows = transfer.export_rows(queryset)
+            lines = transfer.csv_lines(rows) if self.export_format == "csv" else transfer.ndjson_lines(rows)
+        response = StreamingHttpResponse(lines, content_type=self.CONTENT_TYPES[self.export_format])
+        response["Content-Disposition"] = f'attachment; filename="caffeine-logs.{self.export_format}"'
+        return response
+
+# Bulk import of logs, e.g. history migrated from another tracker
+class CaffeineLogImportAPIView(APIView):
+    """
+    Accepts either:
+      - a JSON body: a list of log objects, or {"logs": [...]}
+      - a multipart upload "file" in .ndjson, .json (array) or .csv format,
+        the same layout logs/export/ produces (use this for large histories)
+
+    Rows may carry created_at; "id" and "confirmed" are ignored. Invalid rows
+    are skipped and reported; ?dry_run=true validates without saving.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [parsers.JSONParser, parsers.MultiPartParser]
+
+    def post(self, request):
+        dry_run = request.query_params.get("dry_run", "").lower() in ("1", "true", "yes")
+
+        # 1. Work out where the rows come from without materializing uploads
+        upload = request.FILES.get("file")
+        if upload is not None:
+            name = (upload.name or "").lower()
+            if name.endswith(".csv") or upload.content_type == "text/csv":
+                rows = transfer.read_csv(upload)
+            elif name.endswith(".json"):
+                try:
+                    rows = json.load(upload)
+                except ValueError as e:
+                    return Response({"error": f"File is not valid JSON: {e}"}, status=400)
+            else:
+                rows = transfer.read_ndjson(upload)
+        else:
+            rows = request.data.get("logs") if isinstance(request.data, dict) else request.data
+            if rows is None:
+                return Response({"error": "Provide a list of logs or a file upload."}, status=400)
+        if isinstance(rows, (dict, str)):
+            return Response({"error": "Expected a list of logs."}, status=400)
+
+        # 2. Validate and insert chunk by chunk
+        try:
+            result = transfer.import_rows(request.user, rows, dry_run=dry_run)
+        except (transfer.ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+            return Response({"error": str(e)}, status=400)
+
+        result["dry_run"] = dry_run
+        return Response(result, status=201 if result["imported"] and not dry_run else 200)
+
+# Beverage Catalog Autocomplete - prefix match on the indexed normalized name
+class BeverageSearchAPIView(generics.ListAPIView):
+    """
+    Query params:
+      - q: start of the drink name (case and spacing are ignored)
+      - limit: number of suggestions (default 10, max 25)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BeverageSerializer
+    pagination_class = None
+
+    MAX_LIMIT = 25
+
+    def get_queryset(self):
+        try:
+            limit = min(max(int(self.request.query_params.get("limit", 10)), 1), self.MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({"limit": "Expected an integer."})
+        return catalog.search(self.request.query_params.get("q", ""), limit)
+
+# Log a Catalog Beverage - one primary key lookup and one insert, no AI analysis
+class BeverageLogCreateAPIView(APIView):
+    """Optional body: {"additional_notes": "..."}."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        serializer = BeverageLogSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        beverage = Beverage.objects.filter(pk=pk).first()
+        if beverage is None:
+            return Response({"error": "Beverage not found."}, status=404)
+
+        log = CaffeineLog.objects.create(
+            user=request.user,
+            beverage_name=beverage.name,
+            additional_notes=serializer.validated_data.get("additional_notes") or None,
+            confirmed=True,
+            **{field: getattr(beverage, field) for field in catalog.FACT_FIELDS},
+        )
+        services.log_created(log)
+        return Response(CaffeineLogSerializer(log).data, status=201)
+
+# Current caffeine level, read from the per-user body-load checkpoint
+class CurrentCaffeineLevelAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({
+            "caffeine_mg": round(body_load.current_level(request.user), 2),
+            "as_of": now().isoformat(),
+            "half_life_hours": half_life_hours(request.user.caffeine_sensitivity),
+        }, status=200)
+
+# Caffeine Over Time API View - Returns the finished decay curve so clients only plot it
 class CaffeineOverTimeAPIView(APIView):
+    """
+    Query params:
+      - range: window on each side of now, e.g. "1d", "7d", "30d" or "12h" (default "1d")
+      - resolution: minutes between points (default 5)
+      - tz: IANA timezone used for the returned timestamps (default settings.TIME_ZONE)
+      - layout: "rows" (default) for a list of points, "columnar" for parallel arrays
+    """
     permission_classes = [permissions.IsAuthenticated]
 
+    MAX_RANGE = timedelta(days=90)
+    MAX_POINTS = 20000
+
+    @conditional_on_user_data(vary_on=lambda request: curve_start_bucket(request))
+    @cache_user_response(vary_on=lambda request: curve_start_bucket(request))
     def get(self, request):
-        user = request.user  
-        caffeine_logs = CaffeineLog.objects.filter(user=user).order_by("created_at")
+        try:
+            span = parse_range(request.query_params.get("range", "1d"))
+            resolution = int(request.query_params.get("resolution", 5))
+            tz = ZoneInfo(request.query_params.get("tz", settings.TIME_ZONE))
+        except (ValueError, ZoneInfoNotFoundError) as e:
+            return Response({"error": f"Invalid query parameter: {e}"}, status=400)
+
+        layout = request.query_params.get("layout", "rows")
+        if layout not in ("rows", "columnar"):
+            return Response({"error": "layout must be 'rows' or 'columnar'."}, status=400)
+        if span > self.MAX_RANGE:
+            return Response({"error": f"range may not exceed {self.MAX_RANGE.days}d."}, status=400)
+        if not 1 <= resolution <= 1440:
+            return Response({"error": "resolution must be between 1 and 1440 minutes."}, status=400)
+
+        step = resolution * 60
+        count = int(2 * span.total_seconds() // step) + 1
+        if count > self.MAX_POINTS:
+            return Response({"error": "Too many points; use a coarser resolution."}, status=400)
+
+        # 1. Align the grid to the resolution so repeated requests share points
+        now_ts = now().timestamp()
+        start = (now_ts - span.total_seconds()) // step * step
+        end = start + (count - 1) * step
+
+        # 2. Only intakes that can still contribute to the window are loaded
+        half_life = half_life_hours(request.user.caffeine_sensitivity)
+        rows = CaffeineLog.objects.filter(
+            user=request.user,
+            confirmed=True,
+            created_at__gte=datetime.fromtimestamp(start - lookback_seconds(half_life), tz=dt_timezone.utc),
+            created_at__lte=datetime.fromtimestamp(end, tz=dt_timezone.utc),
+        ).order_by("created_at").values_list("created_at", "caffeine_mg")
+        intake_times = np.fromiter((created.timestamp() for created, _ in rows), dtype=np.float64)
+        intake_mg = np.fromiter((mg for _, mg in rows), dtype=np.float64)
+
+        # 3. Evaluate the whole curve (and each intake's peak) in one vectorized pass
+        grid, levels = decay_curve(start, step, count, intake_times, intake_mg, half_life)
+        levels = np.round(levels, 2)
+        visible = intake_times >= start
+        intake_levels = np.round(levels_at(intake_times[visible], intake_times, intake_mg, half_life), 2)
+
+        if layout == "columnar":
+            return Response({
+                "start": datetime.fromtimestamp(start, tz=tz).isoformat(),
+                "step_seconds": step,
+                "half_life_hours": half_life,
+                "caffeine_remaining_mg": levels.tolist(),
+                "intakes": {
+                    "date": [datetime.fromtimestamp(t, tz=tz).isoformat() for t in intake_times[visible]],
+                    "caffeine_mg": intake_mg[visible].tolist(),
+                    "caffeine_remaining_mg": intake_levels.tolist(),
+                },
+            }, status=200)
+
+        points = [
+            {"date": datetime.fromtimestamp(t, tz=tz), "caffeine_remaining_mg": level}
+            for t, level in zip(grid.tolist(), levels.tolist())
+        ]
+        serializer = CaffeineOverTimeSerializer(points, many=True, context={"tz": tz})
+        return Response(serializer.data, status=200)
+
+
+# Daily Intake Totals in the User's Timezone, read from the materialized rollups
+class DailyIntakeListAPIView(APIView):
+    """
+    Query params:
+      - start / end: inclusive YYYY-MM-DD bounds (default: the last 7 days)
+
+    Days without logs are returned with zero totals.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    MAX_DAYS = 366
 
-        if not caffeine_logs.exists():
-            return Response([], status=200)  # Return an empty list for consistency
+    @conditional_on_user_data(vary_on=lambda request: rollups.local_day(request.user, now()))
+    @cache_user_response(vary_on=lambda request: rollups.local_day(request.user, now()))
+    def get(self, request):
+        today = rollups.local_day(request.user, now())
+        try:
+            end = parse_date_param(request.query_params, "end") or today
+            start = parse_date_param(request.query_params, "start") or end - timedelta(days=6)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        if start > end or (end - start).days >= self.MAX_DAYS:
+            return Response({"error": f"start must be before end and span at most {self.MAX_DAYS} days."}, status=400)
 
-        consumption_events = [
-            {"date": log.created_at.isoformat(), "caffeine_mg": log.caffeine_mg}
-            for log in caffeine_logs
+        stored = {
+            rollup.day: rollup
+            for rollup in DailyIntakeRollup.objects.filter(user=request.user, day__gte=start, day__lte=end)
+        }
+        days = [
+            stored.get(day) or DailyIntakeRollup(day=day)
+            for day in (start + timedelta(days=i) for i in range((end - start).days + 1))
         ]
+        return Response(DailyIntakeRollupSerializer(days, many=True).data, status=200)
+
+# Today's Intake Totals - a single (user, day) row lookup
+class TodayIntakeAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @conditional_on_user_data(vary_on=lambda request: rollups.local_day(request.user, now()))
+    def get(self, request):
+        today = rollups.local_day(request.user, now())
+        rollup = DailyIntakeRollup.objects.filter(user=request.user, day=today).first()
+        return Response(DailyIntakeRollupSerializer(rollup or DailyIntakeRollup(day=today)).data, status=200)
+
+
+def curve_start_bucket(request):
+    """The aligned grid start CaffeineOverTimeAPIView would use right now (part of its ETag)."""
+    try:
+        span = parse_range(request.query_params.get("range", "1d"))
+        step = int(request.query_params.get("resolution", 5)) * 60
+    except ValueError:
+        return ""
+    return (now().timestamp() - span.total_seconds()) // step * step if step > 0 else ""
+
+
+def parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date.")
+    return parsed
+
+
+def parse_datetime_param(params, name):
+    """Parse an optional ISO 8601 query parameter; naive values are taken as UTC."""
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValidationError({name: "Expected an ISO 8601 datetime."})
+    return parsed if is_aware(parsed) else make_aware(parsed, dt_timezone.utc)
+
 
-        return Response(consumption_events, status=200)
-        
+def parse_range(value):
+    """Parse a window length such as "30d" or "12h" into a timedelta."""
+    # At most five digits keeps every value well inside timedelta's range
+    match = re.fullmatch(r"(\d{1,5})([hd])", value or "")
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"range '{value}' must look like '1d', '7d' or '12h'")
+    amount, unit = int(match.group(1)), match.group(2)
+    return timedelta(hours=amount) if unit == "h" else timedelta(days=amount)
@@ -37,6 +37,79 @@ DEBUG = env.bool("DEBUG", default=True)
 ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=["localhost"])
 
 GEMINI_API_KEY = env("GEMINI_API_KEY")
+# Shared Gemini client pool (see ai/gemini_helper.py). GEMINI_BASE_URL points the
+# clients at another endpoint, e.g. a local fake server for offline benchmarks.
+GEMINI_POOL_SIZE = env.int("GEMINI_POOL_SIZE", default=4)
+GEMINI_TIMEOUT_SECONDS = env.float("GEMINI_TIMEOUT_SECONDS", default=30.0)
+GEMINI_BASE_URL = env("GEMINI_BASE_URL", default=None)
+
+# Gemini call governor (see ai/governor.py): global and per-user token buckets, how
+# long a call may queue for a global token, retries of transient errors with jittered
+# exponential backoff, and the circuit breaker that fails fast while Gemini is degraded.
+GEMINI_GLOBAL_RATE_PER_SECOND = env.float("GEMINI_GLOBAL_RATE_PER_SECOND", default=10.0)
+GEMINI_GLOBAL_BURST = env.int("GEMINI_GLOBAL_BURST", default=20)
+GEMINI_USER_RATE_PER_MINUTE = env.float("GEMINI_USER_RATE_PER_MINUTE", default=20.0)
+GEMINI_USER_BURST = env.int("GEMINI_USER_BURST", default=5)
+GEMINI_QUEUE_WAIT_SECONDS = env.float("GEMINI_QUEUE_WAIT_SECONDS", default=2.0)
+GEMINI_RETRY_ATTEMPTS = env.int("GEMINI_RETRY_ATTEMPTS", default=3)
+GEMINI_RETRY_BASE_SECONDS = env.float("GEMINI_RETRY_BASE_SECONDS", default=0.5)
+GEMINI_RETRY_MAX_SECONDS = env.float("GEMINI_RETRY_MAX_SECONDS", default=4.0)
+GEMINI_RETRY_BUDGET_SECONDS = env.float("GEMINI_RETRY_BUDGET_SECONDS", default=10.0)
+GEMINI_BREAKER_FAILURES = env.int("GEMINI_BREAKER_FAILURES", default=5)
+GEMINI_BREAKER_COOLDOWN_SECONDS = env.float("GEMINI_BREAKER_COOLDOWN_SECONDS", default=30.0)
+
+# Chat prompt context (see ai/context.py): raw logs kept verbatim, how far back
+# daily and weekly aggregates go, and a hard cap on the rendered context size.
+CHAT_CONTEXT_RECENT_LOGS = env.int("CHAT_CONTEXT_RECENT_LOGS", default=20)
+CHAT_CONTEXT_DAILY_DAYS = env.int("CHAT_CONTEXT_DAILY_DAYS", default=14)
+CHAT_CONTEXT_WEEKLY_WEEKS = env.int("CHAT_CONTEXT_WEEKLY_WEEKS", default=12)
+CHAT_CONTEXT_TOKEN_BUDGET = env.int("CHAT_CONTEXT_TOKEN_BUDGET", default=1500)
+# Chat memory (see ai/memory.py): exchanges sent verbatim with each prompt, how many
+# older ones pile up before they are folded into the rolling summary, the summary's
+# maximum length and the per-message cap applied in prompts.
+CHAT_MEMORY_RECENT_MESSAGES = env.int("CHAT_MEMORY_RECENT_MESSAGES", default=6)
+CHAT_MEMORY_SUMMARY_BATCH = env.int("CHAT_MEMORY_SUMMARY_BATCH", default=6)
+CHAT_MEMORY_SUMMARY_MAX_CHARS = env.int("CHAT_MEMORY_SUMMARY_MAX_CHARS", default=2000)
+CHAT_MEMORY_MESSAGE_MAX_CHARS = env.int("CHAT_MEMORY_MESSAGE_MAX_CHARS", default=1000)
+# Chat answer cache (see ai/answer_cache.py): lifetime and number of cached answers
+# per worker process, and the shortest question worth caching (shorter ones tend to
+# be follow-ups that depend on the conversation).
+CHAT_ANSWER_CACHE_TTL_SECONDS = env.int("CHAT_ANSWER_CACHE_TTL_SECONDS", default=600)
+CHAT_ANSWER_CACHE_MAX_ENTRIES = env.int("CHAT_ANSWER_CACHE_MAX_ENTRIES", default=5000)
+CHAT_ANSWER_CACHE_MIN_WORDS = env.int("CHAT_ANSWER_CACHE_MIN_WORDS", default=4)
+
+# Drink photo analysis cache (see ai/image_cache.py): max Hamming distance between
+# perceptual hashes that still counts as the same drink, entry lifetime and size.
+DRINK_CACHE_THRESHOLD = env.int("DRINK_CACHE_THRESHOLD", default=6)
+DRINK_CACHE_TTL_SECONDS = env.int("DRINK_CACHE_TTL_SECONDS", default=30 * 24 * 3600)
+DRINK_CACHE_MAX_ENTRIES = env.int("DRINK_CACHE_MAX_ENTRIES", default=5000)
+# Drink photos are downscaled to this longest side and re-encoded before analysis and
+# upload (see ai/images.py). Install pillow-heif to accept HEIC photos.
+DRINK_IMAGE_MAX_SIDE = env.int("DRINK_IMAGE_MAX_SIDE", default=1024)
+DRINK_IMAGE_FORMAT = env("DRINK_IMAGE_FORMAT", default="WEBP")  # WEBP or JPEG
+DRINK_IMAGE_QUALITY = env.int("DRINK_IMAGE_QUALITY", default=80)
+# HEAD-check drink photos after upload. Runs in the background and only logs failures.
+DRINK_UPLOAD_VERIFY = env.bool("DRINK_UPLOAD_VERIFY", default=False)
+# Unconfirmed draft logs from drink analysis that nobody confirmed are deleted after this long.
+DRINK_DRAFT_RETENTION_SECONDS = env.int("DRINK_DRAFT_RETENTION_SECONDS", default=24 * 3600)
+
+# Background drink analysis jobs (see ai/jobs.py). With DRINK_JOBS_IN_PROCESS the web
+# process runs the workers itself; otherwise run `manage.py run_drink_jobs`.
+DRINK_JOBS_IN_PROCESS = env.bool("DRINK_JOBS_IN_PROCESS", default=True)
+DRINK_JOB_WORKERS = env.int("DRINK_JOB_WORKERS", default=4)
+DRINK_JOB_MAX_PENDING_PER_USER = env.int("DRINK_JOB_MAX_PENDING_PER_USER", default=5)
+DRINK_JOB_MAX_ATTEMPTS = env.int("DRINK_JOB_MAX_ATTEMPTS", default=3)
+DRINK_JOB_RETRY_BACKOFF_SECONDS = env.int("DRINK_JOB_RETRY_BACKOFF_SECONDS", default=5)
+DRINK_JOB_LEASE_SECONDS = env.int("DRINK_JOB_LEASE_SECONDS", default=300)
+DRINK_JOB_POLL_SECONDS = env.float("DRINK_JOB_POLL_SECONDS", default=2.0)
+DRINK_JOB_RETENTION_SECONDS = env.int("DRINK_JOB_RETENTION_SECONDS", default=7 * 24 * 3600)
+
+# Caffeine log export/import (see caffeine/transfer.py): rows fetched per database
+# round trip while streaming, rows validated and inserted per transaction, and the
+# largest import accepted in one request.
+CAFFEINE_EXPORT_CHUNK_SIZE = env.int("CAFFEINE_EXPORT_CHUNK_SIZE", default=2000)
+CAFFEINE_IMPORT_CHUNK_SIZE = env.int("CAFFEINE_IMPORT_CHUNK_SIZE", default=1000)
+CAFFEINE_IMPORT_MAX_ROWS = env.int("CAFFEINE_IMPORT_MAX_ROWS", default=100000)
 
 INSTALLED_APPS = [
     "django.contrib.auth",
@@ -60,7 +133,7 @@ APPEND_SLASH = False
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "users.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
@@ -69,7 +142,15 @@ REST_FRAMEWORK = {
 
 AUTH_USER_MODEL = "users.User"
 
+# Token -> user lookups and user data versions cached per process (see
+# users/authentication.py and users/versioning.py). Cache hits make no query. Logout,
+# password, profile and data changes are seen at once by the worker that made them and
+# within AUTH_TOKEN_CACHE_TTL_SECONDS by the others, ETags and cached responses included.
+AUTH_TOKEN_CACHE_TTL_SECONDS = env.int("AUTH_TOKEN_CACHE_TTL_SECONDS", default=60)
+AUTH_TOKEN_CACHE_MAX_ENTRIES = env.int("AUTH_TOKEN_CACHE_MAX_ENTRIES", default=10000)
+
 MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -108,8 +189,65 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "core.wsgi.application"
 
+# Production serves core.asgi, where Django advises against persistent connections: they
+# are tied to the thread or async context that opened them and leak across contexts.
+# Keep DB_CONN_MAX_AGE at 0 there; a WSGI deployment can raise it.
 DATABASES = {
-    "default": dj_database_url.config(default=env("DATABASE_URL"), conn_max_age=600)
+    "default": dj_database_url.config(default=env("DATABASE_URL"), conn_max_age=env.int("DB_CONN_MAX_AGE", default=0))
+}
+
+# Prometheus-text metrics at /metrics (see api/metrics.py). Each worker process keeps
+# its own series. When METRICS_TOKEN is set, scrapers must send "Authorization: Bearer <token>".
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+# Application logs go to stderr; LOG_LEVEL=DEBUG also logs Gemini prompts and responses.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain"},
+    },
+    "loggers": {
+        app: {"handlers": ["console"], "level": env("LOG_LEVEL", default="INFO"), "propagate": False}
+        for app in ("api", "users", "caffeine", "energy", "ai")
+    },
+}
+
+# Per-user API response cache (see api/cache.py). Keys embed the user's data version,
+# so writes invalidate by making old entries unreachable; those then age out.
+# "locmem" evicts least recently used entries one at a time once MAX_ENTRIES is
+# reached (per worker process); "file" is shared by all workers on a host and culls
+# a third of the entries when full.
+RESPONSE_CACHE_BACKEND = env("RESPONSE_CACHE_BACKEND", default="locmem")
+RESPONSE_CACHE_LOCATION = env("RESPONSE_CACHE_LOCATION", default=str(BASE_DIR / ".response-cache"))
+RESPONSE_CACHE_MAX_ENTRIES = env.int("RESPONSE_CACHE_MAX_ENTRIES", default=5000)
+RESPONSE_CACHE_TIMEOUT_SECONDS = env.int("RESPONSE_CACHE_TIMEOUT_SECONDS", default=600)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "responses": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": RESPONSE_CACHE_LOCATION,
+        "TIMEOUT": RESPONSE_CACHE_TIMEOUT_SECONDS,
+        "OPTIONS": {"MAX_ENTRIES": RESPONSE_CACHE_MAX_ENTRIES, "CULL_FREQUENCY": 3},
+    } if RESPONSE_CACHE_BACKEND == "file" else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+        "TIMEOUT": RESPONSE_CACHE_TIMEOUT_SECONDS,
+        # Culling MAX_ENTRIES // CULL_FREQUENCY = 1 entry at a time makes LocMemCache a strict LRU
+        "OPTIONS": {"MAX_ENTRIES": RESPONSE_CACHE_MAX_ENTRIES, "CULL_FREQUENCY": RESPONSE_CACHE_MAX_ENTRIES},
+    },
+    "chat_answers": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "chat-answers",
+        "TIMEOUT": CHAT_ANSWER_CACHE_TTL_SECONDS,
+        "OPTIONS": {"MAX_ENTRIES": CHAT_ANSWER_CACHE_MAX_ENTRIES, "CULL_FREQUENCY": CHAT_ANSWER_CACHE_MAX_ENTRIES},
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
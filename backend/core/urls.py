@@ -1,9 +1,14 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from api.views import prometheus_metrics
+
 urlpatterns = [
     #path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')),  # Auth API
     path('api/caffeine/', include('caffeine.urls')), # Final caffeine log submission endpoint
     path('api/ai/', include('ai.urls')),   
+    path('api/energy/', include('energy.urls')),  # Energy ratings and caffeine correlation
+    path('api/', include('api.urls')),  # Operational endpoints (cache statistics)
+    path('metrics', prometheus_metrics, name='prometheus-metrics'),  # Prometheus scrape target
 ]
@@ -0,0 +1,108 @@
+"""
+How a user's energy ratings line up with their modelled caffeine level.
+
+Each rating is joined to the caffeine level the decay model gives for the
+moment it was recorded, and for a series of earlier moments (lags), so the
+delay between drinking caffeine and feeling it can be estimated. Every
+(rating, lag) level is evaluated in a single vectorized ``levels_at`` call and
+all per-lag statistics come out of one set of matrix products.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+
+from caffeine.decay import half_life_hours, levels_at, lookback_seconds
+from caffeine.models import CaffeineLog
+from .models import EnergyLog
+
+MIN_RATINGS = 3
+
+
+def _finite_or_none(value, digits=4):
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def caffeine_energy_correlation(user, since, until, lags_minutes, include_points=False):
+    """
+    Pearson correlation and least-squares slope between energy level and the
+    caffeine level ``lag`` minutes before each rating, for every lag in
+    ``lags_minutes``.
+    """
+    lags = np.asarray(lags_minutes, dtype=np.float64)
+    half_life = half_life_hours(user.caffeine_sensitivity)
+
+    ratings = list(
+        EnergyLog.objects.filter(user=user, timestamp__gte=since, timestamp__lt=until)
+        .order_by("timestamp").values_list("timestamp", "energy_level")
+    )
+    energy_times = np.fromiter((t.timestamp() for t, _ in ratings), dtype=np.float64, count=len(ratings))
+    energy = np.fromiter((level for _, level in ratings), dtype=np.float64, count=len(ratings))
+
+    # 1. Intakes that can still contribute at the earliest lagged moment
+    earliest = since - timedelta(minutes=float(lags.max(initial=0.0)), seconds=lookback_seconds(half_life))
+    intakes = list(
+        CaffeineLog.objects.filter(user=user, confirmed=True, created_at__gte=earliest, created_at__lt=until)
+        .order_by("created_at").values_list("created_at", "caffeine_mg")
+    )
+    intake_times = np.fromiter((t.timestamp() for t, _ in intakes), dtype=np.float64, count=len(intakes))
+    intake_mg = np.fromiter((mg or 0.0 for _, mg in intakes), dtype=np.float64, count=len(intakes))
+
+    # 2. Caffeine level at every (rating, lag) pair in one evaluation
+    query = energy_times[:, None] - lags[None, :] * 60.0
+    caffeine = levels_at(query.ravel(), intake_times, intake_mg, half_life).reshape(query.shape)
+
+    # 3. As-of join: the latest intake at or before each rating
+    previous = np.searchsorted(intake_times, energy_times, side="right") - 1
+    has_previous = previous >= 0
+    minutes_since_intake = np.full(energy_times.shape, np.nan)
+    minutes_since_intake[has_previous] = (energy_times[has_previous] - intake_times[previous[has_previous]]) / 60.0
+
+    # 4. Centered cross products give every lag's correlation and slope at once
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x = caffeine - caffeine.mean(axis=0) if len(ratings) else caffeine
+        y = energy - energy.mean() if len(ratings) else energy
+        covariance = x.T @ y
+        x_var = (x ** 2).sum(axis=0)
+        y_var = (y ** 2).sum()
+        correlation = covariance / np.sqrt(x_var * y_var)
+        slope = covariance / x_var
+    if len(ratings) < MIN_RATINGS:
+        correlation = np.full(lags.shape, np.nan)
+        slope = np.full(lags.shape, np.nan)
+
+    per_lag = [
+        {
+            "lag_minutes": int(lag),
+            "correlation": _finite_or_none(r),
+            "energy_change_per_100mg": _finite_or_none(b * 100.0),
+        }
+        for lag, r, b in zip(lags.tolist(), correlation, slope)
+    ]
+    finite = np.isfinite(correlation)
+    best = per_lag[int(np.nanargmax(np.where(finite, np.abs(correlation), np.nan)))] if finite.any() else None
+
+    result = {
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "half_life_hours": half_life,
+        "ratings": len(ratings),
+        "mean_energy_level": _finite_or_none(energy.mean()) if len(ratings) else None,
+        "mean_caffeine_mg": _finite_or_none(caffeine[:, 0].mean(), 2) if len(ratings) and lags.size else None,
+        "median_minutes_since_intake": (
+            _finite_or_none(np.nanmedian(minutes_since_intake), 1) if has_previous.any() else None
+        ),
+        "lags": per_lag,
+        "best_lag": best,
+    }
+    if include_points:
+        result["points"] = [
+            {
+                "timestamp": timestamp.isoformat(),
+                "energy_level": int(level),
+                "caffeine_mg": round(float(mg), 2),
+                "minutes_since_intake": _finite_or_none(minutes, 1),
+            }
+            for (timestamp, level), mg, minutes in zip(ratings, caffeine[:, 0], minutes_since_intake)
+        ]
+    return result
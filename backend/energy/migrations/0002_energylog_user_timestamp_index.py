@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='energylog',
+            index=models.Index(fields=['user', '-timestamp'], name='energy_log_user_timestamp_idx'),
+        ),
+    ]
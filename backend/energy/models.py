@@ -14,5 +14,11 @@ class EnergyLog(models.Model):
     ])
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Backs per-user listings ordered by timestamp DESC and time-range filters
+            models.Index(fields=["user", "-timestamp"], name="energy_log_user_timestamp_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.get_energy_level_display()} at {self.timestamp}"
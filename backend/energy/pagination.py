@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class EnergyLogCursorPagination(CursorPagination):
+    """Keyset pagination over a user's energy logs, newest first (see caffeine.pagination)."""
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = ("-timestamp", "-id")
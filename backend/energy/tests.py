@@ -1,3 +1,119 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from caffeine import services
+from caffeine.models import CaffeineLog
+from users.models import User
+from .analytics import caffeine_energy_correlation
+from .models import EnergyLog
+
+
+def make_user(email):
+    return User.objects.create_user(email=email, password="password", username=email.split("@")[0])
+
+
+def make_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+    return client
+
+
+def add_rating(user, energy_level, timestamp):
+    rating = EnergyLog.objects.create(user=user, energy_level=energy_level)
+    EnergyLog.objects.filter(pk=rating.pk).update(timestamp=timestamp)  # auto_now_add ignores the value
+    return rating
+
+
+class EnergyLogAPITests(TestCase):
+    def setUp(self):
+        self.user = make_user("energy@example.com")
+        self.client = make_client(self.user)
+        self.other = make_user("other@example.com")
+
+    def test_ratings_are_scoped_to_the_user(self):
+        mine = add_rating(self.user, 4, now() - timedelta(hours=1))
+        theirs = add_rating(self.other, 2, now() - timedelta(hours=1))
+        response = self.client.get("/api/energy/logs/")
+        self.assertEqual([row["id"] for row in response.json()["results"]], [str(mine.pk)])
+        self.assertEqual(self.client.get(f"/api/energy/logs/{theirs.pk}/").status_code, 404)
+        self.assertEqual(self.client.delete(f"/api/energy/logs/{theirs.pk}/").status_code, 404)
+
+    def test_create_sets_the_user(self):
+        response = self.client.post("/api/energy/logs/", {"energy_level": 3, "user": str(self.other.pk)},
+                                    format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(EnergyLog.objects.get().user, self.user)
+
+    def test_pages_newest_first_within_a_range(self):
+        ratings = [add_rating(self.user, 3, now() - timedelta(hours=hours)) for hours in range(1, 8)]
+        since = (now() - timedelta(hours=6, minutes=30)).isoformat().replace("+00:00", "Z")
+        seen = []
+        url = f"/api/energy/logs/?page_size=2&since={since}"
+        while url:
+            body = self.client.get(url).json()
+            seen += [row["id"] for row in body["results"]]
+            url = body["next"]
+        self.assertEqual(seen, [str(rating.pk) for rating in ratings[:6]])
+
+
+class CaffeineEnergyCorrelationTests(TestCase):
+    def setUp(self):
+        self.user = make_user("energy@example.com")
+        self.client = make_client(self.user)
+
+    def seed(self, lag_minutes):
+        """
+        Ten mornings of one coffee each, rated either side of the drink. Ratings
+        are high exactly when the coffee was taken ``lag_minutes`` or more before.
+        """
+        start = (now() - timedelta(days=11)).replace(hour=8, minute=0, second=0, microsecond=0)
+        ratings = 0
+        for day in range(10):
+            taken = start + timedelta(days=day)
+            log = CaffeineLog.objects.create(user=self.user, caffeine_mg=200, created_at=taken, confirmed=True)
+            services.log_created(log)
+            for offset in (-50, -20, 10, 40, 70, 100, 130, 160):
+                add_rating(self.user, 5 if offset >= lag_minutes else 1, taken + timedelta(minutes=offset))
+                ratings += 1
+        return ratings
+
+    def test_finds_the_lag_the_ratings_follow(self):
+        ratings = self.seed(lag_minutes=60)
+        result = caffeine_energy_correlation(
+            self.user, since=now() - timedelta(days=30), until=now(), lags_minutes=range(0, 241, 30)
+        )
+        self.assertEqual(result["ratings"], ratings)
+        self.assertEqual(result["best_lag"]["lag_minutes"], 60)
+        self.assertGreater(result["best_lag"]["correlation"], 0.9)
+        self.assertGreater(result["best_lag"]["energy_change_per_100mg"], 0)
+        self.assertEqual([lag["lag_minutes"] for lag in result["lags"]], list(range(0, 241, 30)))
+
+    def test_too_few_ratings(self):
+        add_rating(self.user, 3, now() - timedelta(hours=1))
+        result = caffeine_energy_correlation(
+            self.user, since=now() - timedelta(days=1), until=now(), lags_minutes=[0, 60]
+        )
+        self.assertEqual(result["ratings"], 1)
+        self.assertIsNone(result["best_lag"])
+        self.assertEqual([lag["correlation"] for lag in result["lags"]], [None, None])
+        self.assertIsNone(result["median_minutes_since_intake"])
+
+    def test_endpoint_with_points(self):
+        self.seed(lag_minutes=0)
+        response = self.client.get("/api/energy/analytics/caffeine-correlation/?range=30d&max_lag=60&points=true")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["best_lag"]["lag_minutes"], 0)
+        self.assertEqual(len(body["points"]), body["ratings"])
+        self.assertEqual(set(body["points"][0]), {"timestamp", "energy_level", "caffeine_mg", "minutes_since_intake"})
 
-# Create your tests here.
+    def test_invalid_parameters(self):
+        for query in ("range=366d", "range=abc", "max_lag=-1", "max_lag=2000", "lag_step=0",
+                      "max_lag=1440&lag_step=1"):
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/energy/analytics/caffeine-correlation/?{query}")
+                self.assertEqual(response.status_code, 400)
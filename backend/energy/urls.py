@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import EnergyLogListCreateAPIView, EnergyLogRetrieveUpdateDestroyAPIView
+from .views import CaffeineEnergyCorrelationAPIView, EnergyLogListCreateAPIView, EnergyLogRetrieveUpdateDestroyAPIView
 
 urlpatterns = [
     path('logs/', EnergyLogListCreateAPIView.as_view(), name='energy-log-list-create'),
     path('logs/<uuid:pk>/', EnergyLogRetrieveUpdateDestroyAPIView.as_view(), name='energy-log-detail'),
+    path('analytics/caffeine-correlation/', CaffeineEnergyCorrelationAPIView.as_view(), name='energy-caffeine-correlation'),
 ]
@@ -1,16 +1,96 @@
+from datetime import timedelta
 from rest_framework import generics, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.utils.timezone import now
+from api.conditional import conditional_on_user_data
+from caffeine.views import parse_datetime_param, parse_range
+from users import versioning
+from .analytics import caffeine_energy_correlation
 from .models import EnergyLog
+from .pagination import EnergyLogCursorPagination
 from .serializers import EnergyLogSerializer
 
 class EnergyLogListCreateAPIView(generics.ListCreateAPIView):
-    queryset = EnergyLog.objects.all()
+    """
+    Query params:
+      - cursor: opaque cursor from the previous page's "next" / "previous" link
+      - page_size: logs per page (default 50, max 500)
+      - since / until: ISO 8601 datetimes bounding timestamp (inclusive / exclusive)
+    """
     serializer_class = EnergyLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = EnergyLogCursorPagination
+
+    def get_queryset(self):
+        queryset = EnergyLog.objects.filter(user=self.request.user)
+        since = parse_datetime_param(self.request.query_params, "since")
+        until = parse_datetime_param(self.request.query_params, "until")
+        if since is not None:
+            queryset = queryset.filter(timestamp__gte=since)
+        if until is not None:
+            queryset = queryset.filter(timestamp__lt=until)
+        return queryset  # Ordering is applied by the cursor paginator
+
+    @conditional_on_user_data()
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        versioning.bump(self.request.user)
 
 class EnergyLogRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = EnergyLog.objects.all()
     serializer_class = EnergyLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return EnergyLog.objects.filter(user=self.request.user)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        versioning.bump(self.request.user)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        versioning.bump(self.request.user)
+
+# Energy Ratings vs. Modelled Caffeine Level
+class CaffeineEnergyCorrelationAPIView(APIView):
+    """
+    Query params:
+      - range: window ending now, e.g. "7d", "30d" or "12h" (default "30d")
+      - max_lag: largest delay in minutes between caffeine level and rating (default 240)
+      - lag_step: minutes between tested delays (default 30)
+      - points: "true" to include each aligned (rating, caffeine level) pair
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    MAX_RANGE = timedelta(days=365)
+    MAX_LAG_MINUTES = 1440
+    MAX_LAGS = 97
+
+    def get(self, request):
+        try:
+            span = parse_range(request.query_params.get("range", "30d"))
+            max_lag = int(request.query_params.get("max_lag", 240))
+            lag_step = int(request.query_params.get("lag_step", 30))
+        except ValueError as e:
+            return Response({"error": f"Invalid query parameter: {e}"}, status=400)
+
+        if span > self.MAX_RANGE:
+            return Response({"error": f"range may not exceed {self.MAX_RANGE.days}d."}, status=400)
+        if not 0 <= max_lag <= self.MAX_LAG_MINUTES:
+            return Response({"error": f"max_lag must be between 0 and {self.MAX_LAG_MINUTES} minutes."}, status=400)
+        if lag_step < 1 or max_lag // lag_step + 1 > self.MAX_LAGS:
+            return Response({"error": f"lag_step must be positive and give at most {self.MAX_LAGS} lags."}, status=400)
+
+        until = now()
+        result = caffeine_energy_correlation(
+            request.user,
+            since=until - span,
+            until=until,
+            lags_minutes=range(0, max_lag + 1, lag_step),
+            include_points=request.query_params.get("points", "").lower() in ("1", "true", "yes"),
+        )
+        return Response(result, status=200)
@@ -0,0 +1,42 @@
+"""
+Production server settings: gunicorn managing Uvicorn workers that serve
+core.asgi:application.
+
+    gunicorn core.asgi:application -c gunicorn.conf.py
+
+Each worker is a separate process running one event loop, so async views
+(ai.views.submit_drink, gemini_chat, gemini_chat_stream) keep many Gemini calls
+in flight per worker while sync DRF views run in Django's thread pool. Every
+value can be overridden through the environment.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+
+# Recycle workers after a bounded number of requests (jittered so they don't all
+# restart together) to cap slow memory growth from image processing.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+# On SIGTERM or recycling, workers stop accepting connections and get this long to
+# finish in-flight requests (a drink analysis can take several seconds).
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def worker_exit(server, worker):
+    # Close pooled Gemini clients and let queued drink jobs finish their attempt
+    from ai.gemini_helper import shutdown_gemini_clients
+    from ai.jobs import get_runner
+
+    get_runner().stop(timeout=graceful_timeout)
+    shutdown_gemini_clients()
@@ -0,0 +1,81 @@
+"""
+Token authentication with an in-process cache of token -> user.
+
+DRF's TokenAuthentication joins Token and User on every request. This
+subclass keeps recent lookups in a bounded TTLCache together with the user's
+data version (users/versioning.py), and only serves an entry while that
+version is unchanged. The version comes from ``versioning.recent_for``, so a
+cache hit makes no query at all, and it is left on the request for the ETag
+and response cache (api/conditional.py) to reuse. Every user row save and
+every token deletion bumps the version (see users/signals.py). A logout,
+password change, deactivation or timezone change takes effect at once in
+the worker that made it and within AUTH_TOKEN_CACHE_TTL_SECONDS in the
+others.
+"""
+
+import threading
+from copy import copy
+
+from cachetools import TTLCache
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from api import metrics
+from . import versioning
+
+_cache = None
+_lock = threading.Lock()
+
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        _cache = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES, ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS)
+    return _cache
+
+
+def evict_token(key):
+    with _lock:
+        _get_cache().pop(key, None)
+
+
+def evict_user(user_id):
+    with _lock:
+        cache = _get_cache()
+        for key in [key for key, (user, _, _) in cache.items() if user.pk == user_id]:
+            cache.pop(key, None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for ``rest_framework.authentication.TokenAuthentication``."""
+
+    data_version = None
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None and self.data_version is not None:
+            request._user_data_version = self.data_version  # See api.conditional.request_data_version
+        return result
+
+    def authenticate_credentials(self, key):
+        with _lock:
+            cached = _get_cache().get(key)
+        if cached is not None:
+            user, token, version = cached
+            if versioning.recent_for(user.pk) == version:
+                metrics.increment("auth_token_cache_hits")
+                self.data_version = version
+                # Each request gets its own copy so per-request changes never leak into the cache
+                return copy(user), copy(token)
+
+        metrics.increment("auth_token_cache_misses")
+        # Read the version before the user: a write in between leaves the entry behind the
+        # version, so it is reloaded next time instead of served stale
+        user_id = self.get_model().objects.filter(key=key).values_list("user_id", flat=True).first()
+        version = versioning.refresh_for(user_id) if user_id is not None else None
+        user, token = super().authenticate_credentials(key)  # Raises for unknown tokens and inactive users
+        if version is not None:
+            with _lock:
+                _get_cache()[key] = (copy(user), copy(token), version)
+            self.data_version = version
+        return user, token
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_user_caffeine_sensitivity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=64),
+        ),
+    ]
@@ -24,6 +24,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     first_name = models.CharField(max_length=50, blank=True, null=True)
     last_name = models.CharField(max_length=50, blank=True, null=True)
     caffeine_sensitivity = models.FloatField(default=0.5)  # Caffeine metabolism rate
+    timezone = models.CharField(max_length=64, default="UTC")  # IANA name, defines the user's "day"
 
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
@@ -36,3 +37,17 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
+
+
+class UserDataVersion(models.Model):
+    """
+    Counter bumped on every write to a user's data (see versioning.py).
+
+    Kept out of the User row so that ordinary ``user.save()`` calls, which
+    write back every column, can never roll it back.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="data_version")
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} - v{self.version}"
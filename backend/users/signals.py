@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import authentication, versioning
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, origin=None, **kwargs):
+    # LogoutUserView deletes request.auth. The bump makes other workers drop their cached entry.
+    authentication.evict_token(instance.key)
+    if isinstance(origin, User) or getattr(origin, "model", None) is User:
+        return  # The user is being deleted along with the token
+    versioning.bump(instance.user)
+
+
+@receiver(post_save, sender=User)
+def evict_saved_user(sender, instance, created, **kwargs):
+    # Password changes, deactivation and profile edits all save the user row
+    if not created:
+        authentication.evict_user(instance.pk)
+        versioning.bump(instance)
@@ -1,3 +1,61 @@
+from django.db.models import F
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from . import authentication, versioning
+from .models import User, UserDataVersion
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        authentication._get_cache().clear()
+        versioning._get_recent().clear()
+        self.user = User.objects.create_user(email="auth@example.com", password="password", username="auth",
+                                             first_name="Ada")
+        self.token = Token.objects.create(user=self.user)
+
+    def client_for(self, key):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + key)
+        return client
+
+    def test_cache_hit_makes_no_queries(self):
+        client = self.client_for(self.token.key)
+        etag = client.get("/api/users/profile/")["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get("/api/users/profile/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get("/api/users/profile/").json()["first_name"], "Ada")  # Response cache
+
+    def test_deleted_token_is_rejected(self):
+        client = self.client_for(self.token.key)
+        self.assertEqual(client.post("/api/users/logout/").status_code, 200)
+        self.assertEqual(client.get("/api/users/profile/").status_code, 401)
+
+    def test_rotated_token(self):
+        old = self.client_for(self.token.key)
+        old.get("/api/users/profile/")
+        self.token.delete()
+        new = self.client_for(Token.objects.create(user=self.user).key)
+        self.assertEqual(old.get("/api/users/profile/").status_code, 401)
+        self.assertEqual(new.get("/api/users/profile/").status_code, 200)
+
+    def test_deactivated_user_is_rejected(self):
+        client = self.client_for(self.token.key)
+        client.get("/api/users/profile/")
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get("/api/users/profile/").status_code, 401)
+
+    def test_changes_in_other_workers_are_seen_once_the_version_expires(self):
+        UserDataVersion.objects.create(user=self.user, version=1)
+        client = self.client_for(self.token.key)
+        client.get("/api/users/profile/")
+        # Another worker process saves the user; its evictions do not reach this one
+        User.objects.filter(pk=self.user.pk).update(first_name="Grace")
+        UserDataVersion.objects.filter(user=self.user).update(version=F("version") + 1)
+        self.assertEqual(client.get("/api/users/profile/").json()["first_name"], "Ada")
+
+        versioning.forget(self.user.pk)  # AUTH_TOKEN_CACHE_TTL_SECONDS passed
+        self.assertEqual(client.get("/api/users/profile/").json()["first_name"], "Grace")
@@ -0,0 +1,72 @@
+"""
+Per-user data version.
+
+Every write that can change what a user's read endpoints return bumps the
+version with an atomic ``version + 1`` UPDATE, so it only ever grows. Read
+endpoints derive their ETags from it (see api/conditional.py).
+
+``recent_for`` serves the version from this process's memory for up to
+AUTH_TOKEN_CACHE_TTL_SECONDS, so a request answered from the token and
+response caches needs no query. A bump made by this process is seen at once;
+one made by another worker process once the remembered value expires.
+"""
+
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import UserDataVersion
+
+_recent = None
+_lock = threading.Lock()
+
+
+def _get_recent():
+    global _recent
+    if _recent is None:
+        _recent = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES, ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS)
+    return _recent
+
+
+def current(user):
+    """The user's data version; a single primary key lookup of one column."""
+    return current_for(user.pk)
+
+
+def current_for(user_id):
+    return UserDataVersion.objects.filter(user_id=user_id).values_list("version", flat=True).first() or 0
+
+
+def refresh_for(user_id):
+    """``current_for``, remembered for ``recent_for``."""
+    version = current_for(user_id)
+    with _lock:
+        _get_recent()[user_id] = version
+    return version
+
+
+def recent_for(user_id):
+    """The version this process last read for the user, if still fresh; otherwise a new read."""
+    with _lock:
+        version = _get_recent().get(user_id)
+    return version if version is not None else refresh_for(user_id)
+
+
+def forget(user_id):
+    with _lock:
+        _get_recent().pop(user_id, None)
+
+
+def bump(user):
+    if not UserDataVersion.objects.filter(user_id=user.pk).update(version=F("version") + 1):
+        try:
+            with transaction.atomic():
+                UserDataVersion.objects.create(user_id=user.pk, version=1)
+        except IntegrityError:
+            return bump(user)  # Created concurrently; increment that row instead
+    forget(user.pk)
+    # Again once committed, in case another thread remembered the old value in between
+    transaction.on_commit(lambda: forget(user.pk))
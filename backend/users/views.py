@@ -4,6 +4,10 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.models import Token
 from rest_framework import status
+from api.cache import cache_user_response
+from api.conditional import conditional_on_user_data
+from caffeine import rollups
+from . import versioning
 from .models import User
 from .serializers import (
     UserRegistrationSerializer,
@@ -62,6 +66,8 @@ class LogoutUserView(APIView):
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on_user_data()
+    @cache_user_response()
     def get(self, request):
         user = request.user
         serializer = UserProfileSerializer(user)
@@ -69,9 +75,13 @@ class UserProfileView(APIView):
 
     def patch(self, request):
         user = request.user
+        previous_timezone = user.timezone
         serializer = UserProfileSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            if user.timezone != previous_timezone:
+                rollups.rebuild(user)  # Day boundaries moved
+            versioning.bump(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
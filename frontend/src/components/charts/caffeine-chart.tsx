@@ -16,7 +16,7 @@ import {
   ChartTooltip,
   ChartTooltipContent,
 } from "@/components/ui/chart";
-import { CaffeineLog } from "@/types/data-fetching";
+import { DailyIntake } from "@/types/data-fetching";
 import { useQuery } from "@tanstack/react-query";
 import { TrendingUp } from "lucide-react";
 
@@ -31,30 +31,24 @@ const chartConfig = {
   },
 } satisfies ChartConfig;
 
-async function getCaffeineLogs() {
-  const response = await fetch("/api/caffeine/logs/", {
+async function getTodaysIntake() {
+  const response = await fetch("/api/caffeine/daily/today/", {
     method: "GET",
     headers: {
       Authorization: `Token ${localStorage.getItem("jwt_token")}`,
     },
   });
-  return response.json() as unknown as CaffeineLog[];
+  return (await response.json()) as DailyIntake;
 }
 
 export function CaffeineChart() {
-  const { data: caffeineLogs, isLoading } = useQuery({
-    queryKey: ["caffeineLogs"],
-    queryFn: getCaffeineLogs,
+  const { data: today, isLoading } = useQuery({
+    queryKey: ["dailyIntake", "today"],
+    queryFn: getTodaysIntake,
     staleTime: Infinity,
   });
 
-  const todaysCaffeineLogs = caffeineLogs?.filter((log) =>
-    log.created_at.includes(new Date().toISOString().split("T")[0])
-  );
-  const totalAmount = todaysCaffeineLogs?.reduce(
-    (acc, log) => acc + log.caffeine_mg!,
-    0
-  );
+  const totalAmount = today?.caffeine_mg;
 
   const chartData = [
     {
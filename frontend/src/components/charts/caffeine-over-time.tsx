@@ -33,9 +33,16 @@ import { useQuery } from "@tanstack/react-query";
 
 type TimeRange = "1d" | "7d" | "30d";
 
-interface CaffeineIntake {
-  date: string; // Time of intake (ISO string)
-  caffeine_mg: number;
+interface CaffeineCurve {
+  start: string; // ISO string of the first point
+  step_seconds: number;
+  half_life_hours: number;
+  caffeine_remaining_mg: number[];
+  intakes: {
+    date: string[];
+    caffeine_mg: number[];
+    caffeine_remaining_mg: number[];
+  };
 }
 
 interface CaffeineDataPoint {
@@ -51,10 +58,17 @@ const chartConfig = {
   },
 };
 
-// 1. Fetch caffeine intake events
-async function getCaffeineIntake(): Promise<CaffeineIntake[]> {
+// 1. Fetch the decay curve, computed server side in columnar form
+async function getCaffeineCurve(
+  timeRange: TimeRange
+): Promise<CaffeineCurve | null> {
+  const params = new URLSearchParams({
+    range: timeRange,
+    layout: "columnar",
+    tz: Intl.DateTimeFormat().resolvedOptions().timeZone,
+  });
   try {
-    const response = await fetch("/api/caffeine/caffeine-over-time/", {
+    const response = await fetch(`/api/caffeine/caffeine-over-time/?${params}`, {
       method: "GET",
       headers: {
         Authorization: `Token ${localStorage.getItem("jwt_token")}`,
@@ -62,88 +76,32 @@ async function getCaffeineIntake(): Promise<CaffeineIntake[]> {
     });
 
     if (!response.ok) {
-      console.error("Failed to fetch caffeine intake data:", response.status);
-      return []; // Return an empty array instead of null or undefined
+      console.error("Failed to fetch caffeine curve:", response.status);
+      return null;
     }
 
-    const data = await response.json();
-
-    // Ensure we return an array
-    return Array.isArray(data) ? data : [];
+    return (await response.json()) as CaffeineCurve;
   } catch (error) {
-    console.error("Error fetching caffeine intake:", error);
-    return []; // Fail gracefully by returning an empty array
+    console.error("Error fetching caffeine curve:", error);
+    return null; // Fail gracefully
   }
 }
 
-// 2. Calculate caffeine decay at 5-min intervals
-function calculateCaffeineDecay(
-  intakes: CaffeineIntake[],
-  timeRange: TimeRange
-): CaffeineDataPoint[] {
-  const halfLifeHours = 5;
-  const now = new Date();
-
-  // Decide how many minutes to go backward & forward
-  const totalHours =
-    timeRange === "1d" ? 24 : timeRange === "7d" ? 7 * 24 : 30 * 24;
-  const totalMinutes = totalHours * 60;
-
-  const data: CaffeineDataPoint[] = [];
-
-  // Step in 5-minute increments
-  for (let m = -totalMinutes; m <= totalMinutes; m += 5) {
-    const timestamp = new Date(now);
-    timestamp.setMinutes(now.getMinutes() + m);
-
-    let sum = 0;
-    // Sum all intakes (decayed) at this time
-    for (const { date, caffeine_mg } of intakes) {
-      const elapsedHrs =
-        (timestamp.getTime() - new Date(date).getTime()) / (1000 * 3600);
-      if (elapsedHrs >= 0) {
-        sum += caffeine_mg * Math.pow(0.5, elapsedHrs / halfLifeHours);
-      }
-    }
-
-    data.push({
-      date: timestamp.toISOString(),
-      caffeine_remaining_mg: Math.round(sum * 100) / 100,
-    });
-  }
-
-  return data;
+// 2. Expand the columnar curve into chart rows
+function toDecayData(curve: CaffeineCurve): CaffeineDataPoint[] {
+  const start = new Date(curve.start).getTime();
+  return curve.caffeine_remaining_mg.map((caffeine_remaining_mg, i) => ({
+    date: new Date(start + i * curve.step_seconds * 1000).toISOString(),
+    caffeine_remaining_mg,
+  }));
 }
 
-// 3. For each intake event, find the data point in the decayed dataset
-function computeScatterPoints(
-  intakes: CaffeineIntake[],
-  decayData: CaffeineDataPoint[]
-): CaffeineDataPoint[] {
-  return intakes.map((intake) => {
-    const isoDate = new Date(intake.date).toISOString();
-    // Attempt direct match first
-    let found = decayData.find(
-      (dp) => dp.date.slice(0, 16) === isoDate.slice(0, 16)
-    );
-
-    if (!found) {
-      // fallback: pick the closest in time
-      let minDiff = Infinity;
-      let closest: CaffeineDataPoint | null = null;
-      for (const dp of decayData) {
-        const diff = Math.abs(
-          new Date(dp.date).getTime() - new Date(intake.date).getTime()
-        );
-        if (diff < minDiff) {
-          minDiff = diff;
-          closest = dp;
-        }
-      }
-      found = closest || { date: isoDate, caffeine_remaining_mg: 0 };
-    }
-    return found;
-  });
+// 3. One point per intake, at the level reached right after it
+function toScatterPoints(curve: CaffeineCurve): CaffeineDataPoint[] {
+  return curve.intakes.date.map((date, i) => ({
+    date: new Date(date).toISOString(),
+    caffeine_remaining_mg: curve.intakes.caffeine_remaining_mg[i],
+  }));
 }
 
 // 4. X-axis label: day vs. week vs. month
@@ -179,23 +137,27 @@ function formatTooltipDate(dateISO: string): string {
 
 export function CaffeineOverTimeChart() {
   const [timeRange, setTimeRange] = React.useState<TimeRange>("1d");
-  const { data: caffeineIntakes, isLoading } = useQuery({
-    queryKey: ["caffeineIntakes"],
-    queryFn: getCaffeineIntake,
+  const { data: caffeineCurve, isLoading } = useQuery({
+    queryKey: ["caffeineIntakes", timeRange],
+    queryFn: () => getCaffeineCurve(timeRange),
     staleTime: Infinity,
   });
 
   if (isLoading) {
     return <div>Loading caffeine data...</div>;
   }
-  if (!caffeineIntakes || caffeineIntakes.length === 0) {
+  if (
+    !caffeineCurve ||
+    (caffeineCurve.intakes.date.length === 0 &&
+      caffeineCurve.caffeine_remaining_mg.every((mg) => mg === 0))
+  ) {
     return <div>No caffeine data available</div>;
   }
 
   // Decay curve
-  const decayData = calculateCaffeineDecay(caffeineIntakes, timeRange);
+  const decayData = toDecayData(caffeineCurve);
   // Points for each drink
-  const scatterPoints = computeScatterPoints(caffeineIntakes, decayData);
+  const scatterPoints = toScatterPoints(caffeineCurve);
 
   return (
     <Card>
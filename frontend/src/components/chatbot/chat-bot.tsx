@@ -36,8 +36,8 @@ export function ChatBot() {
     ]);
 
     try {
-      // Send request to AI endpoint
-      const response = await fetch("/api/ai/chat/", {
+      // Stream the answer from the AI endpoint as server-sent events
+      const response = await fetch("/api/ai/chat/stream/", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -45,13 +45,44 @@ export function ChatBot() {
         },
         body: JSON.stringify({ message: userInput }),
       });
-      const data = await response.json();
+      if (!response.ok || !response.body) {
+        throw new Error(`Chat request failed: ${response.status}`);
+      }
 
-      // Remove "Tracking..." and replace with real response
-      setMessages((prev) => [
-        ...prev.slice(0, -1), // Remove last "Tracking..." entry
-        { role: "assistant", content: data.response ?? "*[No response]*" },
-      ]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let answer = "";
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+        for (const event of events) {
+          const dataLine = event.split("\n").find((line) => line.startsWith("data: "));
+          if (!dataLine) continue;
+          const data = JSON.parse(dataLine.slice(6));
+          if (data.error) throw new Error(data.error);
+          if (data.text) {
+            answer += data.text;
+            // Replace "Tracking..." with the answer so far
+            setMessages((prev) => [
+              ...prev.slice(0, -1),
+              { role: "assistant", content: answer },
+            ]);
+          }
+        }
+      }
+
+      if (!answer) {
+        setMessages((prev) => [
+          ...prev.slice(0, -1),
+          { role: "assistant", content: "*[No response]*" },
+        ]);
+      }
     } catch (error) {
       // Handle error gracefully
       setMessages((prev) => [
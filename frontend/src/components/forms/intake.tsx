@@ -27,7 +27,8 @@ import {
 } from "@/components/ui/form";
 import { Input } from "@/components/ui/input";
 import { Textarea } from "@/components/ui/textarea";
-import { useQueryClient } from "@tanstack/react-query";
+import { Beverage, CaffeineLog, DrinkSubmission } from "@/types/data-fetching";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
 import { toast } from "sonner";
 
 const formSchema = z.object({
@@ -46,56 +47,44 @@ const formSchema = z.object({
 
 type FormValues = z.infer<typeof formSchema>;
 
-function parseAIResponse(response: string): DrinkData | null {
-  try {
-    // Remove markdown code block syntax and parse JSON
-    const jsonStr = response.replace(/```json\n|\n```/g, "");
-    return JSON.parse(jsonStr);
-  } catch (error) {
-    console.error("Failed to parse AI response:", error);
-    return null;
-  }
-}
-
-interface BVitamins {
-  vitamin_b3_mg: number;
-  vitamin_b6_mg: number;
-  vitamin_b12_mcg: number;
+function formatAmount(value: number | null | undefined, unit: string) {
+  return value === null || value === undefined ? "Unknown" : `${value}${unit}`;
 }
 
-interface OtherIngredients {
-  carbonated_water: boolean;
-  natural_flavors: boolean;
-  sucralose: boolean;
-}
-
-interface DrinkData {
-  beverage_name: string;
-  serving_size: string;
-  calories: number;
-  total_fat_g: number;
-  sodium_mg: number;
-  total_carbohydrates_g: number;
-  sugars_g: number;
-  added_sugars_g: number;
-  protein_g: number;
-  caffeine_mg: number;
-  taurine_mg?: number;
-  b_vitamins?: BVitamins;
-  other_ingredients?: OtherIngredients;
-  other_notes?: string;
+async function searchBeverages(query: string) {
+  const response = await fetch(
+    `/api/caffeine/beverages/?q=${encodeURIComponent(query)}`,
+    {
+      method: "GET",
+      headers: {
+        Authorization: `Token ${localStorage.getItem("jwt_token")}`,
+      },
+    }
+  );
+  return (await response.json()) as Beverage[];
 }
 
 export function CaffeineLogDialog() {
   const [step, setStep] = useState(1);
   const [isUploading, setIsUploading] = useState(false);
   const [imagePreview, setImagePreview] = useState<string | null>(null);
-  const [drinkData, setDrinkData] = useState<DrinkData | null>(null);
+  // Unconfirmed log saved by the analysis, and the user's corrections to it
+  const [draftLog, setDraftLog] = useState<CaffeineLog | null>(null);
+  const [edits, setEdits] = useState<Partial<CaffeineLog>>({});
   const [loading, setLoading] = useState(false);
   const [isDialogOpen, setIsDialogOpen] = useState(false);
+  const [beverageQuery, setBeverageQuery] = useState("");
 
   const queryClient = useQueryClient();
 
+  // Known drinks from the shared catalog; logging one skips the photo analysis
+  const { data: beverageSuggestions } = useQuery({
+    queryKey: ["beverages", beverageQuery.trim().toLowerCase()],
+    queryFn: () => searchBeverages(beverageQuery),
+    enabled: beverageQuery.trim().length >= 2,
+    staleTime: 60_000,
+  });
+
   const form = useForm<FormValues>({
     resolver: zodResolver(formSchema),
   });
@@ -115,39 +104,92 @@ export function CaffeineLogDialog() {
     }
   }
 
+  function invalidateCaffeineQueries() {
+    // Invalidate all caffeine-related queries to refresh data in charts
+    queryClient.invalidateQueries({
+      queryKey: ["caffeineLogs"], // Logs update ✅
+    });
+    queryClient.invalidateQueries({
+      queryKey: ["caffeineOverTime"], // Might not match, see below ❌
+    });
+    queryClient.invalidateQueries({
+      queryKey: ["caffeineIntakes"], // ✅ This is what CaffeineOverTimeChart uses
+    });
+    queryClient.invalidateQueries({
+      queryKey: ["dailyIntake"], // Caffeine meter reads the daily rollup
+    });
+  }
+
+  async function handleKnownBeverage(beverage: Beverage) {
+    try {
+      const response = await fetch(
+        `/api/caffeine/beverages/${beverage.id}/log/`,
+        {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            Authorization: `Token ${localStorage.getItem("jwt_token")}`,
+          },
+          body: JSON.stringify({}),
+        }
+      );
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      toast.success(`Logged ${beverage.name}`);
+      invalidateCaffeineQueries();
+      setStep(4);
+    } catch (error) {
+      console.error("Error logging known beverage:", error);
+      toast.error("Failed to log drink");
+    }
+  }
+
   async function handleConfirmation() {
+    if (!draftLog) return;
+
     try {
-      const response = await fetch("/api/caffeine/logs/create/", {
-        method: "POST",
+      const response = await fetch(`/api/caffeine/logs/${draftLog.id}/`, {
+        method: "PATCH",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Token ${localStorage.getItem("jwt_token")}`,
         },
-        body: JSON.stringify(drinkData),
+        body: JSON.stringify({ ...edits, confirmed: true }),
       });
-  
+
       if (!response.ok) {
         throw new Error("Failed to confirm submission");
       }
-  
+
       toast.success("Successfully submitted caffeine intake");
-  
-      // Invalidate all caffeine-related queries to refresh data in charts
-      queryClient.invalidateQueries({
-        queryKey: ["caffeineLogs"], // Logs update ✅
-      });
-      queryClient.invalidateQueries({
-        queryKey: ["caffeineOverTime"], // Might not match, see below ❌
-      });
-      queryClient.invalidateQueries({
-        queryKey: ["caffeineIntakes"], // ✅ This is what CaffeineOverTimeChart uses
-      });
-  
-      // Reset form and close dialog
+
+      invalidateCaffeineQueries();
+
+      // The draft is a real log now, so closing the dialog must not discard it
+      setDraftLog(null);
       setStep(4);
     } catch (error) {
       console.error("Error confirming submission:", error);
+      toast.error("Failed to confirm drink");
+    }
+  }
+
+  function discardDraft() {
+    // Abandoned drafts also expire on the server, this just cleans up sooner
+    if (draftLog) {
+      fetch(`/api/caffeine/logs/${draftLog.id}/`, {
+        method: "DELETE",
+        headers: {
+          Authorization: `Token ${localStorage.getItem("jwt_token")}`,
+        },
+        keepalive: true,
+      }).catch((error) => console.error("Error discarding draft:", error));
     }
+    setDraftLog(null);
+    setEdits({});
   }
 
   async function onSubmit(values: FormValues) {
@@ -184,12 +226,15 @@ export function CaffeineLogDialog() {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      // Reset form and close dialog
-      const data = (await response.json()) as {
-        analysis: { raw_response: string };
-      };
-      setDrinkData(parseAIResponse(data.analysis.raw_response));
-      setStep(3);
+      const data = (await response.json()) as DrinkSubmission;
+      if (!data.log) {
+        console.error("Drink analysis is not a valid log:", data.log_errors);
+        toast.error("Couldn't read the drink details, try another photo");
+      } else {
+        setDraftLog(data.log);
+        setEdits({});
+        setStep(3);
+      }
     } catch (error) {
       console.error("Error submitting form:", error);
       toast.error("Failed to submit");
@@ -199,10 +244,11 @@ export function CaffeineLogDialog() {
   }
 
   function resetForm() {
+    discardDraft();
     form.reset();
     setImagePreview(null);
     setStep(1);
-    setDrinkData(null);
+    setBeverageQuery("");
   }
 
   function handleAddAnother() {
@@ -214,8 +260,18 @@ export function CaffeineLogDialog() {
     setIsDialogOpen(false);
   }
 
+  function handleOpenChange(open: boolean) {
+    if (!open && draftLog) {
+      discardDraft();
+      setStep(2);
+    }
+    setIsDialogOpen(open);
+  }
+
+  const drink = draftLog && { ...draftLog, ...edits };
+
   return (
-    <Dialog open={isDialogOpen} onOpenChange={setIsDialogOpen}>
+    <Dialog open={isDialogOpen} onOpenChange={handleOpenChange}>
       <DialogTrigger asChild>
         <Button>
           <PlusIcon className="h-4 w-4 mr-2" aria-hidden="true" /> Add Caffeine
@@ -233,6 +289,37 @@ export function CaffeineLogDialog() {
           <form onSubmit={form.handleSubmit(onSubmit)} className="space-y-4">
             {step === 1 && (
               <div className="grid gap-4 py-4">
+                <div className="grid gap-2">
+                  <FormLabel htmlFor="beverage-search">
+                    Search Known Drinks
+                  </FormLabel>
+                  <Input
+                    id="beverage-search"
+                    value={beverageQuery}
+                    onChange={(e) => setBeverageQuery(e.target.value)}
+                    placeholder="Start typing a drink name..."
+                    autoComplete="off"
+                  />
+                  {beverageSuggestions && beverageSuggestions.length > 0 && (
+                    <ul className="grid gap-1 rounded-lg border p-1">
+                      {beverageSuggestions.map((beverage) => (
+                        <li key={beverage.id}>
+                          <Button
+                            type="button"
+                            variant="ghost"
+                            className="w-full justify-between"
+                            onClick={() => handleKnownBeverage(beverage)}
+                          >
+                            <span>{beverage.name}</span>
+                            <span className="text-muted-foreground">
+                              {beverage.caffeine_mg} mg
+                            </span>
+                          </Button>
+                        </li>
+                      ))}
+                    </ul>
+                  )}
+                </div>
                 <div className="grid gap-2">
                   <FormLabel htmlFor="image">Upload Image</FormLabel>
                   <div className="grid gap-4">
@@ -376,59 +463,83 @@ export function CaffeineLogDialog() {
               </div>
             )}
 
-            {step === 3 && drinkData && (
+            {step === 3 && drink && (
               <div className="grid gap-4 py-4">
                 <h3 className="text-lg font-semibold">Confirm Drink Details</h3>
+                <div className="grid gap-2">
+                  <FormLabel htmlFor="drink-name">Drink Name</FormLabel>
+                  <Input
+                    id="drink-name"
+                    value={drink.beverage_name ?? ""}
+                    onChange={(e) =>
+                      setEdits({ ...edits, beverage_name: e.target.value })
+                    }
+                  />
+                </div>
+                <div className="grid gap-2">
+                  <FormLabel htmlFor="drink-caffeine">Caffeine (mg)</FormLabel>
+                  <Input
+                    id="drink-caffeine"
+                    type="number"
+                    min={0}
+                    value={drink.caffeine_mg}
+                    onChange={(e) =>
+                      setEdits({ ...edits, caffeine_mg: Number(e.target.value) })
+                    }
+                  />
+                </div>
                 <div className="grid gap-2">
                   <p>
-                    <strong>Drink Name:</strong> {drinkData.beverage_name}
-                  </p>
-                  <p>
-                    <strong>Serving Size:</strong> {drinkData.serving_size}
+                    <strong>Serving Size:</strong>{" "}
+                    {drink.serving_size ?? "Unknown"}
                   </p>
                   <p>
-                    <strong>Calories:</strong> {drinkData.calories}
+                    <strong>Calories:</strong>{" "}
+                    {formatAmount(drink.calories_kcal, " kcal")}
                   </p>
                   <p>
-                    <strong>Total Fat:</strong> {drinkData.total_fat_g}g
+                    <strong>Total Fat:</strong>{" "}
+                    {formatAmount(drink.total_fat_g, "g")}
                   </p>
                   <p>
-                    <strong>Sodium:</strong> {drinkData.sodium_mg}mg
+                    <strong>Sodium:</strong> {formatAmount(drink.sodium_mg, "mg")}
                   </p>
                   <p>
                     <strong>Total Carbohydrates:</strong>{" "}
-                    {drinkData.total_carbohydrates_g}g
-                  </p>
-                  <p>
-                    <strong>Sugars:</strong> {drinkData.sugars_g}g
+                    {formatAmount(drink.total_carbohydrates_g, "g")}
                   </p>
                   <p>
-                    <strong>Added Sugars:</strong> {drinkData.added_sugars_g}g
+                    <strong>Sugars:</strong> {formatAmount(drink.sugars_g, "g")}
                   </p>
                   <p>
-                    <strong>Protein:</strong> {drinkData.protein_g}g
+                    <strong>Added Sugars:</strong>{" "}
+                    {formatAmount(drink.added_sugars_g, "g")}
                   </p>
                   <p>
-                    <strong>Caffeine:</strong> {drinkData.caffeine_mg}mg
+                    <strong>Protein:</strong> {formatAmount(drink.protein_g, "g")}
                   </p>
-                  {drinkData.taurine_mg && (
+                  {drink.taurine_mg ? (
                     <p>
-                      <strong>Taurine:</strong> {drinkData.taurine_mg}mg
+                      <strong>Taurine:</strong> {drink.taurine_mg}mg
                     </p>
-                  )}
-                  {drinkData.b_vitamins && (
+                  ) : null}
+                  {drink.b_vitamins && (
                     <div>
                       <strong>B Vitamins:</strong>
                       <ul className="list-disc pl-6 mt-1">
-                        <li>B3: {drinkData.b_vitamins.vitamin_b3_mg}mg</li>
-                        <li>B6: {drinkData.b_vitamins.vitamin_b6_mg}mg</li>
-                        <li>B12: {drinkData.b_vitamins.vitamin_b12_mcg}mcg</li>
+                        {Object.entries(drink.b_vitamins).map(
+                          ([name, amount]) => (
+                            <li key={name}>
+                              {name.replace(/_/g, " ")}: {String(amount)}
+                            </li>
+                          )
+                        )}
                       </ul>
                     </div>
                   )}
-                  {drinkData.other_notes && (
+                  {drink.additional_notes && (
                     <p>
-                      <strong>Other Notes:</strong> {drinkData.other_notes}
+                      <strong>Notes:</strong> {drink.additional_notes}
                     </p>
                   )}
                 </div>
@@ -436,7 +547,10 @@ export function CaffeineLogDialog() {
                   <Button
                     type="button"
                     variant="outline"
-                    onClick={() => setStep(2)}
+                    onClick={() => {
+                      discardDraft();
+                      setStep(2);
+                    }}
                   >
                     Back
                   </Button>
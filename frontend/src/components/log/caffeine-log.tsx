@@ -13,7 +13,7 @@ import {
   TableHeader,
   TableRow,
 } from "@/components/ui/table";
-import { type CaffeineLog } from "@/types/data-fetching";
+import { type CaffeineLogPage } from "@/types/data-fetching";
 import { useQuery } from "@tanstack/react-query";
 import { AlertCircle, Coffee } from "lucide-react";
 
@@ -24,7 +24,8 @@ async function getCaffeineLogs() {
       Authorization: `Token ${localStorage.getItem("jwt_token")}`,
     },
   });
-  return response.json() as unknown as CaffeineLog[];
+  const page = (await response.json()) as CaffeineLogPage;
+  return page.results;
 }
 
 function LoadingState() {
@@ -12,22 +12,62 @@ export type CaffeineLog = {
   protein_g: number;
   taurine_mg: number;
   calories_kcal: number;
-  b_vitamins: BVitamins;
-  other_ingredients: OtherIngredients;
+  b_vitamins: BVitamins | null;
+  other_ingredients: OtherIngredients | null;
   image_url: string | null;
   additional_notes: string | null;
   confirmed: boolean;
   created_at: string;
 };
 
-export type BVitamins = {
-  vitamin_b3_mg: number;
-  vitamin_b6_mg: number;
-  vitamin_b12_mcg: number;
+// Cursor-paginated response of /api/caffeine/logs/
+export type CaffeineLogPage = {
+  next: string | null;
+  previous: string | null;
+  results: CaffeineLog[];
 };
 
-export type OtherIngredients = {
-  carbonated_water: boolean;
-  natural_flavors: boolean;
-  sucralose: boolean;
+// Response of /api/ai/submit-drink/; `log` is an unconfirmed draft to PATCH or DELETE
+export type DrinkSubmission = {
+  image_url: string;
+  analysis: Partial<CaffeineLog>;
+  cached: boolean;
+  log: CaffeineLog | null;
+  log_errors?: Record<string, string[]>;
 };
+
+// Entry of the shared beverage catalog (/api/caffeine/beverages/?q=)
+export type Beverage = {
+  id: string;
+  name: string;
+  serving_size: string | null;
+  caffeine_mg: number;
+  total_fat_g: number | null;
+  sodium_mg: number | null;
+  total_carbohydrates_g: number | null;
+  sugars_g: number | null;
+  added_sugars_g: number | null;
+  protein_g: number | null;
+  taurine_mg: number | null;
+  calories_kcal: number | null;
+  b_vitamins: BVitamins | null;
+  other_ingredients: OtherIngredients | null;
+  times_logged: number;
+};
+
+export type DailyIntake = {
+  day: string;
+  drinks: number;
+  caffeine_mg: number;
+  sugars_g: number;
+  added_sugars_g: number;
+  calories_kcal: number;
+  sodium_mg: number;
+  total_carbohydrates_g: number;
+};
+
+// Free-form keys from the drink analysis, e.g. { vitamin_b6_mg: 2 }
+export type BVitamins = Record<string, number | boolean>;
+
+// An amount when printed on the label, otherwise true
+export type OtherIngredients = Record<string, number | boolean>;